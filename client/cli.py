@@ -1,5 +1,6 @@
 import argparse
 import base64
+import json
 import requests
 import time
 import os
@@ -111,6 +112,29 @@ def get_result(task_id, print_progress = False):
                 return None
         time.sleep(2)  # Wait for 2 seconds before checking again
 
+def stream_result(task_id):
+    stream_url = os.getenv('STREAM_URL', 'http://localhost:8000/ocr/stream/')
+    event = None
+    with requests.get(stream_url + task_id, stream=True) as response:
+        if response.status_code != 200:
+            print(f"Failed to stream the result: {response.text}")
+            return
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+                if event == 'page':
+                    print(f"\n--- page {data['page']} ---", flush=True)
+                elif event == 'chunk':
+                    print(data['text'], end='', flush=True)
+                elif event == 'error':
+                    print(f"\nOCR task failed: {data['message']}")
+                    return
+                elif event == 'done':
+                    print()
+                    return
+
 def clear_cache():
     clear_cache_url = os.getenv('CLEAR_CACHE_URL', 'http://localhost:8000/ocr/clear_cache')
     response = requests.post(clear_cache_url)
@@ -135,13 +159,16 @@ def llm_generate(prompt, model = 'llama3.1'):
     else:
         print(f"Failed to generate text: {response.text}")
 
-def list_files(storage_profile):
+def list_files(storage_profile, prefix=None, limit=None, cursor=None):
     list_files_url = os.getenv('LIST_FILES_URL', 'http://localhost:8000/storage/list')
-    response = requests.get(list_files_url, params={'storage_profile': storage_profile})
+    params = {'storage_profile': storage_profile, 'prefix': prefix, 'limit': limit, 'cursor': cursor}
+    response = requests.get(list_files_url, params={k: v for k, v in params.items() if v is not None})
     if response.status_code == 200:
-        files = response.json().get('files', [])
-        for file in files:
+        result = response.json()
+        for file in result.get('files', []):
             print(file)
+        if result.get('next_cursor'):
+            print(f"Next page: --cursor \"{result['next_cursor']}\"")
     else:
         print(f"Failed to list files: {response.text}")        
 
@@ -216,6 +243,10 @@ def main():
     result_parser.add_argument('--task_id', type=str, help='Task Id returned by the upload command')
     result_parser.add_argument('--print_progress', default=True, action='store_true', help='Print the progress of the OCR task')
 
+    # Sub-command for streaming the result as it's generated
+    stream_parser = subparsers.add_parser('stream', help='Stream the OCR/LLM output of the specified task id as it is generated.')
+    stream_parser.add_argument('--task_id', type=str, help='Task Id returned by the upload command')
+
     # Sub-command for clearing the cache
     clear_cache_parser = subparsers.add_parser('clear_cache', help='Clear the OCR result cache')
 
@@ -230,6 +261,9 @@ def main():
     # Sub-command for listing files
     list_files_parser = subparsers.add_parser('list_files', help='List files using the selected storage profile')
     list_files_parser.add_argument('--storage_profile', type=str, default='default', help='Storage profile to use')
+    list_files_parser.add_argument('--prefix', type=str, default=None, help='List only the files with paths starting with the prefix')
+    list_files_parser.add_argument('--limit', type=int, default=None, help='Maximum number of files to list (a page)')
+    list_files_parser.add_argument('--cursor', type=str, default=None, help='Cursor of the page to list, printed with the previous page')
 
     # Sub-command for loading a file
     load_file_parser = subparsers.add_parser('load_file', help='Load a file using the selected storage profile')
@@ -272,6 +306,8 @@ def main():
         text_result = get_result(args.task_id, args.print_progress)
         if text_result:
             print(text_result)
+    elif args.command == 'stream':
+        stream_result(args.task_id)
     elif args.command == 'clear_cache':
         clear_cache()
     elif args.command == 'llm_generate':
@@ -279,7 +315,7 @@ def main():
     elif args.command == 'llm_pull':
         llm_pull(args.model)
     elif args.command == 'list_files':
-        list_files(args.storage_profile)     
+        list_files(args.storage_profile, args.prefix, args.limit, args.cursor)     
     elif args.command == 'load_file':
         load_file(args.file_name, args.storage_profile)
     elif args.command == 'delete_file':
@@ -18,8 +18,10 @@ fi
 source .dvenv/bin/activate
 
 if [ "$APP_TYPE" = "celery" ]; then
-   echo "Starting Celery worker..."
-   exec celery -A text_extract_api.celery_app worker --loglevel=info --pool=solo
+   # The pool, concurrency and prefetch come from the `queues` section of config/strategies.yaml
+   # for the queues listed in CELERY_WORKER_QUEUES (all the queues, solo pool by default)
+   echo "Starting Celery worker for queues: ${CELERY_WORKER_QUEUES:-all}..."
+   exec celery -A text_extract_api.celery_app worker --loglevel=info
 else
    echo "Pulling LLM models, please wait until this process is done..."
    python client/cli.py llm_pull --model llama3.1
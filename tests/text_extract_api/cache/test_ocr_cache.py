@@ -0,0 +1,168 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+
+from text_extract_api.cache.cache_key import build_cache_key, strategy_from_cache_key
+from text_extract_api.cache.compression import compress, decompress
+from text_extract_api.cache import ocr_cache
+from text_extract_api.cache.ocr_cache import OcrCache
+
+
+class TestCacheKey(unittest.TestCase):
+
+    def test_key_covers_strategy_and_params(self):
+        key = build_cache_key('document', 'easyocr', 'abc', {'language': 'en'})
+        self.assertEqual(strategy_from_cache_key(key), 'easyocr')
+        self.assertNotEqual(key, build_cache_key('document', 'llama_vision', 'abc', {'language': 'en'}))
+        self.assertNotEqual(key, build_cache_key('document', 'easyocr', 'abc', {'language': 'de'}))
+        self.assertEqual(key, build_cache_key('document', 'easyocr', 'abc', {'language': 'en'}))
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_roundtrip(self):
+        data = b"markdown " * 1000
+        compressed = compress(data)
+        self.assertLess(len(compressed), len(data))
+        self.assertEqual(decompress(compressed), data)
+
+
+class TestOcrCache(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_client = fakeredis.FakeStrictRedis()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_get_set_and_stats(self):
+        cache = OcrCache(self.redis_client, max_bytes=0, default_ttl=60, memory_max_bytes=0)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        self.assertIsNone(cache.get(key))
+        cache.set(key, "text")
+        self.assertEqual(cache.get(key), "text")
+        self.assertLessEqual(self.redis_client.ttl(key), 60)
+        self.assertEqual(cache.stats(), {'easyocr': {'hits': 1, 'l2_hits': 1, 'misses': 1}})
+
+    def test_stats_are_buffered(self):
+        cache = OcrCache(self.redis_client, max_bytes=0, default_ttl=60, memory_max_bytes=0)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        cache.set(key, "text")
+        cache.get(key)
+        cache.get(build_cache_key('document', 'easyocr', 'other'))
+
+        self.assertEqual(list(self.redis_client.scan_iter(match=f"{OcrCache.STATS_KEY}:*")), [])
+        for _ in range(OcrCache.STATS_FLUSH_THRESHOLD):
+            cache.get(key)
+        # Flushed once enough counts were buffered, the rest on reading the stats
+        self.assertLess(int(self.redis_client.hget(f"{OcrCache.STATS_KEY}:easyocr", 'l2_hits')), 51)
+        self.assertEqual(cache.stats()['easyocr'], {'hits': 51, 'l2_hits': 51, 'misses': 1})
+
+    def test_generation_is_cached(self):
+        cache = OcrCache(self.redis_client, max_bytes=0, default_ttl=60, memory_max_bytes=0)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        self.assertEqual(cache._disk_key(key), f"0:{key}")
+
+        self.redis_client.incr(OcrCache.GENERATION_KEY)
+        self.assertEqual(cache._disk_key(key), f"0:{key}")
+        with patch.object(ocr_cache.time, "monotonic", return_value=time.monotonic() + cache.generation_ttl):
+            self.assertEqual(cache._disk_key(key), f"1:{key}")
+
+    def test_values_are_compressed_in_redis(self):
+        cache = OcrCache(self.redis_client, max_bytes=0, default_ttl=0, memory_max_bytes=0)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        cache.set(key, "text " * 1000)
+        self.assertLess(len(self.redis_client.get(key)), 1000)
+
+    def test_evicts_least_recently_used(self):
+        values = ["a" * 40, "b" * 40, "c" * 40]
+        value_size = len(compress(values[0].encode('utf-8')))
+        cache = OcrCache(self.redis_client, max_bytes=2 * value_size, default_ttl=0, memory_max_bytes=0)
+        first, second, third = (build_cache_key('page', 'easyocr', str(i)) for i in range(3))
+        cache.set(first, values[0])
+        cache.set(second, values[1])
+        cache.get(first)
+        cache.set(third, values[2])
+
+        self.assertEqual(cache.get(first), values[0])
+        self.assertIsNone(cache.get(second))
+        self.assertEqual(cache.get(third), values[2])
+        self.assertEqual(cache.size()['bytes'], 2 * value_size)
+        self.assertEqual(cache.stats()['easyocr']['evictions'], 1)
+
+    def test_size_accounting_survives_repeated_deletes(self):
+        cache = OcrCache(self.redis_client, max_bytes=0, default_ttl=0, memory_max_bytes=0)
+        first, second = (build_cache_key('page', 'easyocr', str(i)) for i in range(2))
+        cache.set(first, "a" * 40)
+        cache.set(second, "b" * 40)
+        cache.set(second, "c" * 400)
+
+        # Two workers deleting (or evicting) the same key - its size is subtracted once
+        cache.redis_tier.delete(first)
+        cache.redis_tier.delete(first)
+        self.assertEqual(cache.size()['bytes'], len(self.redis_client.get(second)))
+
+        cache.redis_tier.max_bytes = 1
+        self.assertEqual([evicted[0] for evicted in cache.redis_tier.evict()], [second])
+        self.assertEqual(cache.redis_tier.evict(), [])
+        self.assertEqual(cache.size(), {'keys': 0, 'bytes': 0, 'max_bytes': 1})
+
+    def test_memory_tier_serves_hot_values(self):
+        cache = OcrCache(self.redis_client, max_bytes=0, default_ttl=0, memory_max_bytes=1024)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        cache.set(key, "text")
+        self.redis_client.delete(key)
+        self.assertEqual(cache.get(key), "text")
+        self.assertEqual(cache.stats()['easyocr']['l1_hits'], 1)
+
+    def test_evicted_values_are_demoted_to_disk_and_promoted_back(self):
+        cache = OcrCache(self.redis_client, max_bytes=1, default_ttl=0, memory_max_bytes=0,
+                         disk_path=os.path.join(self.temp_dir.name, 'cache.sqlite'), disk_max_bytes=1024 * 1024)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        cache.set(key, "text")
+        self.assertIsNone(self.redis_client.get(key))
+
+        self.assertEqual(cache.get(key), "text")
+        self.assertEqual(cache.stats()['easyocr']['l3_hits'], 1)
+
+    def test_demoted_values_keep_their_ttl(self):
+        cache = OcrCache(self.redis_client, max_bytes=1, default_ttl=7 * 24 * 3600, memory_max_bytes=0,
+                         disk_path=os.path.join(self.temp_dir.name, 'cache.sqlite'), disk_max_bytes=1024 * 1024)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        cache.set(key, "text", ttl=60)
+
+        value, ttl = cache.disk_tier.get_with_ttl(cache._disk_key(key))
+        self.assertIsNotNone(value)
+        self.assertLessEqual(ttl, 60)
+
+
+    def test_clear_drops_every_tier_and_only_the_cache_keys(self):
+        disk_path = os.path.join(self.temp_dir.name, 'cache.sqlite')
+        cache = OcrCache(self.redis_client, max_bytes=0, default_ttl=0, memory_max_bytes=1024,
+                         disk_path=disk_path, disk_max_bytes=1024 * 1024)
+        # A worker with its own disk tier, holding a demoted value
+        worker_cache = OcrCache(self.redis_client, max_bytes=1, default_ttl=0, memory_max_bytes=0,
+                                disk_path=os.path.join(self.temp_dir.name, 'worker.sqlite'), disk_max_bytes=1024 * 1024)
+        key = build_cache_key('document', 'easyocr', 'abc')
+        other_key = build_cache_key('document', 'easyocr', 'other')
+        cache.set(key, "text")
+        worker_cache.set(other_key, "other")
+        self.redis_client.set('inflight:lease', 'task')
+        self.redis_client.hset('queued:tenants', 'default', 1)
+
+        cache.clear()
+
+        self.assertIsNone(cache.get(key))
+        # The worker reads the bumped generation once the one it cached expires
+        with patch.object(ocr_cache.time, "monotonic", return_value=time.monotonic() + worker_cache.generation_ttl):
+            self.assertIsNone(worker_cache.get(other_key))
+        self.assertEqual(self.redis_client.get('inflight:lease'), b'task')
+        self.assertEqual(self.redis_client.hget('queued:tenants', 'default'), b'1')
+        self.assertEqual(cache.size()['bytes'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
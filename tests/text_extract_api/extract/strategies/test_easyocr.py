@@ -0,0 +1,213 @@
+import pathlib
+import sys
+import types
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+# Strategies import the `extract` package relative to text_extract_api - as the app (celery_app) sets it up
+sys.path.insert(0, str(pathlib.Path(__file__).parents[4] / "text_extract_api"))
+
+try:
+    import easyocr
+except ImportError:
+    # The readers are replaced by fakes below - the models are never loaded
+    sys.modules['easyocr'] = types.SimpleNamespace(Reader=object)
+
+from text_extract_api.extract.strategies import easyocr as easyocr_strategy
+from text_extract_api.extract.strategies.easyocr import EasyOCRStrategy, ReaderCache
+
+
+class FakeReader:
+    def __init__(self, languages):
+        self.languages = languages
+
+
+class FakePage:
+    def __init__(self, text: str):
+        self.hash = f"hash-{text}"
+        self.binary = text.encode()
+
+
+def fake_readtext(reader, image_binary: bytes) -> str:
+    return image_binary.decode()
+
+
+class FakePool:
+    """
+    Runs the submitted pages synchronously - `broken` pages fail as if their pool process died.
+    """
+    created = []
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        self.max_workers = max_workers
+        self.broken = set()
+        self.cancelled = set()
+        self.submit_broken = False
+        self.shut_down = False
+        FakePool.created.append(self)
+
+    def submit(self, fn, languages, image_binary):
+        if self.submit_broken:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        if image_binary.decode() in self.broken:
+            future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        elif image_binary.decode() in self.cancelled:
+            future.cancel()
+        else:
+            future.set_result((image_binary.decode(), 1000 + len(FakePool.created),
+                               {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1}))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@patch.object(easyocr_strategy.easyocr, "Reader", FakeReader, create=True)
+class TestReaderCache(unittest.TestCase):
+
+    def test_normalize_languages(self):
+        self.assertEqual(ReaderCache.normalize_languages("pl, en,en"), ('en', 'pl'))
+        self.assertEqual(ReaderCache.normalize_languages(['pl', 'en', '']), ('en', 'pl'))
+
+    def test_hits_and_misses(self):
+        cache = ReaderCache(2)
+
+        reader = cache.get("en,pl")
+
+        self.assertEqual(reader.languages, ['en', 'pl'])
+        # The same language set in another order is the same reader
+        self.assertIs(cache.get("pl,en"), reader)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1})
+
+    def test_least_recently_used_reader_is_evicted(self):
+        cache = ReaderCache(2)
+        english = cache.get("en")
+        cache.get("pl")
+        # Using `en` makes `pl` the least recently used one
+        cache.get("en")
+
+        cache.get("de")
+
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 3, 'evictions': 1, 'size': 2})
+        self.assertIs(cache.get("en"), english)
+        cache.get("pl")
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 4, 'evictions': 2, 'size': 2})
+
+    def test_size_is_at_least_one(self):
+        cache = ReaderCache(0)
+        cache.get("en")
+        self.assertEqual(cache.stats()['size'], 1)
+
+
+@patch.object(easyocr_strategy.easyocr, "Reader", FakeReader, create=True)
+@patch.object(easyocr_strategy, "ProcessPoolExecutor", FakePool)
+@patch.object(EasyOCRStrategy, "readtext", staticmethod(fake_readtext))
+class TestEasyOCRPool(unittest.TestCase):
+
+    def setUp(self):
+        FakePool.created = []
+        reader_cache = patch.object(easyocr_strategy, "reader_cache", ReaderCache(2))
+        reader_cache.start()
+        self.addCleanup(reader_cache.stop)
+        self.strategy = EasyOCRStrategy()
+        self.pages = [FakePage(f"page {i}") for i in range(1, 6)]
+
+    def test_parallel_pages_come_in_order(self):
+        texts = list(self.strategy._readtext_parallel(iter(self.pages), ('en',), 2))
+
+        self.assertEqual(texts, [f"page {i}" for i in range(1, 6)])
+        self.assertEqual(len(FakePool.created), 1)
+        self.assertEqual(FakePool.created[0].max_workers, 2)
+        # The pool is kept for the next tasks
+        list(self.strategy._readtext_parallel(iter(self.pages), ('en',), 2))
+        self.assertEqual(len(FakePool.created), 1)
+
+    def test_pages_of_a_dead_pool_process_are_ocred_in_process(self):
+        pool = self.strategy._get_pool(2)
+        pool.broken = {"page 2"}
+
+        texts = list(self.strategy._readtext_parallel(iter(self.pages), ('en',), 2))
+
+        self.assertEqual(texts, [f"page {i}" for i in range(1, 6)])
+        self.assertTrue(pool.shut_down)
+        # The in-process fallback used a reader of this process
+        self.assertEqual(easyocr_strategy.reader_cache.stats()['misses'], 1)
+        # The next task gets a new pool
+        list(self.strategy._readtext_parallel(iter(self.pages[:1]), ('en',), 2))
+        self.assertIsNot(self.strategy._pool, pool)
+
+    def test_pages_of_a_replaced_pool_keep_the_replacement(self):
+        pages = [FakePage(f"page {i}") for i in range(1, 9)]
+        pool = self.strategy._get_pool(2)
+        # Pages 1-4 are submitted before the failure of page 1 is seen; page 5 goes to the replacement already
+        pool.broken = {"page 1", "page 3"}
+        pool.cancelled = {"page 4"}
+
+        texts = list(self.strategy._readtext_parallel(iter(pages), ('en',), 2))
+
+        self.assertEqual(texts, [f"page {i}" for i in range(1, 9)])
+        self.assertEqual(len(FakePool.created), 2)
+        replacement = FakePool.created[1]
+        self.assertIs(self.strategy._pool, replacement)
+        self.assertFalse(replacement.shut_down)
+        self.assertEqual(easyocr_strategy.reader_cache.stats()['hits'], 2)
+
+    def test_broken_pool_is_replaced_on_submit(self):
+        pool = self.strategy._get_pool(2)
+        pool.submit_broken = True
+
+        texts = list(self.strategy._readtext_parallel(iter(self.pages), ('en',), 2))
+
+        self.assertEqual(texts, [f"page {i}" for i in range(1, 6)])
+        self.assertTrue(pool.shut_down)
+        self.assertEqual(len(FakePool.created), 2)
+        self.assertIs(self.strategy._pool, FakePool.created[1])
+
+    def test_reset_keeps_a_pool_replaced_already(self):
+        broken = self.strategy._get_pool(2)
+        self.strategy._reset_pool(broken)
+        replacement = self.strategy._get_pool(2)
+
+        self.strategy._reset_pool(broken)
+
+        self.assertIs(self.strategy._pool, replacement)
+        self.assertFalse(replacement.shut_down)
+
+    def test_shutdown(self):
+        pool = self.strategy._get_pool(2)
+
+        self.strategy.shutdown()
+
+        self.assertTrue(pool.shut_down)
+        self.assertIsNone(self.strategy._pool)
+        # Nothing to shut down twice
+        self.strategy.shutdown()
+
+    def test_reader_cache_stats_include_the_pool_processes(self):
+        easyocr_strategy.reader_cache.get("en")
+        easyocr_strategy.reader_cache.get("en")
+        self.strategy._pool_cache_stats = {
+            101: {'hits': 3, 'misses': 1, 'evictions': 0, 'size': 1},
+            102: {'hits': 2, 'misses': 2, 'evictions': 1, 'size': 1},
+        }
+
+        self.assertEqual(self.strategy.reader_cache_stats(), {'hits': 6, 'misses': 4, 'evictions': 1, 'size': 3})
+
+    def test_pool_processes_report_their_reader_cache_stats(self):
+        list(self.strategy._readtext_parallel(iter(self.pages), ('en',), 2))
+
+        # The last stats reported by every pool process replace its previous ones
+        self.assertEqual(self.strategy.reader_cache_stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1})
+
+    def test_serial_path_without_pool_size(self):
+        texts = list(self.strategy._readtext_serial(iter(self.pages), ('en',)))
+
+        self.assertEqual(texts, [f"page {i}" for i in range(1, 6)])
+        self.assertEqual(FakePool.created, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import pathlib
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Strategies import the `extract` package relative to text_extract_api - as the app (celery_app) sets it up
+sys.path.insert(0, str(pathlib.Path(__file__).parents[4] / "text_extract_api"))
+
+import ollama
+
+from text_extract_api.extract.strategies.ollama import OllamaStrategy
+
+
+class FakePage:
+    def __init__(self, number: int):
+        self.hash = f"hash-{number}"
+        self.binary = f"page {number}".encode()
+
+
+class FakeAsyncClient:
+    """
+    Replies with the text of the sent pages - later pages reply sooner, so the requests finish out of order.
+    """
+
+    def __init__(self, failing_page: bytes = None, delimiter: str = OllamaStrategy.PAGE_DELIMITER):
+        self.failing_page = failing_page
+        self.delimiter = delimiter
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+
+    async def chat(self, model, messages, stream=False):
+        images = messages[0]['images']
+        self.requests.append(images)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01 * (10 - int(images[0].split()[-1])))
+            if self.failing_page in images:
+                raise ollama.ResponseError("model crashed", 500)
+        finally:
+            self.in_flight -= 1
+        reply = f"\n{self.delimiter}\n".join(image.decode() for image in images)
+        return self._stream(reply)
+
+    @staticmethod
+    async def _stream(reply: str):
+        for i in range(0, len(reply), 4):
+            yield {'message': {'content': reply[i:i + 4]}}
+
+
+class TestOllamaBatches(unittest.TestCase):
+
+    def setUp(self):
+        self.strategy = OllamaStrategy()
+        self.strategy.set_strategy_config({'model': 'llama3.2-vision', 'prompt': 'OCR this'})
+        self.delimiter = OllamaStrategy.PAGE_DELIMITER
+
+    def test_split_well_formed_reply(self):
+        reply = f"first page\n{self.delimiter}\nsecond page\n  {self.delimiter}\t\nthird page"
+        self.assertEqual(self.strategy.split_batch_reply(reply, 3), ["first page", "second page", "third page"])
+        # A single page is never split
+        self.assertEqual(self.strategy.split_batch_reply(f"a {self.delimiter} b", 1), [f"a {self.delimiter} b"])
+
+    def test_split_reply_with_trailing_separator(self):
+        reply = f"first page\n{self.delimiter}\nsecond page\n{self.delimiter}\n"
+        self.assertEqual(self.strategy.split_batch_reply(reply, 2), ["first page", "second page"])
+
+    def test_split_reply_with_missing_separator(self):
+        reply = f"first page\nsecond page\n{self.delimiter}\nthird page"
+        self.assertEqual(self.strategy.split_batch_reply(reply, 3), [])
+
+    def test_split_reply_with_extra_separator(self):
+        reply = f"first page\n{self.delimiter}\nsecond\n{self.delimiter}\npage\n{self.delimiter}\nthird page"
+        self.assertEqual(self.strategy.split_batch_reply(reply, 3), [])
+
+    def test_next_batch(self):
+        images = iter([FakePage(i) for i in range(1, 6)])
+
+        self.assertEqual([page_hash for page_hash, _, _ in self.strategy._next_batch(images, 2)],
+                         ["hash-1", "hash-2"])
+        self.assertEqual(self.strategy._next_batch(images, 2),
+                         [("hash-3", None, b"page 3"), ("hash-4", None, b"page 4")])
+        self.assertEqual(self.strategy._next_batch(images, 2), [("hash-5", None, b"page 5")])
+        self.assertEqual(self.strategy._next_batch(images, 2), [])
+
+    def test_next_batch_skips_preparing_cached_pages(self):
+        self.strategy.set_page_cache({"hash-2": "cached page 2"})
+
+        with patch.object(self.strategy, "_prepare_image", side_effect=lambda image: image.binary) as prepare:
+            batch = self.strategy._next_batch(iter([FakePage(i) for i in range(1, 4)]), 3)
+
+        self.assertEqual(batch, [("hash-1", None, b"page 1"), ("hash-2", "cached page 2", b""),
+                                 ("hash-3", None, b"page 3")])
+        self.assertEqual(prepare.call_count, 2)
+
+
+class TestOllamaAsyncExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.strategy = OllamaStrategy()
+        self.strategy.set_strategy_config({'model': 'llama3.2-vision', 'prompt': 'OCR this'})
+        self.strategy.set_update_state_callback(MagicMock())
+        self.output_stream = MagicMock()
+        self.strategy.set_output_stream(self.output_stream)
+
+    def extract(self, client: FakeAsyncClient, num_pages: int, concurrency: int, batch_size: int = 1) -> str:
+        images = iter([FakePage(i) for i in range(1, num_pages + 1)])
+        with patch.object(ollama, "AsyncClient", lambda: client):
+            return asyncio.run(self.strategy._extract_text_async(images, num_pages, time.time(), concurrency,
+                                                                 batch_size))
+
+    def test_pages_come_in_order(self):
+        client = FakeAsyncClient()
+
+        text = self.extract(client, 6, concurrency=3)
+
+        self.assertEqual(text, "".join(f"page {i}" for i in range(1, 7)))
+        self.assertEqual([call.args[0] for call in self.output_stream.page.call_args_list], [1, 2, 3, 4, 5, 6])
+        self.assertEqual([call.args[0] for call in self.output_stream.chunk.call_args_list],
+                         [f"page {i}" for i in range(1, 7)])
+
+    def test_concurrency_limit(self):
+        client = FakeAsyncClient()
+
+        self.extract(client, 8, concurrency=3)
+
+        self.assertEqual(len(client.requests), 8)
+        self.assertEqual(client.max_in_flight, 3)
+
+    def test_batches(self):
+        client = FakeAsyncClient()
+
+        text = self.extract(client, 5, concurrency=2, batch_size=2)
+
+        self.assertEqual(text, "".join(f"page {i}" for i in range(1, 6)))
+        self.assertEqual([len(images) for images in client.requests], [2, 2, 1])
+
+    def test_batch_reply_without_separators_is_retried_page_by_page(self):
+        client = FakeAsyncClient(delimiter="---")
+
+        text = self.extract(client, 3, concurrency=1, batch_size=3)
+
+        self.assertEqual(text, "".join(f"page {i}" for i in range(1, 4)))
+        self.assertEqual([len(images) for images in client.requests], [3, 1, 1, 1])
+
+    def test_page_error_fails_the_extraction(self):
+        client = FakeAsyncClient(failing_page=b"page 3")
+
+        with self.assertRaisesRegex(Exception, "Failed to generate text with Ollama model llama3.2-vision"):
+            self.extract(client, 6, concurrency=2)
+
+        # The pages before the failed one were streamed, none after it
+        self.assertEqual([call.args[0] for call in self.output_stream.page.call_args_list], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import pathlib
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Strategies import the `extract` package relative to text_extract_api - as the app (celery_app) sets it up
+sys.path.insert(0, str(pathlib.Path(__file__).parents[4] / "text_extract_api"))
+
+from text_extract_api.extract.strategies.remote import RemoteStrategy
+from text_extract_api.files.converters.pdf_to_jpeg import PdfToJpegConverter
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+
+
+def remote_reply(url, files, data, timeout):
+    response = MagicMock(status_code=200)
+    response.json.return_value = {'output': files['file'][1].decode().removeprefix('%PDF-1.4 ')}
+    return response
+
+
+def extract_pages(pdf_file, first_page, last_page):
+    return PdfFileFormat(f"%PDF-1.4 pages {first_page}-{last_page}".encode(), pdf_file.filename, pdf_file.mime_type)
+
+
+@patch.object(PdfToJpegConverter, "count_pages", staticmethod(lambda file_format: 5))
+class TestRemoteStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf = PdfFileFormat(b"%PDF-1.4 fake", "document.pdf", "application/pdf")
+        self.strategy = RemoteStrategy()
+        self.strategy.set_strategy_config({'url': 'http://remote/marker/upload', 'chunk_size': 2, 'concurrency': 2})
+
+    def test_page_chunks(self):
+        self.assertEqual(self.strategy._page_chunks(self.pdf), [(1, 2), (3, 4), (5, 5)])
+        self.assertEqual(self.strategy._page_chunks(self.pdf.with_page_range(2, 4)), [(2, 3), (4, 4)])
+
+    def test_whole_document_without_chunk_size(self):
+        self.strategy.set_strategy_config({'url': 'http://remote/marker/upload'})
+        self.assertEqual(self.strategy._page_chunks(self.pdf), [None])
+
+    def test_chunks_are_joined_in_page_order(self):
+        session = MagicMock()
+        session.post.side_effect = remote_reply
+        with patch.object(self.strategy, 'session', return_value=session), \
+                patch.object(PdfFileFormat, 'extract_pages', extract_pages):
+            result = self.strategy.extract_text(self.pdf)
+
+        # Every request uploads only the pages of its range
+        self.assertEqual(result.text, "pages 1-2\n\npages 3-4\n\npages 5-5")
+        self.assertEqual(session.post.call_count, 3)
+        self.assertNotIn('page_range', session.post.call_args.kwargs['data'])
+
+    def test_whole_document_is_sent_at_once_without_chunk_size(self):
+        self.strategy.set_strategy_config({'url': 'http://remote/marker/upload'})
+        session = MagicMock()
+        session.post.side_effect = remote_reply
+        with patch.object(self.strategy, 'session', return_value=session):
+            result = self.strategy.extract_text(self.pdf)
+
+        self.assertEqual(result.text, "fake")
+
+
+if __name__ == "__main__":
+    unittest.main()
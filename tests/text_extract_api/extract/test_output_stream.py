@@ -0,0 +1,49 @@
+import json
+import unittest
+
+import fakeredis
+
+from text_extract_api.extract.output_stream import OutputStream
+
+
+class TestOutputStream(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        self.stream = OutputStream(self.redis, "task-1", ttl=60, flush_interval=60)
+
+    def events(self):
+        return [(event, json.loads(data)) for _, event, data in
+                OutputStream.decode_events(self.redis.xrange(OutputStream.stream_key("task-1")))]
+
+    def test_chunks_are_coalesced_until_page_boundary(self):
+        self.stream.page(1)
+        self.stream.chunk("Hel")
+        self.stream.chunk("lo")
+        self.stream.page(2)
+        self.stream.chunk("World")
+        self.stream.done()
+
+        self.assertEqual(self.events(), [
+            ("page", {"page": 1, "source": "ocr"}),
+            ("chunk", {"text": "Hello", "source": "ocr"}),
+            ("page", {"page": 2, "source": "ocr"}),
+            ("chunk", {"text": "World", "source": "ocr"}),
+            ("done", {"state": "SUCCESS"}),
+        ])
+        self.assertGreater(self.redis.ttl(OutputStream.stream_key("task-1")), 0)
+
+    def test_source_change_flushes_chunks(self):
+        self.stream.chunk("OCR text")
+        self.stream.chunk("LLM text", source="llm")
+        self.stream.error("Failed")
+
+        self.assertEqual(self.events(), [
+            ("chunk", {"text": "OCR text", "source": "ocr"}),
+            ("chunk", {"text": "LLM text", "source": "llm"}),
+            ("error", {"message": "Failed"}),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
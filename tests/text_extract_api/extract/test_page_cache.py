@@ -0,0 +1,30 @@
+import unittest
+
+import fakeredis
+
+from text_extract_api.cache.ocr_cache import OcrCache
+from text_extract_api.extract.page_cache import PageCache
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.ocr_cache = OcrCache(fakeredis.FakeStrictRedis(), max_bytes=0, default_ttl=0, memory_max_bytes=0)
+
+    def test_hits_and_misses(self):
+        cache = PageCache(self.ocr_cache, "easyocr", {'language': 'en'})
+        self.assertIsNone(cache.get("page-1"))
+        cache.set("page-1", "text of page 1")
+        self.assertEqual(cache.get("page-1"), "text of page 1")
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_key_depends_on_params(self):
+        english = PageCache(self.ocr_cache, "easyocr", {'language': 'en'})
+        german = PageCache(self.ocr_cache, "easyocr", {'language': 'de'})
+        english.set("page-1", "text of page 1")
+        self.assertIsNone(german.get("page-1"))
+        self.assertEqual(PageCache(self.ocr_cache, "easyocr", {'language': 'en'}).get("page-1"), "text of page 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
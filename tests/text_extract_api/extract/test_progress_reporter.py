@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+
+from text_extract_api.extract.progress_reporter import ProgressReporter
+
+
+class TestProgressReporter(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        self.update_state = MagicMock()
+        self.progress = ProgressReporter(self.update_state, self.redis, "task-1", start_time=100.0, min_interval=10)
+
+    def written(self):
+        return [(call.kwargs["state"], call.kwargs["meta"].get("status")) for call in self.update_state.call_args_list]
+
+    @patch("text_extract_api.extract.progress_reporter.time.monotonic")
+    def test_updates_are_coalesced(self, monotonic):
+        monotonic.return_value = 1000
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 1", "elapsed_time": 1})
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 2"})
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 3"})
+        self.assertEqual(self.written(), [("PROGRESS", "chunk 1")])
+        self.assertEqual(self.update_state.call_args.kwargs["meta"], {"progress": 30, "status": "chunk 1",
+                                                                      "start_time": 100.0})
+
+        monotonic.return_value = 1011
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 4"})
+        self.assertEqual(self.written()[-1], ("PROGRESS", "chunk 4"))
+
+    def test_final_state_is_always_written(self):
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 1"})
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 2"})
+        self.progress.update_state(state="DONE", meta={"progress": 100, "status": "Processing done!"})
+        self.assertEqual(self.written(), [("PROGRESS", "chunk 1"), ("DONE", "Processing done!")])
+
+    def test_flush_writes_pending_update(self):
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 1"})
+        self.progress.update_state(state="PROGRESS", meta={"progress": 30, "status": "chunk 2"})
+        self.progress.flush()
+        self.progress.flush()
+        self.assertEqual(self.written(), [("PROGRESS", "chunk 1"), ("PROGRESS", "chunk 2")])
+
+    def test_texts_are_referenced(self):
+        key = self.progress.store_text("extracted_text", "Long text")
+        self.progress.update_state(state="PROGRESS", meta={"progress": 50}, force=True)
+
+        self.assertEqual(self.redis.get(key), b"Long text")
+        self.assertEqual(self.update_state.call_args.kwargs["meta"]["extracted_text_key"], key)
+
+
+if __name__ == "__main__":
+    unittest.main()
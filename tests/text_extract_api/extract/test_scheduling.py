@@ -0,0 +1,66 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+
+from text_extract_api.extract.scheduling import PRIORITY_SEPARATOR, QueueDepth, broker_priority, lane_depths, \
+    lane_queues, lane_tenants, tenant_lane, validate_priority
+
+
+@patch.dict(os.environ, {'OCR_TENANT_LANES': '4', 'OCR_INTERACTIVE_PRIORITY': '8', 'OCR_DEFAULT_PRIORITY': '5'})
+class TestScheduling(unittest.TestCase):
+
+    def test_tenants_keep_their_lane(self):
+        lane = tenant_lane('ocr_io', 'acme', 5)
+        self.assertIn(lane, lane_queues('ocr_io'))
+        self.assertEqual(tenant_lane('ocr_io', 'acme', 1), lane)
+        self.assertEqual(tenant_lane('ocr_io', None, 5), tenant_lane('ocr_io', 'default', 5))
+
+    def test_pinned_tenants_have_their_lane_alone(self):
+        tenants = [f"tenant-{i}" for i in range(20)]
+        with patch.dict(os.environ, {'OCR_TENANT_LANE_MAP': 'acme:0, globex:1'}):
+            self.assertEqual(tenant_lane('ocr_io', 'acme', 5), 'ocr_io.t0')
+            self.assertEqual(tenant_lane('ocr_io', 'globex', 5), 'ocr_io.t1')
+            self.assertEqual({tenant_lane('ocr_io', tenant, 5) for tenant in tenants}, {'ocr_io.t2', 'ocr_io.t3'})
+            self.assertEqual(lane_tenants(['acme', 'globex'] + tenants)['t0'], ['acme'])
+
+        with patch.dict(os.environ, {'OCR_TENANT_LANE_MAP': 'acme:4'}), self.assertRaises(ValueError):
+            tenant_lane('ocr_io', 'acme', 5)
+
+    def test_lane_tenants(self):
+        lanes = lane_tenants(['acme', 'globex', 'initech'])
+        self.assertEqual(sorted(tenant for tenants in lanes.values() for tenant in tenants),
+                         ['acme', 'globex', 'initech'])
+        self.assertEqual(lanes[tenant_lane('ocr_io', 'acme', 5).split('.')[1]][0], 'acme')
+
+    def test_interactive_lane(self):
+        self.assertEqual(tenant_lane('ocr_io', 'acme', 8), 'ocr_io.interactive')
+        self.assertEqual(tenant_lane('ocr_io', 'acme', 9, interactive=False), tenant_lane('ocr_io', 'acme', 5))
+
+    def test_priorities(self):
+        self.assertEqual(validate_priority(None), 5)
+        self.assertEqual(broker_priority(9), 0)
+        with self.assertRaises(ValueError):
+            validate_priority(10)
+
+    def test_lane_depths(self):
+        broker = fakeredis.FakeStrictRedis()
+        broker.rpush('ocr_io.t0', 'a')
+        broker.rpush(f'ocr_io.t0{PRIORITY_SEPARATOR}4', 'b', 'c')
+        broker.rpush(f'ocr_io.t1{PRIORITY_SEPARATOR}9', 'd')
+        # Not a priority list of the lane
+        broker.rpush('ocr_io.t1:4', 'e')
+        self.assertEqual(lane_depths(broker, ['ocr_io.t0', 'ocr_io.t1']), {'ocr_io.t0': 3, 'ocr_io.t1': 1})
+
+    def test_queue_depth(self):
+        depth = QueueDepth(fakeredis.FakeStrictRedis())
+        depth.enqueued('acme', 2)
+        depth.enqueued(None)
+        depth.started('acme')
+        depth.started(None)
+        self.assertEqual(depth.tenants(), {'acme': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import fakeredis
+
+from text_extract_api.extract.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.single_flight = SingleFlight(fakeredis.FakeStrictRedis(), lease_ttl=30)
+
+    def test_only_first_owner_acquires(self):
+        self.assertTrue(self.single_flight.acquire("document", "task-1"))
+        self.assertFalse(self.single_flight.acquire("document", "task-2"))
+        self.assertEqual(self.single_flight.owner("document"), "task-1")
+
+    def test_release_only_by_owner(self):
+        self.single_flight.acquire("document", "task-1")
+        self.single_flight.release("document", "task-2")
+        self.assertEqual(self.single_flight.owner("document"), "task-1")
+        self.single_flight.release("document", "task-1")
+        self.assertIsNone(self.single_flight.owner("document"))
+
+    def test_lease(self):
+        with self.single_flight.lease("document", "task-1") as is_leader:
+            self.assertTrue(is_leader)
+            with self.single_flight.lease("document", "task-2") as is_follower_leader:
+                self.assertFalse(is_follower_leader)
+            self.assertEqual(self.single_flight.owner("document"), "task-1")
+        self.assertIsNone(self.single_flight.owner("document"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from celery import Celery, states
+from celery.backends.cache import CacheBackend
+
+from text_extract_api.extract.task_results import fetch_task_metas, summarize_task
+
+
+class TestTaskResults(unittest.TestCase):
+
+    def setUp(self):
+        app = Celery("test")
+        self.backend = CacheBackend(app=app, backend="memory://")
+
+    def test_fetch_task_metas_keeps_order(self):
+        self.backend.store_result("task-1", "text", states.SUCCESS)
+        self.backend.store_result("task-3", {"progress": 30, "status": "Extracting text from file"}, "PROGRESS")
+
+        metas = fetch_task_metas(self.backend, ["task-1", "task-2", "task-3"])
+
+        self.assertEqual([meta["task_id"] for meta in metas], ["task-1", "task-2", "task-3"])
+        self.assertEqual([meta["status"] for meta in metas], [states.SUCCESS, states.PENDING, "PROGRESS"])
+
+    def test_summarize_task(self):
+        self.backend.store_result("task-1", "text", states.SUCCESS)
+        self.backend.store_result("task-2", ValueError("broken file"), states.FAILURE)
+        self.backend.store_result("task-3", {"progress": 120, "status": "LLM Processing chunk no: 120"}, "PROGRESS")
+
+        succeeded, failed, in_progress = [summarize_task(meta) for meta in
+                                          fetch_task_metas(self.backend, ["task-1", "task-2", "task-3"])]
+
+        self.assertEqual((succeeded["progress"], succeeded["result"]), (100, "text"))
+        self.assertEqual((failed["state"], failed["status"]), (states.FAILURE, "broken file"))
+        self.assertEqual(in_progress["progress"], 99)
+        self.assertNotIn("result", summarize_task(fetch_task_metas(self.backend, ["task-1"])[0], False))
+
+
+if __name__ == "__main__":
+    unittest.main()
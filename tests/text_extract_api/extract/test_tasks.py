@@ -0,0 +1,137 @@
+import json
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+
+from text_extract_api.cache.cache_key import build_cache_key
+from text_extract_api.cache.ocr_cache import OcrCache
+from text_extract_api.extract import tasks
+from text_extract_api.extract.output_stream import OutputStream
+from text_extract_api.extract.progress_reporter import ProgressReporter
+from text_extract_api.extract.scheduling import QueueDepth
+from text_extract_api.extract.single_flight import SingleFlight
+
+REQUEST_KEY = "request:easyocr:abc"
+DOCUMENT_KEY = build_cache_key('document', 'easyocr', 'abc', {'language': 'en'})
+
+
+def run_task(task, task_id: str, *args, **kwargs):
+    """
+    Runs the body of a bound task in the worker's request context - without the result backend.
+    """
+    task.push_request(id=task_id, delivery_info={'routing_key': 'ocr_cpu.t1', 'priority': 4})
+    try:
+        with patch.object(task, "update_state"):
+            return task.run(*args, **kwargs)
+    finally:
+        task.pop_request()
+
+
+class TestTasks(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        self.single_flight = SingleFlight(self.redis)
+        self.cache = OcrCache(self.redis)
+        for name, value in (('redis_client', self.redis), ('single_flight', self.single_flight),
+                            ('cache', self.cache), ('queue_depth', QueueDepth(self.redis))):
+            patcher = patch.object(tasks, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def events(self, task_id: str):
+        return [(event, json.loads(data)) for _, event, data in
+                OutputStream.decode_events(self.redis.xrange(OutputStream.stream_key(task_id)))]
+
+    def split_document(self):
+        """
+        Runs an `ocr_task` of a document split into 3 page ranges - returns the chord it's replaced with.
+        """
+        strategy = MagicMock()
+        strategy.cache_params.return_value = {'language': 'en'}
+        strategy.get_config_value.return_value = None
+        strategy.page_ranges.return_value = [(1, 10), (11, 20), (21, 25)]
+        with patch.object(tasks.Strategy, "get_strategy", return_value=strategy), \
+                patch.object(tasks, "load_document"), \
+                patch.object(tasks.ocr_task, "replace", side_effect=lambda signature: signature):
+            return run_task(tasks.ocr_task, "task-1", "blob", "easyocr", "document.pdf", "abc", True,
+                            language="en", request_key=REQUEST_KEY)
+
+    def test_split_document_hands_the_lease_over_to_the_merge_task(self):
+        self.single_flight.acquire(REQUEST_KEY, "task-1")
+
+        split = self.split_document()
+
+        self.assertEqual([signature.args[2:4] for signature in split.tasks], [(1, 10), (11, 20), (21, 25)])
+        self.assertEqual(split.tasks[0].options['queue'], 'ocr_cpu.t1')
+        self.assertEqual(self.single_flight.owner(DOCUMENT_KEY), "task-1:merge")
+        self.assertEqual(split.body.args[-1], "task-1:merge")
+
+        with patch.object(tasks.Strategy, "get_strategy", return_value=tasks.Strategy()):
+            text = run_task(tasks.ocr_merge_task, "task-1", ["pages 1-10", "pages 11-20", "pages 21-25"],
+                            *split.body.args, **split.body.kwargs)
+
+        # Texts of the ranges are joined in page order, cached and the leases released
+        self.assertEqual(text, "pages 1-10pages 11-20pages 21-25")
+        self.assertEqual(self.cache.get(DOCUMENT_KEY), text)
+        self.assertIsNone(self.single_flight.owner(DOCUMENT_KEY))
+        self.assertIsNone(self.single_flight.owner(REQUEST_KEY))
+        self.assertEqual(self.events("task-1")[-1], ("done", {'state': 'SUCCESS'}))
+
+    def test_failed_page_range_releases_the_leases(self):
+        self.single_flight.acquire(REQUEST_KEY, "task-1")
+        split = self.split_document()
+        # As the result backend does when a part of the chord fails
+        request = types.SimpleNamespace(id="task-1", errbacks=split.body.options['link_error'], delivery_info={})
+
+        tasks.celery_app.backend._call_task_errbacks(request, RuntimeError("Page 15 could not be rendered"), None)
+
+        self.assertIsNone(self.single_flight.owner(DOCUMENT_KEY))
+        self.assertIsNone(self.single_flight.owner(REQUEST_KEY))
+        self.assertEqual(self.events("task-1")[-1], ("error", {'message': "Page 15 could not be rendered"}))
+
+    def test_finished_task_releases_the_request(self):
+        self.single_flight.acquire(REQUEST_KEY, "task-1")
+        progress = ProgressReporter(MagicMock(), self.redis, "task-1", start_time=100.0)
+
+        tasks.finish_ocr(progress, OutputStream(self.redis, "task-1"), "text", "document.pdf", None, None, None,
+                         None, request_key=REQUEST_KEY)
+
+        self.assertIsNone(self.single_flight.owner(REQUEST_KEY))
+
+    def test_pending_progress_is_written_when_the_extraction_fails(self):
+        update_state = MagicMock()
+        progress = ProgressReporter(update_state, self.redis, "task-1", start_time=100.0, min_interval=60)
+        strategy = MagicMock()
+
+        def extract_text(file_format, language):
+            progress.update_state(state='PROGRESS', meta={'progress': 30, 'status': 'page 1'})
+            progress.update_state(state='PROGRESS', meta={'progress': 35, 'status': 'page 2'})
+            raise RuntimeError("OCR failed")
+
+        strategy.extract_text.side_effect = extract_text
+
+        with self.assertRaises(RuntimeError):
+            tasks.extract_text(progress, strategy, MagicMock(), 'en')
+
+        self.assertEqual(update_state.call_args.kwargs['meta']['status'], 'page 2')
+
+    def test_failed_task_releases_the_request(self):
+        self.single_flight.acquire(REQUEST_KEY, "task-1")
+
+        tasks.ocr_task.on_failure(RuntimeError("OCR failed"), "task-1", [], {'request_key': REQUEST_KEY}, None)
+
+        self.assertIsNone(self.single_flight.owner(REQUEST_KEY))
+
+    def test_request_taken_over_by_another_task_is_kept(self):
+        self.single_flight.acquire(REQUEST_KEY, "task-2")
+
+        tasks.ocr_task.on_failure(RuntimeError("OCR failed"), "task-1", [], {'request_key': REQUEST_KEY}, None)
+
+        self.assertEqual(self.single_flight.owner(REQUEST_KEY), "task-2")
+
+
+if __name__ == '__main__':
+    unittest.main()
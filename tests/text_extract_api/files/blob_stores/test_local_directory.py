@@ -0,0 +1,41 @@
+import os
+import tempfile
+import time
+import unittest
+
+from text_extract_api.files.blob_stores.local_directory import LocalDirectoryBlobStore
+
+
+class TestLocalDirectoryBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.store = LocalDirectoryBlobStore(self.temp_dir.name, ttl=60)
+
+    def test_put_get_delete(self):
+        self.assertTrue(self.store.put("abcdef", b"content"))
+        self.assertTrue(self.store.exists("abcdef"))
+        self.assertEqual(self.store.get("abcdef"), b"content")
+        self.store.delete("abcdef")
+        with self.assertRaises(KeyError):
+            self.store.get("abcdef")
+
+    def test_identical_uploads_are_stored_once(self):
+        self.assertTrue(self.store.put("abcdef", b"content"))
+        self.assertFalse(self.store.put("abcdef", b"content"))
+
+    def test_purge_expired(self):
+        self.store.put("abcdef", b"content")
+        expired = time.time() - 120
+        os.utime(os.path.join(self.temp_dir.name, "ab", "abcdef"), (expired, expired))
+        self.store.purge_expired()
+        self.assertFalse(self.store.exists("abcdef"))
+
+    def test_rejects_path_traversal(self):
+        with self.assertRaises(ValueError):
+            self.store.put("../etc", b"content")
+
+
+if __name__ == "__main__":
+    unittest.main()
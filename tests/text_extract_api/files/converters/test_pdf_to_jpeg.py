@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+
+from PIL import Image
+
+from text_extract_api.files.converters.pdf_to_jpeg import PdfToJpegConverter
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+
+
+def render_pages(pdf_file, first_page, last_page):
+    return [Image.new("RGB", (4, 4)) for _ in range(first_page, last_page + 1)]
+
+
+class TestPdfToJpegConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf = PdfFileFormat(b"%PDF-1.4 fake", "document.pdf", "application/pdf")
+
+    @patch.object(PdfToJpegConverter, "PAGES_WINDOW_SIZE", 2)
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_bytes", return_value={"Pages": 5})
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.convert_from_bytes", side_effect=render_pages)
+    def test_convert_renders_page_windows(self, mock_convert, mock_pdfinfo):
+        pages = list(PdfToJpegConverter.convert(self.pdf))
+
+        self.assertEqual(
+            [page.filename for page in pages],
+            [f"document.pdf_page_{i}.jpg" for i in range(1, 6)]
+        )
+        self.assertEqual(
+            [(call.kwargs["first_page"], call.kwargs["last_page"]) for call in mock_convert.call_args_list],
+            [(1, 2), (3, 4), (5, 5)]
+        )
+
+    @patch.object(PdfToJpegConverter, "PAGES_WINDOW_SIZE", 2)
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_bytes", return_value={"Pages": 5})
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.convert_from_bytes", side_effect=render_pages)
+    def test_convert_is_lazy(self, mock_convert, mock_pdfinfo):
+        pages = self.pdf.iterator(None)
+        next(pages)
+        mock_convert.assert_called_once()
+
+    @patch.object(PdfToJpegConverter, "PAGES_WINDOW_SIZE", 2)
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_bytes", return_value={"Pages": 5})
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.convert_from_bytes", side_effect=render_pages)
+    def test_convert_page_range(self, mock_convert, mock_pdfinfo):
+        pdf = self.pdf.with_page_range(2, 4)
+        pages = list(PdfToJpegConverter.convert(pdf))
+
+        self.assertEqual(pdf.page_count, 3)
+        self.assertIsNone(self.pdf.page_range)
+        self.assertEqual([page.filename for page in pages], [f"document.pdf_page_{i}.jpg" for i in range(2, 5)])
+        self.assertEqual(
+            [(call.kwargs["first_page"], call.kwargs["last_page"]) for call in mock_convert.call_args_list],
+            [(2, 3), (4, 4)]
+        )
+
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_bytes", return_value={"Pages": 0})
+    def test_convert_empty_pdf(self, mock_pdfinfo):
+        with self.assertRaises(ValueError):
+            list(PdfToJpegConverter.convert(self.pdf))
+
+
+if __name__ == "__main__":
+    unittest.main()
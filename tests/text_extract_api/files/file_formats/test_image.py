@@ -0,0 +1,35 @@
+import unittest
+from io import BytesIO
+
+from PIL import Image
+
+from text_extract_api.files.file_formats.image import ImageProcessor
+
+
+def image_bytes(size, mode="RGB", image_format="PNG") -> bytes:
+    buffer = BytesIO()
+    Image.new(mode, size).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+class TestImageProcessor(unittest.TestCase):
+
+    def test_resize_image_limits_longer_edge(self):
+        resized = ImageProcessor.resize_image(image_bytes((2000, 1000)), max_edge=500)
+        with Image.open(BytesIO(resized)) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (500, 250))
+
+    def test_resize_image_does_not_upscale(self):
+        resized = ImageProcessor.resize_image(image_bytes((300, 200)), max_edge=500)
+        with Image.open(BytesIO(resized)) as image:
+            self.assertEqual(image.size, (300, 200))
+
+    def test_resize_image_converts_to_rgb(self):
+        resized = ImageProcessor.resize_image(image_bytes((10, 10), mode="P"), quality=50)
+        with Image.open(BytesIO(resized)) as image:
+            self.assertEqual(image.mode, "RGB")
+
+
+if __name__ == "__main__":
+    unittest.main()
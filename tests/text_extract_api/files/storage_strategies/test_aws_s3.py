@@ -0,0 +1,99 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import boto3
+from boto3.exceptions import S3UploadFailedError
+from moto import mock_aws
+
+from text_extract_api.files.storage_strategies.aws_s3 import AWSS3StorageStrategy
+
+BUCKET = 'ocr-results'
+PROFILE = {
+    'strategy': 'aws_s3',
+    'settings': {
+        'bucket_name': BUCKET,
+        'region': 'us-east-1',
+        'access_key': 'testing',
+        'secret_access_key': 'testing',
+        'multipart_threshold': 5 * 1024 * 1024,
+        'multipart_chunksize': 5 * 1024 * 1024,
+        'max_concurrency': 4,
+    }
+}
+
+
+@mock_aws
+class TestAWSS3StorageStrategy(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket=BUCKET)
+        self.storage = AWSS3StorageStrategy(PROFILE)
+
+    def test_save_and_load(self):
+        self.storage.save('document.pdf', '{file_name}.md', 'Extracted text')
+        self.assertEqual(self.storage.load('document.md'), 'Extracted text')
+        self.assertIsNone(self.storage.load('missing.md'))
+
+    def test_failed_save(self):
+        self.storage.bucket_name = 'missing-bucket'
+
+        with self.assertRaisesRegex(RuntimeError, "Error saving file 'document.pdf'"):
+            self.storage.save('document.pdf', '{file_name}.md', 'Extracted text')
+
+        # Failed parts of multipart uploads are reported by the transfer manager
+        error = S3UploadFailedError("Failed to upload document.md: An error occurred (InternalError)")
+        with patch.object(self.storage.s3_client, 'upload_fileobj', side_effect=error), \
+                self.assertRaisesRegex(RuntimeError, "Error saving file 'large.pdf'"):
+            self.storage.save('large.pdf', '{file_name}.md', 'Extracted text')
+
+    def test_multipart_save(self):
+        content = 'x' * (11 * 1024 * 1024)
+        self.storage.save('large.pdf', '{file_name}.md', content)
+
+        head = self.s3.head_object(Bucket=BUCKET, Key='large.md')
+        self.assertEqual(head['ContentLength'], len(content))
+        self.assertTrue(head['ETag'].strip('"').endswith('-3'))  # uploaded in 3 parts
+
+    def test_list_is_paginated(self):
+        self.storage.save_many([(f'doc{i}.pdf', f'results/{{file_name}}.md', str(i)) for i in range(1005)])
+        self.storage.save('other.pdf', '{file_name}.md', 'other')
+
+        self.assertEqual(len(self.storage.list()), 1006)
+        self.assertEqual(len(self.storage.list(prefix='results/')), 1005)
+
+        keys, token = self.storage.list_page(prefix='results/', limit=1000)
+        self.assertEqual(len(keys), 1000)
+        keys, token = self.storage.list_page(prefix='results/', cursor=token, limit=1000)
+        self.assertEqual((len(keys), token), (5, None))
+
+    def test_bulk_load_and_delete(self):
+        self.storage.save_many([(f'doc{i}.pdf', '{file_name}.md', f'text {i}') for i in range(3)])
+
+        self.assertEqual(self.storage.load_many(['doc0.md', 'doc2.md']), {'doc0.md': 'text 0', 'doc2.md': 'text 2'})
+        self.storage.delete_many(['doc0.md', 'doc1.md'])
+        self.assertEqual(self.storage.list(), ['doc2.md'])
+
+
+    def test_open_stream(self):
+        self.storage.save('document.pdf', '{file_name}.md', 'Extracted text')
+
+        info = self.storage.stat('document.md')
+        self.assertEqual(info.size, 14)
+        self.assertEqual(info.etag, self.s3.head_object(Bucket=BUCKET, Key='document.md')['ETag'])
+        self.assertIsNone(self.storage.stat('missing.md'))
+
+        self.assertEqual(b''.join(self.storage.open_stream('document.md')), b'Extracted text')
+        with patch.object(self.storage.s3_client, 'get_object', wraps=self.storage.s3_client.get_object) as get_object:
+            self.assertEqual(b''.join(self.storage.open_stream('document.md', 10, 13)), b'text')
+        self.assertEqual(get_object.call_args.kwargs['Range'], 'bytes=10-13')
+        with self.assertRaises(FileNotFoundError):
+            b''.join(self.storage.open_stream('missing.md'))
+
+
+if __name__ == "__main__":
+    unittest.main()
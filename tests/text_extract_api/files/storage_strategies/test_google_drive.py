@@ -0,0 +1,165 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from text_extract_api.files.storage_strategies.google_drive import GoogleDriveStorageStrategy
+
+PROFILE = {
+    'strategy': 'google_drive',
+    'settings': {
+        'service_account_file': '/storage/gdrive_service_account.json',
+        'folder_id': 'folder',
+        'file_id_cache_ttl': 300,
+    }
+}
+
+
+class TestGoogleDriveStorageStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.service = MagicMock()
+        for patcher in (
+                patch('text_extract_api.files.storage_strategies.google_drive.Credentials'),
+                patch('text_extract_api.files.storage_strategies.google_drive.build', return_value=self.service)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.storage = GoogleDriveStorageStrategy(PROFILE)
+        self.files = self.service.files.return_value
+
+    def test_save_uploads_from_memory(self):
+        self.files.create.return_value.execute.return_value = {'id': 'id-1'}
+
+        with patch('text_extract_api.files.storage_strategies.google_drive.MediaIoBaseUpload') as upload:
+            self.storage.save('document.pdf', '{file_name}.md', 'Extracted text')
+
+        stream = upload.call_args.args[0]
+        self.assertEqual(stream.getvalue(), b'Extracted text')
+        self.files.create.assert_called_once_with(
+            body={'name': 'document.md', 'parents': ['folder']}, media_body=upload.return_value, fields='id')
+
+        # The id of the saved file is known - no name query
+        self.storage.delete('document.md')
+        self.files.list.assert_not_called()
+        self.files.delete.assert_called_once_with(fileId='id-1')
+
+    def test_list_fills_the_index(self):
+        self.files.list.return_value.execute.side_effect = [
+            {'files': [{'id': 'id-2', 'name': 'b.md'}], 'nextPageToken': 'next'},
+            {'files': [{'id': 'id-1', 'name': 'a.md'}]},
+        ]
+
+        self.assertEqual(self.storage.list(), ['b.md', 'a.md'])
+        self.assertEqual(self.files.list.call_args.kwargs['pageToken'], 'next')
+
+        self.files.list.reset_mock()
+        with patch.object(self.storage, '_download', return_value=b'text') as download:
+            self.assertEqual(self.storage.load('a.md'), b'text')
+        download.assert_called_once_with('id-1')
+        self.files.list.assert_not_called()
+
+    def test_list_page(self):
+        self.files.list.return_value.execute.return_value = {
+            'files': [{'id': 'id-1', 'name': 'invoices-2024.md', 'createdTime': '2024-01-01T00:00:00.000Z'},
+                      {'id': 'id-2', 'name': 'my invoices.md', 'createdTime': '2024-01-01T00:00:00.000Z'}],
+            'nextPageToken': 'next'}
+
+        self.assertEqual(self.storage.list_page(prefix='invoices', cursor='token', limit=2),
+                         (['invoices-2024.md'], 'next'))
+        kwargs = self.files.list.call_args.kwargs
+        self.assertEqual((kwargs['q'], kwargs['pageToken'], kwargs['pageSize']),
+                         ("'folder' in parents and name contains 'invoices'", 'token', 2))
+        self.assertEqual(self.storage._file_id('invoices-2024.md'), 'id-1')
+
+    def test_list_page_by_a_prefix_of_many_words(self):
+        self.files.list.return_value.execute.return_value = {
+            'files': [{'id': 'id-1', 'name': 'invoices-2024.md', 'createdTime': '2024-01-01T00:00:00.000Z'},
+                      {'id': 'id-2', 'name': 'invoices-2025.md', 'createdTime': '2025-01-01T00:00:00.000Z'}]}
+
+        self.assertEqual(self.storage.list_page(prefix='invoices-2024', limit=2), (['invoices-2024.md'], None))
+        # `name contains 'invoices-2024'` may not match the names - the whole folder is paged through
+        self.assertEqual(self.files.list.call_args.kwargs['q'], "'folder' in parents")
+
+    def test_list_page_indexes_the_newest_of_duplicate_names(self):
+        self.files.list.return_value.execute.side_effect = [
+            {'files': [{'id': 'id-1', 'name': 'a.md', 'createdTime': '2024-03-01T00:00:00.000Z'},
+                       {'id': 'id-2', 'name': 'b.md', 'createdTime': '2024-03-01T00:00:00.000Z'},
+                       {'id': 'id-3', 'name': 'b.md', 'createdTime': '2024-02-01T00:00:00.000Z'}],
+             'nextPageToken': 'next'},
+            # Older files named as the last one of the previous page
+            {'files': [{'id': 'id-4', 'name': 'b.md', 'createdTime': '2024-01-01T00:00:00.000Z'},
+                       {'id': 'id-5', 'name': 'c.md', 'createdTime': '2024-01-01T00:00:00.000Z'}]},
+        ]
+        self.storage._remember_file_id('a.md', 'saved')
+
+        self.storage.list_page()
+        self.storage.list_page(cursor='next')
+
+        self.assertEqual(self.files.list.call_args.kwargs['orderBy'], 'name,createdTime desc')
+        self.assertEqual({name: self.storage._file_id(name) for name in ('a.md', 'b.md', 'c.md')},
+                         {'a.md': 'saved', 'b.md': 'id-2', 'c.md': 'id-5'})
+
+    def test_expired_ids_are_looked_up_again(self):
+        self.storage.file_id_ttl = -1
+        self.storage._remember_file_id('a.md', 'stale')
+        self.files.list.return_value.execute.return_value = {'files': [{'id': 'id-1', 'name': 'a.md'}]}
+
+        self.storage.delete('a.md')
+        self.assertEqual(self.files.list.call_args.kwargs['q'], "(name = 'a.md') and 'folder' in parents")
+        self.files.delete.assert_called_once_with(fileId='id-1')
+
+    def test_delete_many_is_batched(self):
+        names = [f'doc{i}.md' for i in range(150)]
+        for i, name in enumerate(names):
+            self.storage._remember_file_id(name, f'id-{i}')
+        batches = []
+
+        def new_batch(callback):
+            batch = MagicMock()
+            batch.execute.side_effect = lambda: [callback(request_id, None, None)
+                                                 for request_id in (c.kwargs['request_id'] for c in batch.add.call_args_list)]
+            batches.append(batch)
+            return batch
+
+        self.service.new_batch_http_request.side_effect = new_batch
+        self.storage.delete_many(names)
+
+        self.assertEqual([batch.add.call_count for batch in batches], [100, 50])
+        self.assertEqual(self.storage._file_ids, {})
+
+    def test_load_many_resolves_names_in_one_query(self):
+        self.files.list.return_value.execute.return_value = {'files': [{'id': 'id-1', 'name': "it's.md"}]}
+
+        with patch.object(self.storage, '_download', return_value=b'text'):
+            self.assertEqual(self.storage.load_many(["it's.md", 'missing.md']),
+                             {"it's.md": b'text', 'missing.md': None})
+        self.files.list.assert_called_once()
+        self.assertEqual(self.files.list.call_args.kwargs['q'],
+                         "(name = 'it\\'s.md' or name = 'missing.md') and 'folder' in parents")
+
+    def test_open_stream_downloads_ranges_in_chunks(self):
+        self.storage._remember_file_id('a.md', 'id-1')
+        self.storage.download_chunk_size = 4
+        content = b'Extracted text'
+        ranges = []
+
+        def get_media(fileId):
+            request = MagicMock(headers={})
+
+            def execute():
+                first, last = map(int, request.headers['Range'][len('bytes='):].split('-'))
+                ranges.append((first, last))
+                return content[first:last + 1]
+
+            request.execute.side_effect = execute
+            return request
+
+        self.files.get_media.side_effect = get_media
+        self.files.get.return_value.execute.return_value = {'size': str(len(content))}
+
+        self.assertEqual(b''.join(self.storage.open_stream('a.md')), content)
+        self.assertEqual(ranges, [(0, 3), (4, 7), (8, 11), (12, 13)])
+        self.assertEqual(b''.join(self.storage.open_stream('a.md', 10, 13)), b'text')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from text_extract_api.files.storage_strategies.local_filesystem import LocalFilesystemStorageStrategy
+
+
+class TestLocalFilesystemStorageStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path)
+        self.storage = self.create_storage()
+        for name in ('invoices/2024/b.md', 'invoices/2024/a.md', 'invoices/2025/c.md', 'invoices.md', 'notes/d.md'):
+            self.storage.save(name, '{file_fullname}', f'Text of {name}')
+
+    def create_storage(self, manifest=False):
+        return LocalFilesystemStorageStrategy({
+            'strategy': 'local_filesystem',
+            'settings': {'root_path': self.root_path, 'subfolder_names_format': '', 'manifest': manifest}
+        })
+
+    def relative(self, paths):
+        return [os.path.relpath(path, self.root_path) for path in paths]
+
+    def test_list_is_sorted_by_path(self):
+        self.assertEqual(self.relative(self.storage.list()),
+                         ['invoices.md', 'invoices/2024/a.md', 'invoices/2024/b.md', 'invoices/2025/c.md', 'notes/d.md'])
+
+    def test_list_filters(self):
+        self.assertEqual(self.relative(self.storage.list(prefix='invoices/2024/')),
+                         ['invoices/2024/a.md', 'invoices/2024/b.md'])
+        self.assertEqual(self.relative(self.storage.list(prefix='invoices', limit=2, offset=1)),
+                         ['invoices/2024/a.md', 'invoices/2024/b.md'])
+
+        os.utime(os.path.join(self.root_path, 'notes/d.md'), (0, 0))
+        self.assertEqual(self.relative(self.storage.list(modified_before=datetime(2000, 1, 1))), ['notes/d.md'])
+        self.assertNotIn('notes/d.md', self.relative(self.storage.list(modified_after=datetime(2000, 1, 1))))
+
+    def test_scan_skips_directories_not_matching_the_prefix(self):
+        with patch('os.scandir', wraps=os.scandir) as scandir:
+            self.storage.list(prefix='notes/')
+        self.assertEqual(self.relative(call.args[0] for call in scandir.call_args_list), ['.', 'notes'])
+
+    def test_list_page(self):
+        for storage in (self.storage, self.create_storage(manifest=True)):
+            pages, cursor = [], None
+            while True:
+                files, cursor = storage.list_page(cursor=cursor, limit=2)
+                pages.append(self.relative(files))
+                if cursor is None:
+                    break
+            self.assertEqual(pages, [['invoices.md', 'invoices/2024/a.md'], ['invoices/2024/b.md', 'invoices/2025/c.md'],
+                                     ['notes/d.md']])
+
+        self.assertEqual(self.storage.list_page(prefix='invoices/', limit=2),
+                         (self.storage.list(prefix='invoices/', limit=2), 'invoices/2024/b.md'))
+
+    def test_list_page_skips_listed_directories(self):
+        with patch('os.scandir', wraps=os.scandir) as scandir:
+            files, cursor = self.storage.list_page(cursor='invoices/2025/c.md')
+        self.assertEqual(self.relative(files), ['notes/d.md'])
+        self.assertIsNone(cursor)
+        # invoices/2024 holds only files before the cursor
+        self.assertEqual(self.relative(call.args[0] for call in scandir.call_args_list),
+                         ['.', 'invoices', 'invoices/2025', 'notes'])
+
+    def test_save_is_atomic(self):
+        with patch('os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.storage.save('notes/d.md', '{file_fullname}', 'New text')
+        self.assertEqual(self.storage.load('notes/d.md'), 'Text of notes/d.md')
+        self.assertEqual(os.listdir(os.path.join(self.root_path, 'notes')), ['d.md'])
+
+    def test_open_stream(self):
+        self.storage.save('large.md', '{file_fullname}', 'x' * 100000 + 'tail')
+
+        self.assertEqual(b''.join(self.storage.open_stream('large.md')), b'x' * 100000 + b'tail')
+        self.assertEqual(b''.join(self.storage.open_stream('large.md', 99998, 100001)), b'xxta')
+        self.assertEqual(self.storage.stat('large.md').size, 100004)
+        self.assertIsNone(self.storage.stat('missing.md'))
+
+    def test_manifest(self):
+        storage = self.create_storage(manifest=True)
+        self.assertEqual(storage.list(), self.storage.list())
+
+        storage.save('notes/e.md', '{file_fullname}', 'Text')
+        storage.delete('invoices.md')
+        self.assertEqual(self.relative(storage.list(prefix='notes/')), ['notes/d.md', 'notes/e.md'])
+        self.assertEqual(self.relative(storage.list(limit=1)), ['invoices/2024/a.md'])
+
+        # The listings come from the manifest - no scanning
+        expected = self.storage.list()
+        with patch('os.scandir') as scandir:
+            self.assertEqual(storage.list(), expected)
+        scandir.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from email.utils import formatdate
+
+from text_extract_api.files.byte_ranges import RangeNotSatisfiableError, file_headers, is_not_modified, \
+    requested_range
+from text_extract_api.files.storage_strategies.storage_strategy import StoredFileInfo
+
+INFO = StoredFileInfo(size=1000, modified=1700000000.5, etag='"abc"')
+
+
+class TestByteRanges(unittest.TestCase):
+
+    def test_requested_range(self):
+        self.assertIsNone(requested_range({}, INFO))
+        self.assertEqual(requested_range({'range': 'bytes=0-99'}, INFO), (0, 99))
+        self.assertEqual(requested_range({'range': 'bytes=900-'}, INFO), (900, 999))
+        self.assertEqual(requested_range({'range': 'bytes=900-5000'}, INFO), (900, 999))
+        self.assertEqual(requested_range({'range': 'bytes=-100'}, INFO), (900, 999))
+        self.assertEqual(requested_range({'range': 'bytes=-5000'}, INFO), (0, 999))
+
+    def test_unsupported_ranges_get_the_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'bytes=a-b', 'items=0-1', 'bytes=10-5', 'bytes=-'):
+            self.assertIsNone(requested_range({'range': header}, INFO), header)
+
+    def test_range_not_satisfiable(self):
+        for header in ('bytes=1000-', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiableError):
+                requested_range({'range': header}, INFO)
+        with self.assertRaises(RangeNotSatisfiableError):
+            requested_range({'range': 'bytes=-10'}, INFO._replace(size=0))
+
+    def test_if_range(self):
+        last_modified = file_headers(INFO)['Last-Modified']
+        self.assertEqual(requested_range({'range': 'bytes=0-9', 'if-range': '"abc"'}, INFO), (0, 9))
+        self.assertEqual(requested_range({'range': 'bytes=0-9', 'if-range': last_modified}, INFO), (0, 9))
+        self.assertIsNone(requested_range({'range': 'bytes=0-9', 'if-range': '"changed"'}, INFO))
+        self.assertIsNone(requested_range({'range': 'bytes=0-9', 'if-range': 'W/"abc"'}, INFO))
+        self.assertIsNone(requested_range({'range': 'bytes=0-9', 'if-range': formatdate(0, usegmt=True)}, INFO))
+
+    def test_is_not_modified(self):
+        self.assertTrue(is_not_modified({'if-none-match': '"other", W/"abc"'}, INFO))
+        self.assertFalse(is_not_modified({'if-none-match': '"other"'}, INFO))
+        self.assertTrue(is_not_modified({'if-modified-since': file_headers(INFO)['Last-Modified']}, INFO))
+        self.assertFalse(is_not_modified({'if-modified-since': formatdate(0, usegmt=True)}, INFO))
+        # If-None-Match takes precedence
+        self.assertFalse(is_not_modified({'if-none-match': '"other"',
+                                          'if-modified-since': file_headers(INFO)['Last-Modified']}, INFO))
+        self.assertFalse(is_not_modified({}, INFO))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+from text_extract_api.files.storage_manager import StorageManager
+from text_extract_api.files.storage_strategies.storage_strategy import StorageStrategy
+
+PROFILE = """strategy: local_filesystem
+settings:
+  root_path: {root_path}
+"""
+
+
+class TestStorageManager(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.profile_path = os.path.join(self.directory.name, 'test.yaml')
+        self.write_profile('first')
+        patcher = patch.dict(os.environ, {'STORAGE_PROFILE_PATH': self.directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(StorageManager.clear_cache)
+
+    def write_profile(self, root_path, mtime=None):
+        with open(self.profile_path, 'w') as file:
+            file.write(PROFILE.format(root_path=os.path.join(self.directory.name, root_path)))
+        if mtime is not None:
+            os.utime(self.profile_path, ns=(mtime, mtime))
+
+    def test_profile_is_loaded_once(self):
+        with patch('text_extract_api.files.storage_manager.yaml.safe_load', wraps=yaml.safe_load) as safe_load:
+            manager = StorageManager.get('test')
+            self.assertIs(StorageManager.get('test'), manager)
+        safe_load.assert_called_once()
+
+    def test_changed_profile_is_reloaded(self):
+        manager = StorageManager.get('test')
+        self.write_profile('second', os.stat(self.profile_path).st_mtime_ns + 10 ** 9)
+
+        reloaded = StorageManager.get('test')
+        self.assertIsNot(reloaded, manager)
+        self.assertTrue(reloaded.strategy.base_directory.endswith('second'))
+
+    def test_list_filters(self):
+        self.assertEqual(StorageManager.get('test').list_filters(), ['modified_after', 'modified_before'])
+
+        # The fallback listing supports no filters
+        strategy = StorageStrategy({})
+        self.assertEqual(strategy.list_filters(), [])
+        with patch.object(strategy, 'list', return_value=['b.md', 'a.md']):
+            self.assertEqual(strategy.list_page(), (['a.md', 'b.md'], None))
+            with self.assertRaises(ValueError):
+                strategy.list_page(modified_after=0)
+
+    def test_missing_profile(self):
+        with self.assertRaises(FileNotFoundError):
+            StorageManager.get('missing')
+
+
+if __name__ == "__main__":
+    unittest.main()
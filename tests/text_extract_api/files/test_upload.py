@@ -0,0 +1,50 @@
+import io
+import tempfile
+import unittest
+from hashlib import md5
+from unittest.mock import patch
+
+from PIL import Image
+
+from text_extract_api.files.blob_stores.local_directory import LocalDirectoryBlobStore
+from text_extract_api.files.upload import UploadTooLargeError, store_upload
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestStoreUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.store = LocalDirectoryBlobStore(self.temp_dir.name, ttl=60)
+        patcher = patch("text_extract_api.files.upload.get_blob_store", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("text_extract_api.files.upload.UPLOAD_CHUNK_SIZE", 100)
+    def test_store_upload_streams_to_blob_store(self):
+        content = png_bytes()
+        upload = store_upload(io.BytesIO(content), "image.png")
+
+        self.assertEqual(upload.hash, md5(content).hexdigest())
+        self.assertEqual((upload.filename, upload.mime_type, upload.size), ("image.png", "image/png", len(content)))
+        self.assertEqual(self.store.get(upload.hash), content)
+
+    def test_store_upload_rejects_too_large_files(self):
+        content = png_bytes()
+        with self.assertRaises(UploadTooLargeError):
+            store_upload(io.BytesIO(content), "image.png", max_size=len(content) - 1)
+        self.assertFalse(self.store.exists(md5(content).hexdigest()))
+
+    def test_store_upload_rejects_unsupported_files(self):
+        with self.assertRaises(ValueError):
+            store_upload(io.BytesIO(b"plain text"), "notes.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from text_extract_api.celery_app import DEFAULT_QUEUE, OCR_TASKS, route_task, strategy_queues, worker_settings
+from text_extract_api.extract.scheduling import lane_queues
+
+CONFIG = {
+    'queues': {
+        'ocr_cpu': {'pool': 'solo', 'concurrency': 1, 'prefetch_multiplier': 1},
+        'ocr_io': {'pool': 'threads', 'concurrency': 8, 'prefetch_multiplier': 4},
+    },
+    'strategies': {
+        'easyocr': {'class': 'EasyOCRStrategy', 'queue': 'ocr_cpu'},
+        'remote': {'class': 'RemoteStrategy', 'queue': 'ocr_io'},
+        'custom': {'class': 'CustomStrategy'},
+    },
+}
+
+
+class TestCeleryApp(unittest.TestCase):
+
+    def test_strategy_queues(self):
+        self.assertEqual(strategy_queues(CONFIG), {'easyocr': 'ocr_cpu', 'remote': 'ocr_io', 'custom': DEFAULT_QUEUE})
+
+    def test_worker_consumes_all_queues_by_default(self):
+        settings = worker_settings(CONFIG, None)
+        self.assertEqual([queue.name for queue in settings['task_queues']],
+                         [DEFAULT_QUEUE, *lane_queues(DEFAULT_QUEUE), 'ocr_cpu', *lane_queues('ocr_cpu'),
+                          'ocr_io', *lane_queues('ocr_io')])
+
+    def test_worker_settings_of_selected_queue(self):
+        settings = worker_settings(CONFIG, 'ocr_io')
+        self.assertEqual([queue.name for queue in settings['task_queues']], ['ocr_io', *lane_queues('ocr_io')])
+        self.assertEqual((settings['worker_pool'], settings['worker_concurrency'], settings['worker_prefetch_multiplier']),
+                         ('threads', 8, 4))
+
+    def test_worker_settings_of_single_lane(self):
+        settings = worker_settings(CONFIG, 'ocr_io.interactive')
+        self.assertEqual([queue.name for queue in settings['task_queues']], ['ocr_io.interactive'])
+        self.assertEqual(settings['worker_pool'], 'threads')
+
+    def test_route_task_without_strategy(self):
+        self.assertIsNone(route_task(OCR_TASKS[0], (), {}, {}))
+        self.assertIsNone(route_task(OCR_TASKS[1], ("blob",), None, {}))
+        self.assertIsNone(route_task("text_extract_api.extract.tasks.other_task", ("blob", "easyocr"), {}, {}))
+
+    def test_route_task_by_strategy(self):
+        for args, kwargs in ((("blob", "custom"), {}), (("blob",), {'strategy_name': 'custom'})):
+            route = route_task(OCR_TASKS[0], args, kwargs, {})
+            self.assertIn(route['queue'], [DEFAULT_QUEUE, *lane_queues(DEFAULT_QUEUE)], (args, kwargs))
+
+
+if __name__ == "__main__":
+    unittest.main()
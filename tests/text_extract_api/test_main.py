@@ -0,0 +1,136 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+from celery import states
+from fastapi.testclient import TestClient
+
+from text_extract_api import main
+from text_extract_api.cache.cache_key import build_cache_key
+from text_extract_api.cache.ocr_cache import OcrCache
+from text_extract_api.extract.single_flight import SingleFlight
+
+
+class TestPrepareOcrTask(unittest.TestCase):
+
+    def setUp(self):
+        self.single_flight = SingleFlight(fakeredis.FakeStrictRedis())
+        patcher = patch.object(main, "single_flight", self.single_flight)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def prepare(self):
+        return main.prepare_ocr_task("abc", "easyocr", "document.pdf", True, None, None, "en", None, None)
+
+    def leader_state(self, state: str):
+        patcher = patch.object(main, "AsyncResult", return_value=MagicMock(state=state))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_identical_request_attaches_to_the_task_in_flight(self):
+        self.leader_state(states.STARTED)
+        leader, signature = self.prepare()
+
+        task_id, attached = self.prepare()
+
+        self.assertEqual(task_id, leader)
+        self.assertIsNone(attached)
+        # The task releases the request lease once it's done
+        self.assertEqual(self.single_flight.owner(signature.kwargs['request_key']), leader)
+
+    def test_finished_leader_is_replaced(self):
+        for state in (states.SUCCESS, states.FAILURE, states.REVOKED):
+            self.leader_state(state)
+            leader, _ = self.prepare()
+
+            task_id, signature = self.prepare()
+
+            self.assertNotEqual(task_id, leader, state)
+            self.assertIsNotNone(signature, state)
+            self.assertEqual(self.single_flight.owner(signature.kwargs['request_key']), task_id)
+
+
+class TestOcrBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        # The strategies (and their models) are not loaded
+        patcher = patch.object(main.Strategy, "get_strategy")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_invalid_blob_keys_are_rejected(self):
+        blob_store = MagicMock()
+        with patch.object(main, "get_blob_store", return_value=blob_store):
+            for blob_key in ('../secret', '.hidden', 'not-a-hash'):
+                response = TestClient(main.app).post("/ocr/batch", data={
+                    'strategy': 'easyocr', 'ocr_cache': 'true', 'blob_keys': [blob_key]})
+
+                self.assertEqual(response.status_code, 400, blob_key)
+                self.assertIn("Invalid blob key", response.json()['detail'])
+        blob_store.exists.assert_not_called()
+
+    def test_unknown_blob_key(self):
+        blob_store = MagicMock()
+        blob_store.exists.return_value = False
+        with patch.object(main, "get_blob_store", return_value=blob_store):
+            response = TestClient(main.app).post("/ocr/batch", data={
+                'strategy': 'easyocr', 'ocr_cache': 'true', 'blob_keys': ['0' * 32]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("does not exist", response.json()['detail'])
+
+
+class TestOcrCacheEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = OcrCache(fakeredis.FakeStrictRedis(), max_bytes=0, default_ttl=0, memory_max_bytes=0)
+        patcher = patch.object(main, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_share_the_cache(self):
+        key = build_cache_key('document', 'easyocr', 'abc')
+        self.cache.set(key, "text")
+        self.cache.get(key)
+
+        with patch.object(main, "OcrCache") as cache_class:
+            client = TestClient(main.app)
+            stats = client.get("/ocr/cache/stats").json()
+            client.post("/ocr/clear_cache")
+
+        cache_class.assert_not_called()
+        self.assertEqual(stats['strategies'], {'easyocr': {'hits': 1, 'l2_hits': 1}})
+        self.assertIsNone(self.cache.get(key))
+
+
+class TestStorageEndpoints(unittest.TestCase):
+
+    def test_storage_manager_is_created_off_the_event_loop(self):
+        storage_manager = MagicMock()
+        storage_manager.load.return_value = "text"
+        storage_manager.list_page.return_value = (["a.md"], None)
+        storage_manager.list_filters.return_value = []
+        calls_on_the_loop = []
+
+        def get(profile_name):
+            try:
+                asyncio.get_running_loop()
+                calls_on_the_loop.append(profile_name)
+            except RuntimeError:
+                pass
+            return storage_manager
+
+        client = TestClient(main.app)
+        with patch.object(main.StorageManager, "get", side_effect=get) as get_manager:
+            self.assertEqual(client.get("/storage/list", params={'limit': 10}).json()['files'], ["a.md"])
+            self.assertEqual(client.get("/storage/load", params={'file_name': 'a.md'}).json(), {'content': "text"})
+            self.assertEqual(client.delete("/storage/delete", params={'file_name': 'a.md'}).status_code, 200)
+
+        self.assertEqual(get_manager.call_count, 3)
+        self.assertEqual(calls_on_the_loop, [])
+        storage_manager.delete.assert_called_once_with('a.md')
+
+
+if __name__ == '__main__':
+    unittest.main()
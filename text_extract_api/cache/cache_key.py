@@ -0,0 +1,32 @@
+import json
+import os
+from hashlib import md5
+from typing import Dict, Optional
+
+# Bump to invalidate every cached OCR result at once (e.g. after changing how pages are rendered)
+CACHE_VERSION = os.getenv('OCR_CACHE_VERSION', 'v2')
+# Every key of the cache (of all the versions) is under the namespace
+CACHE_NAMESPACE = "ocr"
+CACHE_PREFIX = f"{CACHE_NAMESPACE}:{CACHE_VERSION}"
+
+
+def build_cache_key(namespace: str, strategy_name: str, content_hash: str, params: Optional[Dict] = None) -> str:
+    """
+    Builds a versioned cache key out of the content hash and every parameter affecting the cached output.
+
+    Args:
+        namespace: Kind of the cached value, e.g. `document` or `page`.
+        strategy_name: Name of the OCR strategy producing the value.
+        content_hash: Hash of the document or the rendered page.
+        params: Parameters affecting the output (model, prompt, language...).
+
+    Returns:
+        str: Key in the form `ocr:<version>:<namespace>:<strategy>:<content hash>:<params digest>`.
+    """
+    params_digest = md5(json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"{CACHE_PREFIX}:{namespace}:{strategy_name}:{content_hash}:{params_digest}"
+
+
+def strategy_from_cache_key(key: str) -> str:
+    parts = key.split(':')
+    return parts[3] if len(parts) > 3 else 'unknown'
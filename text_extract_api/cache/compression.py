@@ -0,0 +1,27 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional - zlib is always available
+    zstandard = None
+
+# Every compressed value starts with a marker of the codec it was compressed with
+ZLIB_MARKER = b'z'
+ZSTD_MARKER = b's'
+
+
+def compress(data: bytes, level: int = 6) -> bytes:
+    if zstandard is not None:
+        return ZSTD_MARKER + zstandard.ZstdCompressor(level=level).compress(data)
+    return ZLIB_MARKER + zlib.compress(data, level)
+
+
+def decompress(data: bytes) -> bytes:
+    marker, payload = data[:1], data[1:]
+    if marker == ZSTD_MARKER:
+        if zstandard is None:
+            raise RuntimeError("Cached value is compressed with zstd, but the `zstandard` package is not installed.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if marker == ZLIB_MARKER:
+        return zlib.decompress(payload)
+    raise ValueError(f"Unknown compression marker: {marker!r}")
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+from text_extract_api.cache.cache_key import CACHE_NAMESPACE, CACHE_PREFIX, strategy_from_cache_key
+from text_extract_api.cache.compression import compress, decompress
+from text_extract_api.cache.tiers.cache_tier import CacheTier
+from text_extract_api.cache.tiers.memory_tier import MemoryCacheTier
+from text_extract_api.cache.tiers.redis_tier import RedisCacheTier, delete_keys
+from text_extract_api.cache.tiers.sqlite_tier import SqliteCacheTier
+
+
+class OcrCache:
+    """
+    Tiered cache of OCR results:
+    - L1 - small in-process LRU for hot documents (`OCR_CACHE_MEMORY_MAX_BYTES`, 0 disables it),
+    - L2 - Redis shared by all the workers, size-bounded LRU (`OCR_CACHE_MAX_BYTES`),
+    - L3 - optional size-bounded SQLite database on the local disk for the long tail
+      (`OCR_CACHE_DISK_PATH`, `OCR_CACHE_DISK_MAX_BYTES`).
+
+    Values are compressed (zstd if available, zlib otherwise) before they reach any tier.
+    Hits in a lower tier are promoted to the upper ones, values evicted from Redis are
+    demoted to the disk tier. Hit/miss/eviction counters are kept per strategy in Redis
+    (`stats:<strategy>`), buffered locally and flushed every `STATS_FLUSH_THRESHOLD` counts
+    or `STATS_FLUSH_INTERVAL` seconds to save Redis round-trips.
+
+    The disk tiers are local to the workers - their entries are keyed by the cache generation kept in Redis,
+    which `clear()` bumps, so clearing the cache drops the disk tiers of all the workers at once. Workers
+    re-read the generation every `OCR_CACHE_GENERATION_TTL` seconds.
+    """
+
+    STATS_KEY = f"{CACHE_PREFIX}:stats"
+    GENERATION_KEY = f"{CACHE_NAMESPACE}:generation"
+    STATS_FLUSH_THRESHOLD = 50
+    STATS_FLUSH_INTERVAL = 10
+
+    def __init__(
+            self,
+            redis_client: redis.StrictRedis,
+            max_bytes: Optional[int] = None,
+            default_ttl: Optional[int] = None,
+            memory_max_bytes: Optional[int] = None,
+            disk_path: Optional[str] = None,
+            disk_max_bytes: Optional[int] = None
+    ):
+        self.redis_client = redis_client
+        self.default_ttl = default_ttl if default_ttl is not None else int(os.getenv('OCR_CACHE_TTL', 7 * 24 * 3600))
+
+        if max_bytes is None:
+            max_bytes = int(os.getenv('OCR_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+        if memory_max_bytes is None:
+            memory_max_bytes = int(os.getenv('OCR_CACHE_MEMORY_MAX_BYTES', 32 * 1024 * 1024))
+        if disk_path is None:
+            disk_path = os.getenv('OCR_CACHE_DISK_PATH')
+        if disk_max_bytes is None:
+            disk_max_bytes = int(os.getenv('OCR_CACHE_DISK_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+
+        # Entries of the in-process tier live shortly, so clearing the shared cache is picked up by all the workers
+        self.memory_ttl = int(os.getenv('OCR_CACHE_MEMORY_TTL', 300))
+        self.memory_tier: Optional[CacheTier] = MemoryCacheTier(memory_max_bytes) if memory_max_bytes else None
+        self.redis_tier = RedisCacheTier(redis_client, max_bytes)
+        self.disk_tier: Optional[CacheTier] = SqliteCacheTier(disk_path, disk_max_bytes) if disk_path else None
+
+        # The generation is cached shortly, so disk tier accesses don't cost a Redis round-trip each
+        self.generation_ttl = float(os.getenv('OCR_CACHE_GENERATION_TTL', 5))
+        self._generation: Optional[Tuple[int, float]] = None
+
+        self._pending_stats: Counter = Counter()
+        self._stats_flushed_at = time.monotonic()
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        strategy_name = strategy_from_cache_key(key)
+
+        if self.memory_tier:
+            value = self.memory_tier.get(key)
+            if value is not None:
+                self._count(strategy_name, 'l1_hits')
+                return decompress(value).decode('utf-8')
+
+        value, ttl = self.redis_tier.get_with_ttl(key)
+        if value is not None:
+            self._count(strategy_name, 'l2_hits')
+            if self.memory_tier:
+                self.memory_tier.set(key, value, self._memory_ttl(ttl))
+            return decompress(value).decode('utf-8')
+
+        if self.disk_tier:
+            value, ttl = self.disk_tier.get_with_ttl(self._disk_key(key))
+            if value is not None:
+                self._count(strategy_name, 'l3_hits')
+                # Promoted with the TTL left - the TTL of the strategy it was stored with
+                self._set_in_upper_tiers(key, value, ttl)
+                return decompress(value).decode('utf-8')
+
+        self._count(strategy_name, 'misses')
+        return None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self._set_in_upper_tiers(key, compress(value.encode('utf-8')), ttl)
+
+    def _set_in_upper_tiers(self, key: str, value: bytes, ttl: Optional[int]):
+        if self.memory_tier:
+            self.memory_tier.set(key, value, self._memory_ttl(ttl))
+        self._demote(self.redis_tier.set(key, value, ttl))
+
+    def _memory_ttl(self, ttl: Optional[int]) -> int:
+        return min(ttl, self.memory_ttl) if ttl else self.memory_ttl
+
+    def _demote(self, evicted: List[Tuple[str, bytes, Optional[int]]]):
+        for evicted_key, evicted_value, ttl in evicted:
+            self._count(strategy_from_cache_key(evicted_key), 'evictions')
+            if self.disk_tier:
+                # Keeps the TTL left - values of strategies with short `cache_ttl` don't outlive it on disk
+                self.disk_tier.set(self._disk_key(evicted_key), evicted_value, ttl)
+
+    def _disk_key(self, key: str) -> str:
+        return f"{self._current_generation()}:{key}"
+
+    def _current_generation(self) -> int:
+        now = time.monotonic()
+        cached = self._generation
+        if cached is None or now - cached[1] >= self.generation_ttl:
+            cached = self._generation = (int(self.redis_client.get(self.GENERATION_KEY) or 0), now)
+        return cached[0]
+
+    def clear(self):
+        """
+        Clears every tier - only the keys of the cache are deleted from Redis (of all the cache versions),
+        the other data kept in the same database (leases, queue counters, output streams, blobs) is left intact.
+        The in-process tiers of other workers expire within `OCR_CACHE_MEMORY_TTL`, their disk tiers
+        are dropped within `OCR_CACHE_GENERATION_TTL`.
+        """
+        self._generation = (self.redis_client.incr(self.GENERATION_KEY), time.monotonic())
+        with self._stats_lock:
+            self._pending_stats = Counter()
+        if self.memory_tier:
+            self.memory_tier.clear()
+        if self.disk_tier:
+            self.disk_tier.clear()
+        self.redis_tier.clear()
+        delete_keys(self.redis_client, f"{CACHE_NAMESPACE}:*", keep=(self.GENERATION_KEY,))
+
+    def _count(self, strategy_name: str, counter: str):
+        with self._stats_lock:
+            self._pending_stats[(strategy_name, counter)] += 1
+            if counter.endswith('_hits'):
+                self._pending_stats[(strategy_name, 'hits')] += 1
+            pending = sum(self._pending_stats.values())
+            flush_due = time.monotonic() - self._stats_flushed_at >= self.STATS_FLUSH_INTERVAL
+        if flush_due or pending >= self.STATS_FLUSH_THRESHOLD:
+            self.flush_stats()
+
+    def flush_stats(self):
+        with self._stats_lock:
+            pending, self._pending_stats = self._pending_stats, Counter()
+            self._stats_flushed_at = time.monotonic()
+        if not pending:
+            return
+        pipe = self.redis_client.pipeline()
+        for (strategy_name, counter), value in pending.items():
+            pipe.hincrby(f"{self.STATS_KEY}:{strategy_name}", counter, value)
+        pipe.execute()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        self.flush_stats()
+        stats = {}
+        for stats_key in self.redis_client.scan_iter(match=f"{self.STATS_KEY}:*"):
+            stats_key = stats_key.decode('utf-8')
+            counters = self.redis_client.hgetall(stats_key)
+            stats[stats_key[len(self.STATS_KEY) + 1:]] = {
+                counter.decode('utf-8'): int(value) for counter, value in counters.items()
+            }
+        return stats
+
+    def size(self) -> Dict[str, int]:
+        return self.redis_tier.size()
@@ -0,0 +1,40 @@
+import math
+import time
+from typing import List, Optional, Tuple
+
+
+def remaining_ttl(expires_at: Optional[float]) -> Optional[int]:
+    """
+    Seconds left until the expiration time (at least 1) - None if the value doesn't expire.
+    """
+    return max(1, math.ceil(expires_at - time.time())) if expires_at else None
+
+
+class CacheTier:
+    """
+    A single level of the tiered OCR cache. Values are raw bytes - compression is up to the tier.
+    """
+
+    name: str = "tier"
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[int]]:
+        """
+        Returns the value along with its remaining TTL in seconds (None if it doesn't expire).
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> List[Tuple[str, bytes, Optional[int]]]:
+        """
+        Stores the value. Returns the (key, value, remaining TTL) of the values evicted to make room for it,
+        so they can be demoted to a lower tier - keeping the TTL they were stored with.
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def delete(self, key: str):
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def clear(self):
+        raise NotImplementedError("Subclasses must implement this method")
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from text_extract_api.cache.tiers.cache_tier import CacheTier, remaining_ttl
+
+
+class MemoryCacheTier(CacheTier):
+    """
+    L1 - small in-process LRU for hot, repeatedly requested results. Bounded by the total size of the values.
+    """
+
+    name = "l1"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._values: OrderedDict = OrderedDict()  # key -> (value, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[int]]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None, None
+            value, expires_at = entry
+            if expires_at and expires_at < time.time():
+                self._remove(key)
+                return None, None
+            self._values.move_to_end(key)
+            return value, remaining_ttl(expires_at)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> List[Tuple[str, bytes, Optional[int]]]:
+        if len(value) > self.max_bytes:
+            return []
+
+        evicted = []
+        with self._lock:
+            self._remove(key)
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                evicted_key, (evicted_value, expires_at) = self._values.popitem(last=False)
+                self._bytes -= len(evicted_value)
+                evicted.append((evicted_key, evicted_value, remaining_ttl(expires_at)))
+        return evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._values.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
@@ -0,0 +1,154 @@
+import math
+import time
+from typing import List, Optional, Tuple
+
+import redis
+
+from text_extract_api.cache.cache_key import CACHE_PREFIX
+from text_extract_api.cache.tiers.cache_tier import CacheTier
+
+def ttl_seconds(pttl: int) -> Optional[int]:
+    # PTTL is negative for keys without a TTL
+    return max(1, math.ceil(pttl / 1000)) if pttl > 0 else None
+
+
+def delete_keys(redis_client: redis.StrictRedis, pattern: str, keep: Tuple[str, ...] = ()):
+    # SCAN and UNLINK in batches - unlike KEYS or FLUSHDB it neither blocks Redis nor touches other keys
+    batch = []
+    for key in redis_client.scan_iter(match=pattern, count=1000):
+        if key.decode('utf-8') in keep:
+            continue
+        batch.append(key)
+        if len(batch) >= 1000:
+            redis_client.unlink(*batch)
+            batch = []
+    if batch:
+        redis_client.unlink(*batch)
+
+
+# The value and its accounting change in a single script - concurrent sets, deletes and evictions
+# of the same key can't count its size twice (or not at all).
+# KEYS: lru, sizes, bytes, key; ARGV: value, ttl (0 for none), access time
+SET_SCRIPT = """
+local previous_size = tonumber(redis.call('hget', KEYS[2], KEYS[4]) or 0)
+if tonumber(ARGV[2]) > 0 then
+    redis.call('set', KEYS[4], ARGV[1], 'EX', ARGV[2])
+else
+    redis.call('set', KEYS[4], ARGV[1])
+end
+redis.call('zadd', KEYS[1], ARGV[3], KEYS[4])
+redis.call('hset', KEYS[2], KEYS[4], string.len(ARGV[1]))
+return redis.call('incrby', KEYS[3], string.len(ARGV[1]) - previous_size)
+"""
+
+# KEYS: lru, sizes, bytes, key
+DELETE_SCRIPT = """
+local size = tonumber(redis.call('hget', KEYS[2], KEYS[4]) or 0)
+redis.call('del', KEYS[4])
+redis.call('zrem', KEYS[1], KEYS[4])
+if redis.call('hdel', KEYS[2], KEYS[4]) == 1 then
+    redis.call('decrby', KEYS[3], size)
+end
+"""
+
+# Pops the least recently used values until the total fits - returns the popped keys, values
+# and their remaining TTLs in milliseconds (flattened)
+# KEYS: lru, sizes, bytes; ARGV: max bytes
+EVICT_SCRIPT = """
+local evicted = {}
+while tonumber(redis.call('get', KEYS[3]) or 0) > tonumber(ARGV[1]) do
+    local oldest = redis.call('zrange', KEYS[1], 0, 0)
+    if #oldest == 0 then
+        break
+    end
+    local key = oldest[1]
+    local size = tonumber(redis.call('hget', KEYS[2], key) or 0)
+    local value = redis.call('get', key)
+    local ttl = redis.call('pttl', key)
+    redis.call('del', key)
+    redis.call('zrem', KEYS[1], key)
+    if redis.call('hdel', KEYS[2], key) == 1 then
+        redis.call('decrby', KEYS[3], size)
+    end
+    if value then
+        table.insert(evicted, key)
+        table.insert(evicted, value)
+        table.insert(evicted, ttl)
+    end
+end
+return evicted
+"""
+
+
+class RedisCacheTier(CacheTier):
+    """
+    L2 - cache shared by all the workers, bounded by the total size of the values.
+
+    Besides the values themselves, the tier keeps (under the same versioned prefix):
+    - `lru` - sorted set of cached keys scored by their last access time,
+    - `sizes` - hash with the size of every cached value,
+    - `bytes` - total size of the cached values.
+
+    Once the total size exceeds `max_bytes`, the least recently used values are evicted.
+    Expired values (TTL) are reclaimed from the size accounting by the same eviction pass.
+    """
+
+    name = "l2"
+
+    LRU_KEY = f"{CACHE_PREFIX}:lru"
+    SIZES_KEY = f"{CACHE_PREFIX}:sizes"
+    BYTES_KEY = f"{CACHE_PREFIX}:bytes"
+
+    def __init__(self, redis_client: redis.StrictRedis, max_bytes: int):
+        self.redis_client = redis_client
+        self.max_bytes = max_bytes
+        self._set_script = redis_client.register_script(SET_SCRIPT)
+        self._delete_script = redis_client.register_script(DELETE_SCRIPT)
+        self._evict_script = redis_client.register_script(EVICT_SCRIPT)
+
+    def get(self, key: str) -> Optional[bytes]:
+        pipe = self.redis_client.pipeline()
+        pipe.get(key)
+        pipe.zadd(self.LRU_KEY, {key: time.time()}, xx=True)
+        return pipe.execute()[0]
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[int]]:
+        pipe = self.redis_client.pipeline()
+        pipe.get(key)
+        pipe.pttl(key)
+        pipe.zadd(self.LRU_KEY, {key: time.time()}, xx=True)
+        value, ttl, _ = pipe.execute()
+        return value, ttl_seconds(ttl) if value is not None else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> List[Tuple[str, bytes, Optional[int]]]:
+        self._set_script(keys=[self.LRU_KEY, self.SIZES_KEY, self.BYTES_KEY, key],
+                         args=[value, ttl or 0, time.time()])
+        return self.evict()
+
+    def delete(self, key: str):
+        self._delete_script(keys=[self.LRU_KEY, self.SIZES_KEY, self.BYTES_KEY, key])
+
+    def evict(self) -> List[Tuple[str, bytes, Optional[int]]]:
+        """
+        Evicts the least recently used values until the tier fits into `max_bytes`.
+        Returns the evicted values - values already gone (expired) are not returned.
+        """
+        if not self.max_bytes:
+            return []
+
+        evicted = self._evict_script(keys=[self.LRU_KEY, self.SIZES_KEY, self.BYTES_KEY], args=[self.max_bytes])
+        return [(evicted[i].decode('utf-8'), evicted[i + 1], ttl_seconds(evicted[i + 2]))
+                for i in range(0, len(evicted), 3)]
+
+    def clear(self):
+        """
+        Deletes the values of the tier (of the current cache version) along with the accounting keys.
+        """
+        delete_keys(self.redis_client, f"{CACHE_PREFIX}:*")
+
+    def size(self) -> dict:
+        return {
+            'keys': self.redis_client.zcard(self.LRU_KEY),
+            'bytes': int(self.redis_client.get(self.BYTES_KEY) or 0),
+            'max_bytes': self.max_bytes,
+        }
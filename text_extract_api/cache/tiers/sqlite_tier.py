@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from text_extract_api.cache.tiers.cache_tier import CacheTier, remaining_ttl
+
+
+class SqliteCacheTier(CacheTier):
+    """
+    L3 - size-bounded cache on the local disk for the long tail of results evicted from Redis.
+    Values are stored as they come (already compressed by the upper tier).
+    """
+
+    name = "l3"
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[int]]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, None
+            value, expires_at = row
+            if expires_at and expires_at < now:
+                self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None, None
+            self._connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return value, remaining_ttl(expires_at)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> List[Tuple[str, bytes, Optional[int]]]:
+        if len(value) > self.max_bytes:
+            return []
+
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl if ttl else None, now)
+            )
+            self._evict()
+        # The last tier - evicted values are dropped
+        return []
+
+    def delete(self, key: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM cache")
+
+    def _evict(self):
+        self._connection.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_free = total - self.max_bytes
+        for key, size in self._connection.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+            to_free -= size
+            if to_free <= 0:
+                break
@@ -1,8 +1,12 @@
+import os
 import pathlib
 import sys
+from typing import Dict, Optional
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 from dotenv import load_dotenv
+from kombu import Exchange, Queue
 
 sys.path.insert(0, str(pathlib.Path(__file__).parent.resolve()))
 
@@ -12,13 +16,148 @@ import multiprocessing
 
 multiprocessing.set_start_method("spawn", force=True)
 
+from text_extract_api.config_loader import load_config
+from text_extract_api.extract.scheduling import PRIORITY_SEPARATOR, PRIORITY_STEPS, base_queue, broker_priority, \
+    default_priority, lane_queues, tenant_lane
+
 app = Celery(
     "text_extract_api",
-    broker="redis://redis:6379/0",
-    backend="redis://redis:6379/0"
+    broker=os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0"),
+    backend=os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
 )
 app.config_from_object({
     "worker_max_memory_per_child": 8200000
 })
 
+DEFAULT_QUEUE = "celery"
+# Tasks routed by their strategy - `strategy_name` is their second argument
+OCR_TASKS = (
+    "text_extract_api.extract.tasks.ocr_task",
+    "text_extract_api.extract.tasks.ocr_page_range_task",
+    "text_extract_api.extract.tasks.ocr_merge_task",
+)
+
+
+def strategy_queues(config: Dict) -> Dict[str, str]:
+    """
+    Maps strategies to the Celery queues set by `queue` in `strategies.yaml` (the default queue if not set).
+    """
+    return {name: strategy_config.get('queue') or DEFAULT_QUEUE
+            for name, strategy_config in config['strategies'].items()}
+
+
+def ocr_task_route(strategy_name: str, tenant: Optional[str], priority: int, interactive: bool = True) -> Dict:
+    """
+    Queue lane and broker priority of an OCR task - pass them to `apply_async()` / `signature()`.
+    Queues are split into lanes per tenant (and the interactive one), see `tenant_lane()`.
+    """
+    queue = STRATEGY_QUEUES.get(strategy_name, DEFAULT_QUEUE)
+    return {'queue': tenant_lane(queue, tenant, priority, interactive), 'priority': broker_priority(priority)}
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    # OCR tasks are routed by their strategy, so CPU and IO bound strategies are processed by separate workers.
+    # Tasks sent with an explicit lane (see `ocr_task_route()`) keep it.
+    if name not in OCR_TASKS:
+        return None
+    args, kwargs = args or (), kwargs or {}
+    strategy_name = kwargs['strategy_name'] if 'strategy_name' in kwargs else args[1] if len(args) > 1 else None
+    if strategy_name is None:
+        # Left to the default routing
+        return None
+    tenant = kwargs.get('tenant')
+    if 'tenant' not in kwargs and name == OCR_TASKS[0] and len(args) > 10:
+        tenant = args[10]
+    return {'queue': ocr_task_route(strategy_name, tenant, default_priority(), interactive=False)['queue']}
+
+
+def worker_settings(config: Dict, worker_queues: Optional[str]) -> Dict:
+    """
+    Celery settings for the queues consumed by this worker (`CELERY_WORKER_QUEUES`, comma separated; all by default).
+    A queue is consumed with all its lanes; single lanes (e.g. `ocr_io.interactive`) can be listed too.
+    The pool, concurrency and prefetch settings of the first of them configured in the `queues` section apply.
+    """
+    queues_config = config.get('queues') or {}
+    all_queues = list(dict.fromkeys([DEFAULT_QUEUE, *queues_config.keys(), *strategy_queues(config).values()]))
+    queues = [queue.strip() for queue in worker_queues.split(',') if queue.strip()] if worker_queues else all_queues
+    consumed = []
+    for queue in queues:
+        # The queue itself keeps receiving the tasks sent without a lane
+        consumed.extend([queue] if '.' in queue else [queue, *lane_queues(queue)])
+
+    settings = {
+        # A worker consumes all the queues declared here, unless they are narrowed down with `-Q`
+        "task_queues": [Queue(queue, Exchange(queue), routing_key=queue) for queue in dict.fromkeys(consumed)],
+        "worker_pool": "solo",
+    }
+    for queue in queues:
+        if base_queue(queue) in queues_config:
+            queue_config = queues_config[base_queue(queue)] or {}
+            settings["worker_pool"] = queue_config.get("pool", settings["worker_pool"])
+            if queue_config.get("concurrency"):
+                settings["worker_concurrency"] = int(queue_config["concurrency"])
+            if queue_config.get("prefetch_multiplier"):
+                settings["worker_prefetch_multiplier"] = int(queue_config["prefetch_multiplier"])
+            break
+    return settings
+
+
+try:
+    config = load_config()
+except FileNotFoundError as e:
+    # Without the config everything goes through the default queue
+    print('Error loading queues config:', e)
+    config = {'strategies': {}}
+
+STRATEGY_QUEUES = strategy_queues(config)
+app.conf.update(
+    task_routes=(route_task,),
+    # Workers take turns over the queues they consume (round-robin) and serve the higher priorities of each first
+    broker_transport_options={
+        'queue_order_strategy': 'round_robin',
+        'priority_steps': PRIORITY_STEPS,
+        'sep': PRIORITY_SEPARATOR,
+    },
+    task_default_priority=broker_priority(default_priority()),
+    **worker_settings(config, os.getenv("CELERY_WORKER_QUEUES"))
+)
+
 app.autodiscover_tasks(["text_extract_api.extract"], 'tasks', True)
+
+
+def warm_up_strategies():
+    from text_extract_api.extract.strategies.strategy import Strategy
+    try:
+        Strategy.warm_up_strategies()
+    except Exception as e:
+        # Warm up is an optimization only - tasks will load what they need lazily
+        print('Error warming up strategies:', e)
+
+
+@worker_init.connect
+def warm_up_worker(sender=None, **kwargs):
+    # Solo and thread pools execute tasks in the main worker process
+    pool = str(getattr(sender, 'pool_cls', ''))
+    if 'solo' in pool or 'thread' in pool:
+        warm_up_strategies()
+
+
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    warm_up_strategies()
+
+
+def shutdown_strategies():
+    from text_extract_api.extract.strategies.strategy import Strategy
+    Strategy.shutdown_strategies()
+
+
+@worker_shutdown.connect
+def shutdown_worker(**kwargs):
+    # E.g. the EasyOCR process pool - its processes would outlive the worker otherwise
+    shutdown_strategies()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    shutdown_strategies()
@@ -0,0 +1,27 @@
+import os
+from typing import Dict, Optional
+
+import yaml
+
+
+def get_config_file_path(path: Optional[str] = None) -> str:
+    path = path or os.getenv('OCR_CONFIG_PATH', 'config/strategies.yaml')
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(path)))
+    return os.path.join(project_root, path)
+
+
+def load_config(path: Optional[str] = None) -> Dict:
+    """
+    Loads `config/strategies.yaml` (`OCR_CONFIG_PATH`) - the strategies and the Celery queues they are routed to.
+    """
+    file_path = get_config_file_path(path)
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Config file not found at path: {file_path}")
+
+    with open(file_path, 'r') as f:
+        config = yaml.safe_load(f)
+
+    if 'strategies' not in config or not isinstance(config['strategies'], dict):
+        raise ValueError(f"Missing or invalid 'strategies' section in the {file_path} file")
+
+    return config
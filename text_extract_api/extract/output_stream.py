@@ -0,0 +1,88 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+
+class OutputStream:
+    """
+    Publishes the output of a task as it's generated - page boundaries, OCR and LLM text chunks - to the
+    Redis stream `output:<task_id>`, so `/ocr/stream/{task_id}` can push it to clients with Server-Sent Events.
+
+    Chunks are coalesced for `flush_interval` seconds to save Redis round-trips on token-level streams.
+    The stream is capped to roughly `max_len` events and expires `ttl` seconds after the last event.
+    """
+
+    KEY_PREFIX = "output"
+
+    def __init__(
+            self,
+            redis_client: redis.StrictRedis,
+            task_id: str,
+            max_len: Optional[int] = None,
+            ttl: Optional[int] = None,
+            flush_interval: Optional[float] = None
+    ):
+        self.redis_client = redis_client
+        self.key = self.stream_key(task_id)
+        self.max_len = max_len or int(os.getenv('OCR_STREAM_MAX_LEN', 10000))
+        self.ttl = ttl or int(os.getenv('OCR_STREAM_TTL', 3600))
+        self.flush_interval = flush_interval if flush_interval is not None \
+            else float(os.getenv('OCR_STREAM_FLUSH_INTERVAL', 0.05))
+        self._buffer: List[str] = []
+        self._buffer_source: Optional[str] = None
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def stream_key(cls, task_id: str) -> str:
+        return f"{cls.KEY_PREFIX}:{task_id}"
+
+    def page(self, page: int, source: str = 'ocr'):
+        self.flush()
+        self._publish('page', {'page': page, 'source': source})
+
+    def chunk(self, text: str, source: str = 'ocr'):
+        if not text:
+            return
+        if self._buffer_source != source:
+            self.flush()
+            self._buffer_source = source
+        self._buffer.append(text)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def done(self, state: str = 'SUCCESS'):
+        self.flush()
+        self._publish('done', {'state': state})
+
+    def error(self, message: str):
+        self.flush()
+        self._publish('error', {'message': message})
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        text, self._buffer = "".join(self._buffer), []
+        self._publish('chunk', {'text': text, 'source': self._buffer_source})
+
+    def _publish(self, event: str, data: Dict):
+        pipe = self.redis_client.pipeline()
+        pipe.xadd(self.key, {'event': event, 'data': json.dumps(data)}, maxlen=self.max_len, approximate=True)
+        pipe.expire(self.key, self.ttl)
+        pipe.execute()
+
+    @staticmethod
+    def decode_events(entries) -> List[Tuple[str, str, str]]:
+        """
+        Converts raw XREAD/XRANGE entries into (id, event, json data) tuples.
+        """
+        events = []
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode('utf-8') if isinstance(entry_id, bytes) else entry_id
+            fields = {(k.decode('utf-8') if isinstance(k, bytes) else k): (v.decode('utf-8') if isinstance(v, bytes) else v)
+                      for k, v in fields.items()}
+            events.append((entry_id, fields['event'], fields['data']))
+        return events
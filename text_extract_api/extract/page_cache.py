@@ -0,0 +1,47 @@
+from typing import Dict, Optional
+
+from text_extract_api.cache.cache_key import build_cache_key
+from text_extract_api.cache.ocr_cache import OcrCache
+
+
+class PageCache:
+    """
+    Caches OCR results of single pages, so re-uploading a document with only a few
+    changed pages (or the same document re-saved by another tool) re-OCRs only these pages.
+
+    Pages are identified by the hash of the rendered page image combined with every
+    parameter affecting the OCR output (strategy, model, prompt, language...).
+    Hits and misses are counted per document, on top of the global OcrCache stats.
+    """
+
+    NAMESPACE = "page"
+
+    def __init__(self, ocr_cache: OcrCache, strategy_name: str, params: Dict, ttl: Optional[int] = None):
+        self.ocr_cache = ocr_cache
+        self.strategy_name = strategy_name
+        self.params = params
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, page_hash: str) -> str:
+        return build_cache_key(self.NAMESPACE, self.strategy_name, page_hash, self.params)
+
+    def get(self, page_hash: str) -> Optional[str]:
+        cached = self.ocr_cache.get(self.key(page_hash))
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached
+
+    def set(self, page_hash: str, text: str):
+        self.ocr_cache.set(self.key(page_hash), text, self.ttl)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': round(self.hit_ratio, 3)}
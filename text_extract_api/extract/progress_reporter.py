@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import redis
+
+
+class ProgressReporter:
+    """
+    Coalesces the progress updates of a task before they reach the result backend.
+
+    Strategies report progress for every page or streamed chunk - writing each of them would cost a Redis
+    write (of the whole meta) per token. The reporter writes at most one PROGRESS update per `min_interval`
+    seconds (`OCR_PROGRESS_MIN_INTERVAL`), always keeping the latest one, and skips updates that change nothing.
+    Other states (e.g. the final one) are written at once, superseding any pending update; `flush()` writes
+    the pending one.
+
+    Metas are kept small: `elapsed_time` is dropped (the API computes it from `start_time`) and large texts
+    are stored under a separate key (see `store_text()`) and only referenced.
+    """
+
+    TEXT_KEY_PREFIX = "progress"
+
+    def __init__(
+            self,
+            update_state: Callable,
+            redis_client: redis.StrictRedis,
+            task_id: str,
+            start_time: float,
+            min_interval: Optional[float] = None
+    ):
+        self._update_state = update_state
+        self.redis_client = redis_client
+        self.task_id = task_id
+        self.start_time = start_time
+        self.min_interval = min_interval if min_interval is not None \
+            else float(os.getenv('OCR_PROGRESS_MIN_INTERVAL', 1))
+        self.text_ttl = int(os.getenv('OCR_PROGRESS_TEXT_TTL', 3600))
+        self._references: Dict[str, str] = {}
+        self._pending: Optional[Dict] = None
+        self._last_written: Optional[Dict] = None
+        self._last_write_time = 0.0
+        self._lock = threading.Lock()
+
+    def update_state(self, state: str = 'PROGRESS', meta: Optional[Dict] = None, force: bool = False, **kwargs):
+        """
+        Drop-in replacement of Celery's `Task.update_state` - pass it as the strategies' update state callback.
+        Use `force` for milestones that should be visible right away.
+        """
+        meta = dict(meta or {})
+        meta.pop('elapsed_time', None)
+        meta.setdefault('start_time', self.start_time)
+        meta.update(self._references)
+
+        with self._lock:
+            if state != 'PROGRESS':
+                # The pending update would be overwritten right away
+                self._pending = None
+                self._write(state, meta)
+                return
+
+            self._pending = meta
+            if force or time.monotonic() - self._last_write_time >= self.min_interval:
+                self._write_pending()
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+
+    def store_text(self, name: str, text: str) -> str:
+        """
+        Stores a large text (e.g. the extracted text) under a key with a TTL. The key is added
+        to the metas of all the following updates as `<name>_key`.
+        """
+        key = f"{self.TEXT_KEY_PREFIX}:{self.task_id}:{name}"
+        self.redis_client.set(key, text, ex=self.text_ttl)
+        self._references[f"{name}_key"] = key
+        return key
+
+    def _write_pending(self):
+        if self._pending is None:
+            return
+        meta, self._pending = self._pending, None
+        if meta != self._last_written:
+            self._write('PROGRESS', meta)
+
+    def _write(self, state: str, meta: Dict):
+        self._update_state(state=state, meta=meta)
+        self._last_written = meta
+        self._last_write_time = time.monotonic()
@@ -0,0 +1,158 @@
+import os
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import redis
+
+# Priorities accepted by the API - the higher, the sooner the task is picked up
+MIN_PRIORITY = 0
+MAX_PRIORITY = 9
+DEFAULT_TENANT = "default"
+INTERACTIVE_LANE = "interactive"
+# Every priority gets its own list in the Redis transport (kombu's default is 4 steps: 0, 3, 6, 9)
+PRIORITY_STEPS = list(range(MIN_PRIORITY, MAX_PRIORITY + 1))
+# Separator of the per-priority lists the Redis transport keeps for every queue - kombu's default
+PRIORITY_SEPARATOR = "\x06\x16"
+
+# Decrements the counter, removing it when it drops to zero
+DECREMENT_SCRIPT = """
+local depth = redis.call('hincrby', KEYS[1], ARGV[1], -1)
+if depth <= 0 then
+    redis.call('hdel', KEYS[1], ARGV[1])
+    return 0
+end
+return depth
+"""
+
+
+def default_priority() -> int:
+    return int(os.getenv('OCR_DEFAULT_PRIORITY', 5))
+
+
+def interactive_priority() -> int:
+    """
+    Single-document requests with at least this priority go to the interactive lane (`OCR_INTERACTIVE_PRIORITY`).
+    """
+    return int(os.getenv('OCR_INTERACTIVE_PRIORITY', 8))
+
+
+def tenant_lanes() -> int:
+    """
+    Number of the tenant sub-queues of every queue (`OCR_TENANT_LANES`).
+    """
+    return max(1, int(os.getenv('OCR_TENANT_LANES', 8)))
+
+
+def pinned_tenant_lanes() -> Dict[str, int]:
+    """
+    Tenants given a lane of their own (`OCR_TENANT_LANE_MAP`, e.g. `acme:0,globex:1`).
+
+    Raises:
+        ValueError: If an entry is not `<tenant>:<lane>` or the lane is out of range.
+    """
+    pinned = {}
+    for entry in filter(None, (entry.strip() for entry in os.getenv('OCR_TENANT_LANE_MAP', '').split(','))):
+        tenant, _, lane = entry.rpartition(':')
+        if not tenant or not lane.isdigit() or int(lane) >= tenant_lanes():
+            raise ValueError(f"Invalid OCR_TENANT_LANE_MAP entry '{entry}' - expected <tenant>:<lane> "
+                             f"with a lane below {tenant_lanes()}")
+        pinned[tenant] = int(lane)
+    return pinned
+
+
+def validate_priority(priority: Optional[int]) -> int:
+    if priority is None:
+        return default_priority()
+    if not MIN_PRIORITY <= priority <= MAX_PRIORITY:
+        raise ValueError(f"Priority must be between {MIN_PRIORITY} and {MAX_PRIORITY}")
+    return priority
+
+
+def broker_priority(priority: int) -> int:
+    # The Redis transport serves the lowest numbers first
+    return MAX_PRIORITY - priority
+
+
+def lane_queues(queue: str) -> List[str]:
+    """
+    The lanes a queue is split into - the interactive one first, then the tenant sub-queues.
+    """
+    return [f"{queue}.{INTERACTIVE_LANE}", *[f"{queue}.t{lane}" for lane in range(tenant_lanes())]]
+
+
+def base_queue(lane: str) -> str:
+    return lane.split('.', 1)[0]
+
+
+def tenant_lane(queue: str, tenant: Optional[str], priority: int, interactive: bool = True) -> str:
+    """
+    Picks the lane of the queue for a task. Tenants are hashed onto the sub-queues, so a tenant enqueuing
+    thousands of documents fills its own lane only - workers take turns over the lanes (round-robin).
+    """
+    if interactive and priority >= interactive_priority():
+        return f"{queue}.{INTERACTIVE_LANE}"
+    return f"{queue}.t{tenant_lane_index(tenant)}"
+
+
+def tenant_lane_index(tenant: Optional[str]) -> int:
+    """
+    Tenant sub-queue of the tenant. Hashed tenants may collide - a heavy tenant delays the others of its lane.
+    Tenants pinned by `OCR_TENANT_LANE_MAP` get their lane, the others are hashed onto the lanes no tenant
+    is pinned to (onto all of them if every lane is taken).
+    """
+    tenant = tenant or DEFAULT_TENANT
+    pinned = pinned_tenant_lanes()
+    if tenant in pinned:
+        return pinned[tenant]
+    lanes = [lane for lane in range(tenant_lanes()) if lane not in pinned.values()] or list(range(tenant_lanes()))
+    return lanes[zlib.crc32(tenant.encode('utf-8')) % len(lanes)]
+
+
+def lane_tenants(tenants: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Tenants of every tenant lane (`t0`, `t1`, ...) - the lanes of more than one tenant are shared.
+    """
+    lanes: Dict[str, List[str]] = {}
+    for tenant in tenants:
+        lanes.setdefault(f"t{tenant_lane_index(tenant)}", []).append(tenant)
+    return lanes
+
+
+def lane_depths(broker_client: redis.StrictRedis, lanes: Iterable[str]) -> Dict[str, int]:
+    """
+    Number of messages waiting in each lane, summed over its priority lists
+    (the list of the first step is the lane itself).
+    """
+    lanes = list(lanes)
+    pipe = broker_client.pipeline()
+    for lane in lanes:
+        pipe.llen(lane)
+        for priority in PRIORITY_STEPS[1:]:
+            pipe.llen(f"{lane}{PRIORITY_SEPARATOR}{priority}")
+    sizes = pipe.execute()
+    step = len(PRIORITY_STEPS)
+    return {lane: sum(sizes[i * step:(i + 1) * step]) for i, lane in enumerate(lanes)}
+
+
+class QueueDepth:
+    """
+    Number of the OCR tasks of every tenant waiting in the queues - incremented when the tasks
+    are enqueued and decremented when a worker starts them.
+    """
+
+    KEY = "queued:tenants"
+
+    def __init__(self, redis_client: redis.StrictRedis):
+        self.redis_client = redis_client
+        self._decrement_script = redis_client.register_script(DECREMENT_SCRIPT)
+
+    def enqueued(self, tenant: Optional[str], count: int = 1):
+        if count:
+            self.redis_client.hincrby(self.KEY, tenant or DEFAULT_TENANT, count)
+
+    def started(self, tenant: Optional[str]):
+        self._decrement_script(keys=[self.KEY], args=[tenant or DEFAULT_TENANT])
+
+    def tenants(self) -> Dict[str, int]:
+        return {(k.decode('utf-8') if isinstance(k, bytes) else k): int(v)
+                for k, v in self.redis_client.hgetall(self.KEY).items()}
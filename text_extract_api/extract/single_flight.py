@@ -0,0 +1,83 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import redis
+
+# Deletes the lease only if it's still held by the given owner
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Extends the lease only if it's still held by the given owner
+REFRESH_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coordinates identical OCR jobs running at the same time, so only one of them does the work.
+
+    The first job takes a short-lived Redis lease on the key (the document hash plus extraction
+    parameters); duplicates see the lease owner and either attach to it or wait for its result.
+    Leases held with `lease()` are kept alive by a heartbeat until released.
+    """
+
+    KEY_PREFIX = "inflight"
+
+    def __init__(self, redis_client: redis.StrictRedis, lease_ttl: Optional[int] = None):
+        self.redis_client = redis_client
+        self.lease_ttl = lease_ttl or int(os.getenv('OCR_SINGLE_FLIGHT_TTL', 60))
+        self._release_script = redis_client.register_script(RELEASE_SCRIPT)
+        self._refresh_script = redis_client.register_script(REFRESH_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def acquire(self, key: str, owner: str, ttl: Optional[int] = None) -> bool:
+        return bool(self.redis_client.set(self._key(key), owner, nx=True, ex=ttl or self.lease_ttl))
+
+    def replace(self, key: str, owner: str, ttl: Optional[int] = None):
+        self.redis_client.set(self._key(key), owner, ex=ttl or self.lease_ttl)
+
+    def owner(self, key: str) -> Optional[str]:
+        owner = self.redis_client.get(self._key(key))
+        return owner.decode('utf-8') if owner is not None else None
+
+    def refresh(self, key: str, owner: str) -> bool:
+        return bool(self._refresh_script(keys=[self._key(key)], args=[owner, self.lease_ttl]))
+
+    def release(self, key: str, owner: str):
+        self._release_script(keys=[self._key(key)], args=[owner])
+
+    @contextmanager
+    def lease(self, key: str, owner: str) -> Iterator[bool]:
+        """
+        Tries to take the lease for the duration of the block. Yields True if this owner is the leader.
+        """
+        if not self.acquire(key, owner):
+            yield False
+            return
+
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.lease_ttl / 3):
+                self.refresh(key, owner)
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield True
+        finally:
+            stop.set()
+            thread.join()
+            self.release(key, owner)
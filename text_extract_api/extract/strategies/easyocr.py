@@ -1,4 +1,12 @@
 import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
 import numpy as np
 from PIL import Image
 import easyocr
@@ -8,8 +16,79 @@ from text_extract_api.extract.strategies.strategy import Strategy
 from text_extract_api.files.file_formats.file_format import FileFormat
 from text_extract_api.files.file_formats.image import ImageFileFormat
 
+class ReaderCache:
+    """
+    Per-process, bounded LRU cache of EasyOCR readers keyed by the normalized language set.
+
+    Building a reader loads the detection and recognition weights from disk, which takes
+    seconds - so warm readers are reused across tasks and the least recently used language
+    combinations get evicted once `max_size` is exceeded.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self._readers: OrderedDict[Tuple[str, ...], easyocr.Reader] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize_languages(language: Union[str, Iterable[str]]) -> Tuple[str, ...]:
+        languages = language.split(',') if isinstance(language, str) else language
+        return tuple(sorted({lang.strip() for lang in languages if lang and lang.strip()}))
+
+    def get(self, language: Union[str, Iterable[str]]) -> easyocr.Reader:
+        key = self.normalize_languages(language)
+        with self._lock:
+            reader = self._readers.get(key)
+            if reader is not None:
+                self.hits += 1
+                self._readers.move_to_end(key)
+                return reader
+
+            self.misses += 1
+            reader = easyocr.Reader(list(key))
+            self._readers[key] = reader
+            while len(self._readers) > self.max_size:
+                self._readers.popitem(last=False)
+                self.evictions += 1
+            return reader
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._readers)}
+
+
+# Each process (the Celery worker and every pool process) keeps its own warm readers
+reader_cache = ReaderCache(int(os.getenv('EASYOCR_READER_CACHE_SIZE', 4)))
+
+
+def _init_pool_process(pool_size: int, preload_languages: List[str]):
+    # Share the CPU cores between the pool processes instead of letting each of them spawn a thread per core
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // pool_size))
+    except ImportError:
+        pass
+
+    for language in preload_languages:
+        reader_cache.get(language)
+
+
+def _pool_readtext(languages: Tuple[str, ...], image_binary: bytes) -> Tuple[str, int, Dict[str, int]]:
+    reader = reader_cache.get(languages)
+    return EasyOCRStrategy.readtext(reader, image_binary), os.getpid(), reader_cache.stats()
+
 
 class EasyOCRStrategy(Strategy):
+    PAGE_SEPARATOR = "\n\n"
+
+    def __init__(self):
+        super().__init__()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._pool_cache_stats: Dict[int, Dict[str, int]] = {}
+
     @classmethod
     def name(cls) -> str:
         return "easyOCR"
@@ -17,43 +96,189 @@ class EasyOCRStrategy(Strategy):
     def extract_text(self, file_format: FileFormat, language: str = 'en') -> ExtractResult:
         """
         Extract text using EasyOCR after converting the input file to images
-        (if not already an ImageFileFormat). 
+        (if not already an ImageFileFormat).
+
+        When `pool_size` is set for the strategy in `strategies.yaml`, pages are
+        OCR-ed in parallel by a pool of worker processes.
         """
 
         # Ensure we can actually convert the input file to ImageFileFormat
         if (
-            not isinstance(file_format, ImageFileFormat) 
+            not isinstance(file_format, ImageFileFormat)
             and not file_format.can_convert_to(ImageFileFormat)
         ):
             raise TypeError(
                 f"EasyOCR - format {file_format.mime_type} is not supported (yet?)"
             )
 
-        # Convert the input file to a list of ImageFileFormat objects
-        images = FileFormat.convert_to(file_format, ImageFileFormat)
+        # Lazily convert the input file to ImageFileFormat pages - only a few pages are rendered at once
+        images = file_format.iterator(ImageFileFormat)
 
-        # Initialize the EasyOCR Reader
         # Add or change languages to your needs, e.g., ['en', 'fr']
-        reader = easyocr.Reader(language.split(','))
+        languages = ReaderCache.normalize_languages(language)
+
+        pool_size = int(self.get_config_value('pool_size', 1))
+        if pool_size > 1:
+            page_texts = self._readtext_parallel(images, languages, pool_size)
+        else:
+            page_texts = self._readtext_serial(images, languages)
 
-        # Process each image, extracting text
         all_extracted_text = []
-        for image_format in images:
-            # Convert the in-memory bytes to a PIL Image
-            pil_image = Image.open(io.BytesIO(image_format.binary))
-            
+        for page_text in page_texts:
+            all_extracted_text.append(page_text)
+            self.publish_page(len(all_extracted_text))
+            self.publish_chunk(page_text)
+
+        # Join text from all images/pages
+        full_text = self.join_pages(all_extracted_text)
+
+        cache_stats = self.reader_cache_stats()
+        print(f"EasyOCR reader cache: {cache_stats}")
+        self.update_state(state='PROGRESS', meta={'progress': 45, 'status': 'OCR done', 'reader_cache': cache_stats})
+
+        return ExtractResult.from_text(full_text)
+
+    @staticmethod
+    def readtext(reader: easyocr.Reader, image_binary: bytes) -> str:
+        # Convert the in-memory bytes to a PIL Image
+        with Image.open(io.BytesIO(image_binary)) as pil_image:
             # Convert PIL image to numpy array for EasyOCR
             np_image = np.array(pil_image)
 
-            # Perform OCR; with `detail=0`, we get just text, no bounding boxes
-            ocr_result = reader.readtext(np_image, detail=0) # TODO: addd bounding boxes support as described in #37
+        # Perform OCR; with `detail=0`, we get just text, no bounding boxes
+        ocr_result = reader.readtext(np_image, detail=0) # TODO: addd bounding boxes support as described in #37
 
-            # Combine all lines into a single string for that image/page
-            extracted_text = "\n".join(ocr_result)
-            all_extracted_text.append(extracted_text)
+        # Combine all lines into a single string for that image/page
+        return "\n".join(ocr_result)
 
-        # Join text from all images/pages
-        full_text = "\n\n".join(all_extracted_text)
+    def _readtext_serial(self, images: Iterator[FileFormat], languages: Tuple[str, ...]) -> Iterator[str]:
+        # Reuse a warm EasyOCR Reader for these languages if this process already has one
+        reader = reader_cache.get(languages)
 
+        # Process each image, extracting text
+        for image_format in images:
+            page_hash = image_format.hash
+            page_text = self.get_cached_page(page_hash)
+            if page_text is None:
+                page_text = self.readtext(reader, image_format.binary)
+                self.cache_page(page_hash, page_text)
 
-        return ExtractResult.from_text(full_text)
+            # Release the page before the next one gets rendered
+            del image_format
+            yield page_text
+
+    def _readtext_parallel(
+            self,
+            images: Iterator[FileFormat],
+            languages: Tuple[str, ...],
+            pool_size: int
+    ) -> Iterator[str]:
+        """
+        OCR pages on the process pool, yielding the results in page order.
+        Only a bounded number of pages is submitted ahead, so pages are still rendered lazily.
+
+        When a pool process dies (e.g. OOM while loading torch), the pool is replaced by a new one
+        and the pages it lost are OCR-ed in this process.
+        """
+        pending = deque()
+        for image_format in images:
+            page_hash = image_format.hash
+            page_text = self.get_cached_page(page_hash)
+            if page_text is None:
+                image_binary = image_format.binary
+                pending.append((page_hash, image_binary, *self._submit(pool_size, languages, image_binary)))
+            else:
+                pending.append((page_hash, None, None, page_text))
+            del image_format
+            if len(pending) >= pool_size * 2:
+                yield self._collect_pool_result(languages, *pending.popleft())
+
+        while pending:
+            yield self._collect_pool_result(languages, *pending.popleft())
+
+    def _submit(self, pool_size: int, languages: Tuple[str, ...], image_binary: bytes):
+        """
+        Submits the page to the pool - returns the pool and the future of the page.
+        """
+        pool = self._get_pool(pool_size)
+        try:
+            return pool, pool.submit(_pool_readtext, languages, image_binary)
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            pool = self._get_pool(pool_size)
+            return pool, pool.submit(_pool_readtext, languages, image_binary)
+
+    def _collect_pool_result(self, languages: Tuple[str, ...], page_hash: str, image_binary: Optional[bytes],
+                             pool: Optional[ProcessPoolExecutor], result) -> str:
+        if isinstance(result, str):
+            return result
+        try:
+            text, pid, cache_stats = result.result()
+            self._pool_cache_stats[pid] = cache_stats
+        except (BrokenProcessPool, CancelledError) as e:
+            # All the pages the dead pool held fail - only the first of them replaces it
+            print(f"EasyOCR pool process died ({e!r}) - OCR-ing the page in the worker process")
+            self._reset_pool(pool)
+            text = self.readtext(reader_cache.get(languages), image_binary)
+        self.cache_page(page_hash, text)
+        return text
+
+    def _get_pool(self, pool_size: int) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Celery forces the `spawn` start method; keep it explicit as torch does not survive a fork
+                self._pool = ProcessPoolExecutor(
+                    max_workers=pool_size,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_pool_process,
+                    initargs=(pool_size, self._preload_languages())
+                )
+            return self._pool
+
+    def _reset_pool(self, broken_pool: Optional[ProcessPoolExecutor] = None):
+        """
+        Drops a broken pool - the next page gets a new one. Pass the pool seen broken, so a pool
+        already replaced by another thread is kept.
+        """
+        with self._pool_lock:
+            pool = self._pool
+            if pool is None or (broken_pool is not None and pool is not broken_pool):
+                return
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _preload_languages(self) -> List[str]:
+        return list(self.get_config_value('preload_languages', []))
+
+    def warm_up(self):
+        """
+        Loads the readers for `preload_languages` from `strategies.yaml` up front,
+        so the first task does not pay for loading the model weights.
+        """
+        pool_size = int(self.get_config_value('pool_size', 1))
+        if pool_size > 1:
+            # Pool processes preload the readers in their initializer
+            pool = self._get_pool(pool_size)
+            for _ in range(pool_size):
+                pool.submit(os.getpid)
+            return
+
+        for language in self._preload_languages():
+            print(f"Preloading EasyOCR reader for languages: {language}")
+            reader_cache.get(language)
+
+    def reader_cache_stats(self) -> Dict[str, int]:
+        """
+        Reader cache hit/miss counters of this process, summed with the ones reported by the pool processes.
+        """
+        totals = dict(reader_cache.stats())
+        for pool_stats in self._pool_cache_stats.values():
+            for key, value in pool_stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
@@ -1,18 +1,23 @@
+import asyncio
 import os
+import re
 import tempfile
 import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import ollama
 
 from extract.extract_result import ExtractResult
 from text_extract_api.extract.strategies.strategy import Strategy
 from text_extract_api.files.file_formats.file_format import FileFormat
-from text_extract_api.files.file_formats.image import ImageFileFormat
+from text_extract_api.files.file_formats.image import ImageFileFormat, ImageProcessor
 
 
 class OllamaStrategy(Strategy):
     """Ollama models OCR strategy"""
 
+    PAGE_DELIMITER = "<<<PAGE_BREAK>>>"
+
     @classmethod
     def name(cls) -> str:
         return "llama_vision"
@@ -27,15 +32,32 @@ class OllamaStrategy(Strategy):
                 f"Ollama OCR - format {file_format.mime_type} is not supported (yet?)"
             )
 
-        images = FileFormat.convert_to(file_format, ImageFileFormat)
+        # Pages are rendered lazily, one window at a time, to keep memory usage flat for long documents
+        images = file_format.iterator(ImageFileFormat)
         extracted_text = ""
         start_time = time.time()
         ocr_percent_done = 0
-        num_pages = len(images)
+        num_pages = file_format.page_count
+
+        concurrency = int(self.get_config_value('concurrency', 1))
+        batch_size = int(self.get_config_value('batch_size', 1))
+        if concurrency > 1 or batch_size > 1:
+            extracted_text = asyncio.run(
+                self._extract_text_async(images, num_pages, start_time, concurrency, batch_size))
+            return ExtractResult.from_text(extracted_text)
+
         for i, image in enumerate(images):
+            self.publish_page(i + 1)
+            page_hash = image.hash
+            cached_text = self.get_cached_page(page_hash)
+            if cached_text is not None:
+                self.publish_chunk(cached_text)
+                extracted_text += cached_text
+                ocr_percent_done += int(20 / num_pages)
+                continue
 
             with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_file:
-                temp_file.write(image.binary)
+                temp_file.write(self._prepare_image(image))
                 temp_filename = temp_file.name
 
             print(self._strategy_config)
@@ -48,6 +70,7 @@ class OllamaStrategy(Strategy):
                 }], stream=True)
                 os.remove(temp_filename)
                 num_chunk = 1
+                page_text = ""
                 for chunk in response:
                     meta = {
                         'progress': str(30 + ocr_percent_done),
@@ -58,8 +81,11 @@ class OllamaStrategy(Strategy):
                         'elapsed_time': time.time() - start_time}
                     self.update_state_callback(state='PROGRESS', meta=meta)
                     num_chunk += 1
-                    extracted_text += chunk['message']['content']
+                    page_text += chunk['message']['content']
+                    self.publish_chunk(chunk['message']['content'])
 
+                extracted_text += page_text
+                self.cache_page(page_hash, page_text)
                 ocr_percent_done += int(
                     20 / num_pages)  # 20% of work is for OCR - just a stupid assumption from tasks.py
             except ollama.ResponseError as e:
@@ -69,3 +95,151 @@ class OllamaStrategy(Strategy):
             print(response)
 
         return ExtractResult.from_text(extracted_text)
+
+    def _prepare_image(self, image: FileFormat) -> bytes:
+        """
+        Downscales and recompresses the page according to `max_image_edge` and `jpeg_quality`
+        settings, so fewer bytes are sent to (and processed by) the model.
+        """
+        max_edge = self.get_config_value('max_image_edge')
+        quality = self.get_config_value('jpeg_quality')
+        if not max_edge and not quality:
+            return image.binary
+        return ImageProcessor.resize_image(image.binary, max_edge and int(max_edge), int(quality or 90))
+
+    def cache_params(self, language: str) -> Dict:
+        return {
+            'model': self.get_config_value('model'),
+            'prompt': self.get_config_value('prompt'),
+            'max_image_edge': self.get_config_value('max_image_edge'),
+            'jpeg_quality': self.get_config_value('jpeg_quality'),
+        }
+
+    def _next_batch(self, images: Iterator[FileFormat], batch_size: int) -> List[Tuple[str, Optional[str], bytes]]:
+        """
+        Renders up to `batch_size` pages. Returns (page hash, cached text, image) entries -
+        pages found in the page cache are not prepared for sending.
+        """
+        batch = []
+        for image in images:
+            page_hash = image.hash
+            cached_text = self.get_cached_page(page_hash)
+            batch.append((page_hash, cached_text, self._prepare_image(image) if cached_text is None else b""))
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    def _batch_prompt(self, prompt: str, num_images: int) -> str:
+        if num_images == 1:
+            return prompt
+        return (f"{prompt}\n\nYou are given {num_images} images - each of them is a separate page. "
+                f"Process them one by one, in order, and separate the result of each page "
+                f"with a line containing only {self.PAGE_DELIMITER}")
+
+    def split_batch_reply(self, reply: str, num_images: int) -> List[str]:
+        """
+        Splits a multi-page reply into per-page texts. Returns an empty list
+        when the number of pages in the reply does not match the batch.
+        """
+        if num_images == 1:
+            return [reply]
+        pages = re.split(r"\n?[ \t]*" + re.escape(self.PAGE_DELIMITER) + r"[ \t]*\n?", reply)
+        if len(pages) == num_images + 1 and not pages[-1].strip():
+            pages = pages[:-1]
+        return pages if len(pages) == num_images else []
+
+    async def _extract_text_async(
+            self,
+            images: Iterator[FileFormat],
+            num_pages: int,
+            start_time: float,
+            concurrency: int,
+            batch_size: int = 1
+    ) -> str:
+        """
+        Keeps up to `concurrency` requests of `batch_size` pages each in flight against
+        the Ollama server. Pages are rendered only when a slot is free; progress is
+        reported and text is assembled in page order.
+        """
+        model = self._strategy_config.get('model')
+        prompt = self._strategy_config.get('prompt')
+        client = ollama.AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+        batches: asyncio.Queue = asyncio.Queue()
+
+        async def chat(batch: List[bytes]) -> str:
+            response = await client.chat(model, [{
+                'role': 'user',
+                'content': self._batch_prompt(prompt, len(batch)),
+                'images': batch
+            }], stream=True)
+            reply = ""
+            async for chunk in response:
+                reply += chunk['message']['content']
+            return reply
+
+        async def ocr_batch(batch: List[Tuple[str, Optional[str], bytes]]) -> List[str]:
+            try:
+                uncached = [(page_hash, image) for page_hash, cached_text, image in batch if cached_text is None]
+                if not uncached:
+                    return [cached_text for _, cached_text, _ in batch]
+
+                to_send = [image for _, image in uncached]
+                page_texts = self.split_batch_reply(await chat(to_send), len(to_send))
+                if not page_texts:
+                    # The model did not keep the page delimiters - fall back to one request per page
+                    print(f"Ollama reply could not be split into {len(to_send)} pages, retrying page by page")
+                    page_texts = [await chat([image]) for image in to_send]
+
+                ocr_texts = dict(zip([page_hash for page_hash, _ in uncached], page_texts))
+                for page_hash, page_text in ocr_texts.items():
+                    self.cache_page(page_hash, page_text)
+                return [ocr_texts[page_hash] if cached_text is None else cached_text
+                        for page_hash, cached_text, _ in batch]
+            finally:
+                slots.release()
+
+        async def schedule_batches():
+            try:
+                while True:
+                    await slots.acquire()
+                    # Rendering pages is blocking (poppler) - keep the event loop free for the streams in flight.
+                    # `to_thread` carries over the task context (page cache) of the strategy
+                    batch = await asyncio.to_thread(self._next_batch, images, batch_size)
+                    if not batch:
+                        break
+                    await batches.put(asyncio.create_task(ocr_batch(batch)))
+            finally:
+                batches.put_nowait(None)
+
+        scheduler = asyncio.create_task(schedule_batches())
+        extracted_pages = []
+        try:
+            while True:
+                batch_task = await batches.get()
+                if batch_task is None:
+                    await scheduler  # re-raises page rendering errors
+                    break
+                for page_text in await batch_task:
+                    # Pages are OCR-ed concurrently - they are streamed whole, in order
+                    extracted_pages.append(page_text)
+                    self.publish_page(len(extracted_pages))
+                    self.publish_chunk(page_text)
+                meta = {
+                    'progress': str(30 + int(20 * len(extracted_pages) / max(num_pages, 1))),
+                    'status': 'OCR Processing'
+                              + '(page ' + str(len(extracted_pages)) + ' of ' + str(num_pages) + ')',
+                    'start_time': start_time,
+                    'elapsed_time': time.time() - start_time}
+                self.update_state(state='PROGRESS', meta=meta)
+        except ollama.ResponseError as e:
+            print('Error:', e.error)
+            raise Exception("Failed to generate text with Ollama model " + model)
+        finally:
+            scheduler.cancel()
+            while not batches.empty():
+                batch_task = batches.get_nowait()
+                if batch_task is not None:
+                    batch_task.cancel()
+
+        return "".join(extracted_pages)
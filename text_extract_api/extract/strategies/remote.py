@@ -1,24 +1,43 @@
 import os
-import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from extract.extract_result import ExtractResult
 
 from text_extract_api.extract.strategies.strategy import Strategy
 from text_extract_api.files.file_formats.file_format import FileFormat
-from text_extract_api.files.file_formats.image import ImageFileFormat
 from text_extract_api.files.file_formats.pdf import PdfFileFormat
-import requests
+
+# Responses worth retrying - the remote server is overloaded or restarting
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
 
 class RemoteStrategy(Strategy):
     """Remote API Strategy"""
 
+    PAGE_SEPARATOR = "\n\n"
+
+    def __init__(self):
+        super().__init__()
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+
     @classmethod
     def name(cls) -> str:
         return "remote"
 
     def extract_text(self, file_format: FileFormat, language: str = 'en') -> ExtractResult:
+        """
+        Sends the document to the remote OCR API. With `chunk_size` set in `strategies.yaml`, the document
+        is sent in page ranges of that many pages - up to `concurrency` of them at once - and the texts
+        are put back together in page order. Every request uploads only the pages of its range.
+        """
 
         if (
                 not isinstance(file_format, PdfFileFormat)
@@ -29,43 +48,104 @@ class RemoteStrategy(Strategy):
             )
 
         pdf_files = FileFormat.convert_to(file_format, PdfFileFormat)
-        extracted_text = ""
         start_time = time.time()
-        ocr_percent_done = 0
-        
+
         if len(pdf_files) > 1:
             raise ValueError("Only one PDF file is supported.")
-        
+
         if len(pdf_files) == 0:
             raise ValueError("No PDF file found - conversion error.")
 
-        try: 
-            url = os.getenv("REMOTE_API_URL", self._strategy_config.get("url"))
-            if not url:
-                raise Exception('Please do set the REMOTE_API_URL environment variable: export REMOTE_API_URL=http://...')
-            files = {'file': ('document.pdf', pdf_files[0].binary, 'application/pdf')}
-            data = {
-                'page_range': None,
-                'languages': language,
-                'force_ocr': False,
-                'paginate_output': False,
-                'output_format': 'markdown' # TODO: support JSON output format
-            }
-
-            meta = {
-                'progress': str(30 + ocr_percent_done),
-                'status': 'OCR Processing',
-                'start_time': start_time,
-                'elapsed_time': time.time() - start_time}
-            self.update_state_callback(state='PROGRESS', meta=meta)
-
-            response = requests.post(url, files=files, data=data)
-            if response.status_code != 200:
-                raise Exception(f"Failed to upload PDF file: {response.content}")
-
-            extracted_text = response.json().get('output', '')
+        url = os.getenv("REMOTE_API_URL", self._strategy_config.get("url"))
+        if not url:
+            raise Exception('Please do set the REMOTE_API_URL environment variable: export REMOTE_API_URL=http://...')
+
+        pdf_file = pdf_files[0]
+        chunks = self._page_chunks(pdf_file)
+        concurrency = max(1, int(self.get_config_value('concurrency', 1)))
+
+        meta = {
+            'progress': 30,
+            'status': 'OCR Processing' + (f' ({len(chunks)} page ranges)' if len(chunks) > 1 else ''),
+            'start_time': start_time,
+            'elapsed_time': time.time() - start_time}
+        self.update_state(state='PROGRESS', meta=meta)
+
+        try:
+            chunk_texts = []
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks))) as executor:
+                # Results are collected in page order - chunks finished early wait for the preceding ones
+                futures = [executor.submit(self._post_chunk, url, pdf_file, page_range, language)
+                           for page_range in chunks]
+                try:
+                    for future in futures:
+                        chunk_texts.append(future.result())
+                        self.publish_chunk((self.PAGE_SEPARATOR if len(chunk_texts) > 1 else '') + chunk_texts[-1])
+                        if len(chunks) > 1:
+                            self.update_state(state='PROGRESS', meta={
+                                'progress': 30 + int(20 * len(chunk_texts) / len(chunks)),
+                                'status': f'OCR Processing (page range {len(chunk_texts)} of {len(chunks)})',
+                                'start_time': start_time,
+                                'elapsed_time': time.time() - start_time})
+                finally:
+                    for future in futures:
+                        future.cancel()
         except Exception as e:
             print('Error:', e)
             raise Exception("Failed to generate text with Remote API. Make sure the remote server is up and running")
-            
-        return ExtractResult.from_text(extracted_text)
+
+        return ExtractResult.from_text(self.join_pages(chunk_texts))
+
+    def _page_chunks(self, pdf_file: FileFormat) -> List[Optional[Tuple[int, int]]]:
+        """
+        Page ranges (1-based, inclusive) to send in separate requests - `[None]` sends the whole document at once.
+        """
+        chunk_size = int(self.get_config_value('chunk_size', 0))
+        if not chunk_size:
+            return [pdf_file.page_range]
+
+        first_page = pdf_file.page_range[0] if pdf_file.page_range else 1
+        last_page = first_page + pdf_file.page_count - 1
+        return [(first, min(first + chunk_size - 1, last_page)) for first in range(first_page, last_page + 1, chunk_size)]
+
+    def _post_chunk(self, url: str, pdf_file: PdfFileFormat, page_range: Optional[Tuple[int, int]],
+                    language: str) -> str:
+        # Only the pages of the range are uploaded - not the whole document with every chunk
+        pdf_binary = pdf_file.extract_pages(*page_range).binary if page_range else pdf_file.binary
+        files = {'file': ('document.pdf', pdf_binary, 'application/pdf')}
+        data = {
+            'languages': language,
+            'force_ocr': False,
+            'paginate_output': False,
+            'output_format': 'markdown' # TODO: support JSON output format
+        }
+
+        timeout = self.get_config_value('timeout')
+        response = self.session().post(url, files=files, data=data, timeout=float(timeout) if timeout else None)
+        if response.status_code != 200:
+            raise Exception(f"Failed to upload PDF file: {response.content}")
+
+        return response.json().get('output', '')
+
+    def session(self) -> requests.Session:
+        """
+        HTTP session shared by the tasks - keeps up to `concurrency` connections to the remote API alive
+        and retries failed requests (`retries` times, with exponential `backoff_factor`).
+        """
+        with self._session_lock:
+            if self._session is None:
+                retry = Retry(
+                    total=int(self.get_config_value('retries', 3)),
+                    backoff_factor=float(self.get_config_value('backoff_factor', 0.5)),
+                    status_forcelist=RETRY_STATUSES,
+                    # The OCR requests are idempotent - POSTs are safe to retry
+                    allowed_methods=None,
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_maxsize=max(1, int(self.get_config_value('concurrency', 1))),
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
@@ -1,33 +1,127 @@
 from __future__ import annotations
+import contextvars
 import os
-import yaml
 import importlib
 import pkgutil
-from typing import Type, Dict
+from typing import Type, Dict, List, Optional, Tuple
 
 from pydantic.v1.typing import get_class
 
 from extract.extract_result import ExtractResult
+from text_extract_api.config_loader import get_config_file_path, load_config
 from text_extract_api.files.file_formats.file_format import FileFormat
 
 class Strategy:
     _strategies: Dict[str, Strategy] = {}
     _strategy_config: Dict[str, Dict] = {}
+    # Put between the texts of consecutive pages (or page ranges OCR-ed by separate tasks)
+    PAGE_SEPARATOR: str = ""
 
     def __init__(self):
-        self.update_state_callback = None
         self._strategy_config = None
+        # Strategies are singletons - state of the task being processed is kept per thread (and asyncio task),
+        # so a thread pool worker can run many tasks with the same strategy at once
+        self._task_context = contextvars.ContextVar(f"{type(self).__name__}_task_{id(self)}", default=None)
+
+    def _task_state(self) -> Dict:
+        state = self._task_context.get()
+        if state is None:
+            state = {}
+            self._task_context.set(state)
+        return state
+
+    @property
+    def update_state_callback(self):
+        return self._task_state().get('update_state_callback')
+
+    @property
+    def page_cache(self):
+        return self._task_state().get('page_cache')
+
+    @property
+    def output_stream(self):
+        return self._task_state().get('output_stream')
 
     def set_strategy_config(self, config: Dict):
         self._strategy_config = config
 
+    def get_config_value(self, key: str, default=None):
+        if not self._strategy_config:
+            return default
+        value = self._strategy_config.get(key)
+        return default if value is None else value
+
     def set_update_state_callback(self, callback):
-        self.update_state_callback = callback
+        self._task_state()['update_state_callback'] = callback
 
     def update_state(self, state, meta):
         if self.update_state_callback:
             self.update_state_callback(state, meta)
 
+    def set_page_cache(self, page_cache):
+        self._task_state()['page_cache'] = page_cache
+
+    def cache_params(self, language: str) -> Dict:
+        """
+        Parameters affecting the OCR result - they are a part of the document and page cache keys.
+        """
+        return {'language': language}
+
+    def get_cached_page(self, page_hash: str) -> Optional[str]:
+        if self.page_cache:
+            return self.page_cache.get(page_hash)
+        return None
+
+    def cache_page(self, page_hash: str, text: str):
+        if self.page_cache:
+            self.page_cache.set(page_hash, text)
+
+    def set_output_stream(self, output_stream):
+        self._task_state()['output_stream'] = output_stream
+
+    def publish_page(self, page: int):
+        """
+        Marks the beginning of the given (1-based) page in the output streamed to the client.
+        """
+        if self.output_stream:
+            self.output_stream.page(page)
+
+    def publish_chunk(self, text: str):
+        """
+        Streams a piece of the extracted text to the client as soon as it's generated.
+        """
+        if self.output_stream:
+            self.output_stream.chunk(text)
+
+    def join_pages(self, page_texts: List[str]) -> str:
+        return self.PAGE_SEPARATOR.join(page_texts)
+
+    def page_ranges(self, file_format: FileFormat) -> List[Tuple[int, int]]:
+        """
+        Splits the document into ranges of `page_range_size` pages (`strategies.yaml`) to be OCR-ed
+        by separate tasks. Returns an empty list when the whole document should be processed by one task.
+        """
+        page_range_size = int(self.get_config_value('page_range_size', 0))
+        if not page_range_size or not file_format.is_pageable():
+            return []
+        num_pages = file_format.page_count
+        if num_pages <= page_range_size:
+            return []
+        return [(first_page, min(first_page + page_range_size - 1, num_pages))
+                for first_page in range(1, num_pages + 1, page_range_size)]
+
+    def warm_up(self):
+        """
+        Hook called once when a worker process boots - strategies may preload models here.
+        """
+        pass
+
+    def shutdown(self):
+        """
+        Hook called when a worker process shuts down - strategies release their processes, connections etc. here.
+        """
+        pass
+
     @classmethod
     def name(cls) -> str:
         raise NotImplementedError("Strategy subclasses must implement name")
@@ -72,17 +166,8 @@ class Strategy:
     @classmethod
     def load_strategies_from_config(cls, path: str = os.getenv('OCR_CONFIG_PATH', 'config/strategies.yaml')):
         strategies = cls._strategies
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(path)))
-        config_file_path = os.path.join(project_root, path)
-
-        if not os.path.isfile(config_file_path):
-            raise FileNotFoundError(f"Config file not found at path: {config_file_path}")
-
-        with open(config_file_path, 'r') as f:
-            config = yaml.safe_load(f)
-
-        if 'strategies' not in config or not isinstance(config['strategies'], dict):
-            raise ValueError(f"Missing or invalid 'strategies' section in the {config_file_path} file")
+        config_file_path = get_config_file_path(path)
+        config = load_config(path)
 
         for strategy_name, strategy_config in config['strategies'].items():
             if 'class' not in strategy_config:
@@ -101,6 +186,23 @@ class Strategy:
 
         return strategies
 
+    @classmethod
+    def warm_up_strategies(cls):
+        cls.load_strategies_from_config()
+        for strategy_name, strategy in cls._strategies.items():
+            if isinstance(strategy, Strategy):
+                print(f"Warming up strategy {strategy_name}")
+                strategy.warm_up()
+
+    @classmethod
+    def shutdown_strategies(cls):
+        for strategy_name, strategy in cls._strategies.items():
+            if isinstance(strategy, Strategy):
+                try:
+                    strategy.shutdown()
+                except Exception as e:
+                    print(f"Error shutting down strategy {strategy_name}:", e)
+
     @classmethod
     def autodiscover_strategies(cls) -> Dict[str, Type]:
         strategies = cls._strategies
@@ -0,0 +1,75 @@
+from typing import Dict, List
+
+from celery import states
+from celery.backends.base import BaseBackend, KeyValueStoreBackend
+from celery.result import AsyncResult
+
+# Keys fetched by a single MGET - keeps the Redis replies reasonably small for large batches
+MGET_CHUNK_SIZE = 1000
+
+
+def fetch_task_metas(backend: BaseBackend, task_ids: List[str]) -> List[Dict]:
+    """
+    Fetches the stored state of many tasks at once, in the order of `task_ids`.
+
+    Key-value result backends (Redis) are read with a few MGET round-trips instead of one GET
+    per task; other backends fall back to AsyncResult. Tasks without a stored state are PENDING.
+    """
+    if isinstance(backend, KeyValueStoreBackend):
+        try:
+            return _mget_task_metas(backend, task_ids)
+        except NotImplementedError:
+            pass
+
+    metas = []
+    for task_id in task_ids:
+        task = AsyncResult(task_id, backend=backend)
+        metas.append({'task_id': task_id, 'status': task.state, 'result': task.info})
+    return metas
+
+
+def _mget_task_metas(backend: KeyValueStoreBackend, task_ids: List[str]) -> List[Dict]:
+    metas = []
+    for i in range(0, len(task_ids), MGET_CHUNK_SIZE):
+        chunk = task_ids[i:i + MGET_CHUNK_SIZE]
+        keys = [backend.get_key_for_task(task_id) for task_id in chunk]
+        values = backend.mget(keys)
+        if hasattr(values, 'items'):
+            # Memcached-like clients return a mapping of the found keys only
+            values = [values.get(key) for key in keys]
+        for task_id, value in zip(chunk, values):
+            if value is None:
+                metas.append({'task_id': task_id, 'status': states.PENDING, 'result': None})
+            else:
+                meta = backend.decode_result(value)
+                meta['task_id'] = task_id
+                metas.append(meta)
+    return metas
+
+
+def task_progress(meta: Dict) -> int:
+    if meta['status'] in states.READY_STATES:
+        return 100
+    if isinstance(meta['result'], dict):
+        # LLM post-processing reports the chunk number as progress - keep it within bounds
+        return min(int(meta['result'].get('progress', 0)), 99)
+    return 0
+
+
+def summarize_task(meta: Dict, include_result: bool = True) -> Dict:
+    """
+    Status of a single task in the shape of the `/ocr/result/{task_id}` response.
+    """
+    state = meta['status']
+    summary = {'task_id': meta['task_id'], 'state': state, 'progress': task_progress(meta)}
+    if state == states.SUCCESS:
+        summary['status'] = "Task completed successfully."
+        if include_result:
+            summary['result'] = meta['result']
+    elif state in states.EXCEPTION_STATES:
+        summary['status'] = str(meta['result'])
+    elif isinstance(meta['result'], dict):
+        summary['status'] = meta['result'].get('status')
+    else:
+        summary['status'] = "Task is pending..."
+    return summary
@@ -1,24 +1,135 @@
 import os
 import time
-from typing import Optional
+from typing import Dict, List, Optional, Tuple, Union
 
 import ollama
 import redis
+from celery import chord
+from celery.signals import worker_process_shutdown
 
+from text_extract_api.cache.cache_key import build_cache_key
+from text_extract_api.cache.ocr_cache import OcrCache
 from text_extract_api.celery_app import app as celery_app
+from text_extract_api.extract.output_stream import OutputStream
+from text_extract_api.extract.page_cache import PageCache
+from text_extract_api.extract.progress_reporter import ProgressReporter
+from text_extract_api.extract.scheduling import QueueDepth
+from text_extract_api.extract.single_flight import SingleFlight
 from text_extract_api.extract.strategies.strategy import Strategy
+from text_extract_api.files.blob_stores.blob_store import get_blob_store
 from text_extract_api.files.file_formats.file_format import FileFormat
 from text_extract_api.files.storage_manager import StorageManager
 
 # Connect to Redis
 redis_url = os.getenv('REDIS_CACHE_URL', 'redis://redis:6379/1')
 redis_client = redis.StrictRedis.from_url(redis_url)
+cache = OcrCache(redis_client)
+single_flight = SingleFlight(redis_client)
+queue_depth = QueueDepth(redis_client)
 
 
-@celery_app.task(bind=True)
+@worker_process_shutdown.connect
+def flush_cache_stats(**kwargs):
+    # The cache counters are buffered - the ones counted since the last flush would be lost
+    cache.flush_stats()
+
+
+def wait_for_leader(progress: ProgressReporter, document_cache_key: str) -> Optional[str]:
+    """
+    Waits until the identical job holding the lease finishes and returns its cached result.
+    Returns None if the leader is gone without caching the result.
+    """
+    poll_interval = float(os.getenv('OCR_SINGLE_FLIGHT_POLL_INTERVAL', 1))
+    leader = single_flight.owner(document_cache_key)
+    while leader is not None:
+        progress.update_state(state='PROGRESS', meta={'progress': 30, 'status': f'Waiting for identical job {leader}'})
+        time.sleep(poll_interval)
+        leader = single_flight.owner(document_cache_key)
+    return cache.get(document_cache_key)
+
+
+def load_document(blob_key: Union[str, bytes]) -> FileFormat:
+    # Backward compatibility - tasks enqueued before the blob store was introduced carry the content inline
+    binary_content = blob_key if isinstance(blob_key, bytes) else get_blob_store().get(blob_key)
+    return FileFormat.from_binary(binary_content)
+
+
+def extract_text(progress: ProgressReporter, strategy: Strategy, file_format: FileFormat, language: str) -> str:
+    print(f"Extracting text from file using strategy: {strategy.name()}")
+    progress.update_state(state='PROGRESS',
+                          meta={'progress': 30, 'status': 'Extracting text from file'})  # Example progress update
+    try:
+        extract_result = strategy.extract_text(file_format, language)
+    finally:
+        # The last coalesced page/chunk update is written before the task goes on - or fails, as Celery records
+        # the failure before `on_failure()` is called and a progress update written there would overwrite it
+        progress.flush()
+    return extract_result.text
+
+
+def finish_ocr(
+        progress: ProgressReporter,
+        output_stream: OutputStream,
+        extracted_text: str,
+        filename: str,
+        prompt: Optional[str],
+        model: Optional[str],
+        storage_profile: Optional[str],
+        storage_filename: Optional[str],
+        meta: Optional[Dict] = None,
+        request_key: Optional[str] = None
+) -> str:
+    """
+    Post-processing of the extracted text - the optional LLM prompt and saving the result to the storage.
+    Releases the lease of the request (see `prepare_ocr_task()`), so identical requests are sent again.
+    """
+    print("After extracted text")
+    # The extracted text is stored once and only referenced by this and the following updates
+    progress.store_text('extracted_text', extracted_text)
+    progress.update_state(state='PROGRESS', meta={'progress': 50, 'status': 'Text extracted', **(meta or {})},
+                          force=True)  # Example progress update
+
+    if prompt:
+        print(f"Transforming text using LLM (prompt={prompt}, model={model}) ...")
+        progress.update_state(state='PROGRESS', meta={'progress': 75, 'status': 'Processing LLM'}, force=True)
+        llm_resp = ollama.generate(model, prompt + extracted_text, stream=True)
+        num_chunk = 1
+        extracted_text = ''  # will be filled with chunks from llm
+        for chunk in llm_resp:
+            progress.update_state(state='PROGRESS',
+                                  meta={'progress': num_chunk, 'status': 'LLM Processing chunk no: ' + str(num_chunk)})
+            num_chunk += 1
+            extracted_text += chunk['response']
+            output_stream.chunk(chunk['response'], source='llm')
+        progress.flush()
+
+    if storage_profile:
+        if not storage_filename:
+            storage_filename = filename.replace('.', '_') + '.pdf'
+
+        storage_manager = StorageManager.get(storage_profile)
+        storage_manager.save(filename, storage_filename, extracted_text)
+
+    output_stream.done()
+    progress.update_state(state='DONE', meta={'progress': 100, 'status': 'Processing done!'})
+    if request_key:
+        single_flight.release(request_key, progress.task_id)
+
+    return extracted_text
+
+
+class OcrTask(celery_app.Task):
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        # Let the clients streaming the output know it's not coming
+        OutputStream(redis_client, task_id).error(str(exc))
+        if kwargs and kwargs.get('request_key'):
+            single_flight.release(kwargs['request_key'], task_id)
+
+
+@celery_app.task(bind=True, base=OcrTask)
 def ocr_task(
         self,
-        binary_content: bytes,
+        blob_key: Union[str, bytes],
         strategy_name: str,
         filename: str,
         file_hash: str,
@@ -28,69 +139,196 @@ def ocr_task(
         language: Optional[str] = None,
         storage_profile: Optional[str] = None,
         storage_filename: Optional[str] = None,
+        tenant: Optional[str] = None,
+        request_key: Optional[str] = None,
 ):
     """
     Celery task to perform OCR processing on a PDF/Office/image file.
+
+    The file is passed by `blob_key` - the key under which the API stored it in the blob store.
+    Its content is fetched only when it's not found in the OCR cache.
+    The `tenant` is only used to keep count of its queued tasks - the API routes them to its lane.
+    The lease of the `request_key` taken by the API is released once the task is done.
+
+    Documents longer than the `page_range_size` of the strategy are split into page ranges OCR-ed by
+    `ocr_page_range_task`s on many workers at once; the task is then replaced by the chord merging them.
     """
     start_time = time.time()
+    queue_depth.started(tenant)
 
     strategy = Strategy.get_strategy(strategy_name)
-    strategy.set_update_state_callback(self.update_state)
+    # Progress of streamed pages/chunks is coalesced, so it does not cost a result backend write per token
+    progress = ProgressReporter(self.update_state, redis_client, self.request.id, start_time)
+    strategy.set_update_state_callback(progress.update_state)
+
+    # Cache keys cover everything affecting the OCR output, so results are never shared between strategies/models
+    cache_params = strategy.cache_params(language)
+    cache_ttl = strategy.get_config_value('cache_ttl')
+    document_cache_key = build_cache_key('document', strategy_name, file_hash, cache_params)
+
+    # Pages already OCR-ed (in this or any other document) are not recomputed
+    page_cache = PageCache(cache, strategy_name, cache_params, cache_ttl) if ocr_cache else None
+    strategy.set_page_cache(page_cache)
 
-    self.update_state(state='PROGRESS', status="File uploaded successfully",
-                      meta={'progress': 10})  # Example progress update
+    # Pages and text chunks are streamed to `/ocr/stream/{task_id}` clients as they are extracted
+    output_stream = OutputStream(redis_client, self.request.id)
+    strategy.set_output_stream(output_stream)
+
+    progress.update_state(state='PROGRESS', meta={'progress': 10, 'status': "File uploaded successfully"})
+
+    def process_page_ranges(page_ranges: List[Tuple[int, int]], lease_owner: Optional[str] = None):
+        # Page ranges are OCR-ed by many workers at once - the merge task takes over this task id and finishes the job
+        delivery_info = self.request.delivery_info or {}
+        options = {option: delivery_info[key] for option, key in (('queue', 'routing_key'), ('priority', 'priority'))
+                   if delivery_info.get(key) is not None}
+        header = [ocr_page_range_task.signature(args=[blob_key, strategy_name, first_page, last_page, ocr_cache, language],
+                                                kwargs={'tenant': tenant}, **options)
+                  for first_page, last_page in page_ranges]
+        body = ocr_merge_task.signature(args=[strategy_name, filename, file_hash, ocr_cache, prompt, model, language,
+                                              storage_profile, storage_filename, start_time, lease_owner],
+                                        kwargs={'request_key': request_key}, **options)
+        # A failed range never runs the merge task - the error callback lets the waiting jobs and clients go
+        body.link_error(ocr_page_ranges_failed.s(self.request.id, document_cache_key=document_cache_key,
+                                                 lease_owner=lease_owner, request_key=request_key))
+        print(f"Splitting the document into {len(page_ranges)} page ranges")
+        progress.update_state(state='PROGRESS', meta={'progress': 30, 'page_ranges': len(page_ranges),
+                                                      'status': f'OCR Processing ({len(page_ranges)} page ranges)'},
+                              force=True)
+        progress.flush()
+        return self.replace(chord(header, body))
 
     extracted_text = None
     if ocr_cache:
-        cached_result = redis_client.get(file_hash)
-        if cached_result:
-            # Return cached result if available
-            extracted_text = cached_result.decode('utf-8')
-
-    if extracted_text is None:
-        print(f"Extracting text from file using strategy: {strategy.name()}")
-        self.update_state(state='PROGRESS',
-                          meta={'progress': 30, 'status': 'Extracting text from file', 'start_time': start_time,
-                                'elapsed_time': time.time() - start_time})  # Example progress update
-        extract_result = strategy.extract_text(FileFormat.from_binary(binary_content), language)
-        extracted_text = extract_result.text
+        # Return cached result if available
+        extracted_text = cache.get(document_cache_key)
+
+    if extracted_text is None and ocr_cache:
+        # Only one of the identical jobs running at once extracts the text - the others wait for its result
+        with single_flight.lease(document_cache_key, self.request.id) as is_leader:
+            if not is_leader:
+                print("Identical job in progress, waiting for its result...")
+                extracted_text = wait_for_leader(progress, document_cache_key)
+                if extracted_text is not None:
+                    output_stream.chunk(extracted_text)
+
+            if extracted_text is None:
+                file_format = load_document(blob_key)
+                page_ranges = strategy.page_ranges(file_format)
+                if page_ranges:
+                    # The lease is handed over to the merge task, which releases it once the result is cached
+                    lease_owner = f"{self.request.id}:merge"
+                    single_flight.replace(document_cache_key, lease_owner,
+                                          int(os.getenv('OCR_PAGE_RANGES_LEASE_TTL', 3600)))
+                    return process_page_ranges(page_ranges, lease_owner)
+                extracted_text = extract_text(progress, strategy, file_format, language)
+                # @todo Universal Text Object - is cache available
+                cache.set(document_cache_key, extracted_text, cache_ttl)
+
+    elif extracted_text is None:
+        file_format = load_document(blob_key)
+        page_ranges = strategy.page_ranges(file_format)
+        if page_ranges:
+            return process_page_ranges(page_ranges)
+        extracted_text = extract_text(progress, strategy, file_format, language)
 
     else:
         print("Using cached result...")
+        output_stream.chunk(extracted_text)
 
-    print("After extracted text")
-    self.update_state(state='PROGRESS',
-                      meta={'progress': 50, 'status': 'Text extracted', 'extracted_text': extracted_text,
-                            'start_time': start_time,
-                            'elapsed_time': time.time() - start_time})  # Example progress update
+    meta = {}
+    if page_cache:
+        print(f"Page cache: {page_cache.stats()}")
+        meta['page_cache'] = page_cache.stats()
+    return finish_ocr(progress, output_stream, extracted_text, filename, prompt, model, storage_profile,
+                      storage_filename, meta, request_key)
 
-    # @todo Universal Text Object - is cache available
-    if ocr_cache:
-        redis_client.set(file_hash, extracted_text)
 
-    if prompt:
-        print(f"Transforming text using LLM (prompt={prompt}, model={model}) ...")
-        self.update_state(state='PROGRESS', meta={'progress': 75, 'status': 'Processing LLM', 'start_time': start_time,
-                                                  'elapsed_time': time.time() - start_time})  # Example progress update
-        llm_resp = ollama.generate(model, prompt + extracted_text, stream=True)
-        num_chunk = 1
-        extracted_text = ''  # will be filled with chunks from llm
-        for chunk in llm_resp:
-            self.update_state(state='PROGRESS',
-                              meta={'progress': num_chunk, 'status': 'LLM Processing chunk no: ' + str(num_chunk),
-                                    'start_time': start_time,
-                                    'elapsed_time': time.time() - start_time})  # Example progress update
-            num_chunk += 1
-            extracted_text += chunk['response']
+@celery_app.task(bind=True)
+def ocr_page_range_task(
+        self,
+        blob_key: Union[str, bytes],
+        strategy_name: str,
+        first_page: int,
+        last_page: int,
+        ocr_cache: bool,
+        language: Optional[str] = None,
+        tenant: Optional[str] = None,
+) -> str:
+    """
+    Celery task to OCR the given pages (1-based, inclusive) of a document - a part of an `ocr_task`
+    split into page ranges (see `Strategy.page_ranges()`). Returns the text of the pages.
+    """
+    print(f"Extracting pages {first_page}-{last_page} using strategy: {strategy_name}")
+    strategy = Strategy.get_strategy(strategy_name)
+    progress = ProgressReporter(self.update_state, redis_client, self.request.id, time.time())
+    strategy.set_update_state_callback(progress.update_state)
 
-    if storage_profile:
-        if not storage_filename:
-            storage_filename = filename.replace('.', '_') + '.pdf'
+    cache_params = strategy.cache_params(language)
+    cache_ttl = strategy.get_config_value('cache_ttl')
+    strategy.set_page_cache(PageCache(cache, strategy_name, cache_params, cache_ttl) if ocr_cache else None)
+    # Ranges are OCR-ed at once - the merge task streams their output in page order
+    strategy.set_output_stream(None)
 
-        storage_manager = StorageManager(storage_profile)
-        storage_manager.save(filename, storage_filename, extracted_text)
+    file_format = load_document(blob_key).with_page_range(first_page, last_page)
+    return extract_text(progress, strategy, file_format, language)
 
-    self.update_state(state='DONE', meta={'progress': 100, 'status': 'Processing done!', 'start_time': start_time,
-                                          'elapsed_time': time.time() - start_time})
 
-    return extracted_text
+@celery_app.task
+def ocr_page_ranges_failed(
+        request,
+        exc: Exception,
+        traceback,
+        task_id: str,
+        document_cache_key: Optional[str] = None,
+        lease_owner: Optional[str] = None,
+        request_key: Optional[str] = None,
+):
+    """
+    Error callback of the chord of an `ocr_task` split into page ranges - called when a range or the merge
+    task fails. Ends the output stream with the error and releases the leases the merge task would release.
+    """
+    print(f"OCR of the page ranges of task {task_id} failed: {exc}")
+    OutputStream(redis_client, task_id).error(str(exc))
+    if lease_owner:
+        single_flight.release(document_cache_key, lease_owner)
+    if request_key:
+        single_flight.release(request_key, task_id)
+
+
+@celery_app.task(bind=True, base=OcrTask)
+def ocr_merge_task(
+        self,
+        page_texts: List[str],
+        strategy_name: str,
+        filename: str,
+        file_hash: str,
+        ocr_cache: bool,
+        prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        language: Optional[str] = None,
+        storage_profile: Optional[str] = None,
+        storage_filename: Optional[str] = None,
+        start_time: Optional[float] = None,
+        lease_owner: Optional[str] = None,
+        request_key: Optional[str] = None,
+):
+    """
+    Chord callback of an `ocr_task` split into page ranges - runs with its task id. Stitches the texts
+    of the ranges in page order, caches the result and finishes the processing (LLM prompt, storage) once.
+    """
+    strategy = Strategy.get_strategy(strategy_name)
+    progress = ProgressReporter(self.update_state, redis_client, self.request.id, start_time or time.time())
+    output_stream = OutputStream(redis_client, self.request.id)
+
+    extracted_text = strategy.join_pages(page_texts)
+    output_stream.chunk(extracted_text)
+
+    if ocr_cache:
+        cache_params = strategy.cache_params(language)
+        document_cache_key = build_cache_key('document', strategy_name, file_hash, cache_params)
+        cache.set(document_cache_key, extracted_text, strategy.get_config_value('cache_ttl'))
+        if lease_owner:
+            single_flight.release(document_cache_key, lease_owner)
+
+    return finish_ocr(progress, output_stream, extracted_text, filename, prompt, model, storage_profile,
+                      storage_filename, {'page_ranges': len(page_texts)}, request_key)
@@ -0,0 +1,73 @@
+import os
+import re
+from typing import BinaryIO
+
+# Blobs are keyed by the MD5 hash of their content (see `store_upload()`)
+BLOB_KEY_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def is_valid_blob_key(key: str) -> bool:
+    return bool(BLOB_KEY_PATTERN.fullmatch(key))
+
+
+class BlobStore:
+    """
+    Content-addressed store for uploaded documents.
+
+    The API writes every upload once, keyed by its hash, and Celery tasks receive only
+    the key - so documents do not travel through (and are not held in) the broker.
+    Identical uploads share the same key and are stored only once.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    def put(self, key: str, content: bytes) -> bool:
+        """
+        Stores the content under the key, unless it's already stored (then only its TTL is refreshed).
+        Returns True if the content was written.
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def put_stream(self, key: str, file: BinaryIO) -> bool:
+        """
+        Same as `put()`, but reads the content from a file object in chunks - so large uploads are not held in memory.
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def get(self, key: str) -> bytes:
+        """
+        Raises:
+            KeyError: If there is no blob stored under the key (e.g. it expired).
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def delete(self, key: str):
+        raise NotImplementedError("Subclasses must implement this method")
+
+
+_blob_store = None
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Returns the process-wide blob store configured by the `BLOB_STORE` env variable:
+    - `redis` (default) - blobs kept in Redis (`BLOB_STORE_REDIS_URL`) with a TTL,
+    - `local` - blobs kept in a directory shared by the API and workers (`BLOB_STORE_PATH`).
+    """
+    global _blob_store
+    if _blob_store is None:
+        ttl = int(os.getenv('BLOB_STORE_TTL', 24 * 3600))
+        store_type = os.getenv('BLOB_STORE', 'redis')
+        if store_type == 'redis':
+            from text_extract_api.files.blob_stores.redis_blob_store import RedisBlobStore
+            _blob_store = RedisBlobStore(os.getenv('BLOB_STORE_REDIS_URL', 'redis://redis:6379/2'), ttl)
+        elif store_type == 'local':
+            from text_extract_api.files.blob_stores.local_directory import LocalDirectoryBlobStore
+            _blob_store = LocalDirectoryBlobStore(os.getenv('BLOB_STORE_PATH', './storage/blobs'), ttl)
+        else:
+            raise ValueError(f"Unknown blob store '{store_type}'")
+    return _blob_store
@@ -0,0 +1,82 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO
+
+from text_extract_api.files.blob_stores.blob_store import BlobStore
+
+
+class LocalDirectoryBlobStore(BlobStore):
+    """
+    Keeps blobs in a directory - it has to be shared (mounted) by the API and all the workers.
+    Blobs not uploaded again within the TTL are purged.
+    """
+
+    PURGE_INTERVAL = 600
+
+    def __init__(self, root_path: str, ttl: int):
+        super().__init__(ttl)
+        self.root_path = os.path.abspath(os.path.expanduser(root_path))
+        os.makedirs(self.root_path, exist_ok=True)
+        self._last_purge = 0.0
+
+    def _path(self, key: str) -> str:
+        if not key or os.sep in key or key.startswith('.'):
+            raise ValueError(f"Invalid blob key '{key}'")
+        return os.path.join(self.root_path, key[:2], key)
+
+    def put(self, key: str, content: bytes) -> bool:
+        return self.put_stream(key, io.BytesIO(content))
+
+    def put_stream(self, key: str, file: BinaryIO) -> bool:
+        if time.time() - self._last_purge > self.PURGE_INTERVAL:
+            self.purge_expired()
+        path = self._path(key)
+        if os.path.isfile(path):
+            os.utime(path)  # refresh the TTL
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename it, so readers never see a partially written blob
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as blob:
+                shutil.copyfileobj(file, blob)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return True
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), 'rb') as file:
+                return file.read()
+        except FileNotFoundError as e:
+            raise KeyError(f"Blob '{key}' not found - it might have expired.") from e
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self):
+        now = time.time()
+        self._last_purge = now
+        if not self.ttl:
+            return
+        for entry in os.scandir(self.root_path):
+            if not entry.is_dir():
+                continue
+            for blob in os.scandir(entry.path):
+                try:
+                    if blob.is_file() and blob.stat().st_mtime < now - self.ttl:
+                        os.remove(blob.path)
+                except FileNotFoundError:
+                    pass
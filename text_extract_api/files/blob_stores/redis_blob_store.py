@@ -0,0 +1,67 @@
+import uuid
+from typing import BinaryIO
+
+import redis
+
+from text_extract_api.files.blob_stores.blob_store import BlobStore
+
+
+class RedisBlobStore(BlobStore):
+    KEY_PREFIX = "blob"
+    CHUNK_SIZE = 1024 * 1024
+    # Temporary keys of interrupted uploads expire on their own
+    TEMP_KEY_TTL = 600
+
+    def __init__(self, redis_url: str, ttl: int):
+        super().__init__(ttl)
+        self.redis_client = redis.StrictRedis.from_url(redis_url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def put(self, key: str, content: bytes) -> bool:
+        written = self.redis_client.set(self._key(key), content, ex=self.ttl or None, nx=True)
+        if not written and self.ttl:
+            self.redis_client.expire(self._key(key), self.ttl)
+        return bool(written)
+
+    def put_stream(self, key: str, file: BinaryIO) -> bool:
+        if self.exists(key):
+            if self.ttl:
+                self.redis_client.expire(self._key(key), self.ttl)
+            return False
+
+        # Append the chunks to a temporary key and rename it at the end, so readers never see a partial blob
+        temp_key = f"{self.KEY_PREFIX}:tmp:{uuid.uuid4().hex}"
+        try:
+            chunk = file.read(self.CHUNK_SIZE)
+            if not chunk:
+                return self.put(key, chunk)
+            while chunk:
+                pipe = self.redis_client.pipeline()
+                pipe.append(temp_key, chunk)
+                pipe.expire(temp_key, self.TEMP_KEY_TTL)
+                pipe.execute()
+                chunk = file.read(self.CHUNK_SIZE)
+            written = self.redis_client.renamenx(temp_key, self._key(key))
+            if written:
+                # The renamed key keeps the TTL of the temporary one
+                if self.ttl:
+                    self.redis_client.expire(self._key(key), self.ttl)
+                else:
+                    self.redis_client.persist(self._key(key))
+            return bool(written)
+        finally:
+            self.redis_client.delete(temp_key)
+
+    def get(self, key: str) -> bytes:
+        content = self.redis_client.get(self._key(key))
+        if content is None:
+            raise KeyError(f"Blob '{key}' not found - it might have expired.")
+        return content
+
+    def exists(self, key: str) -> bool:
+        return bool(self.redis_client.exists(self._key(key)))
+
+    def delete(self, key: str):
+        self.redis_client.delete(self._key(key))
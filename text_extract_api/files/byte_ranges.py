@@ -0,0 +1,86 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+from text_extract_api.files.storage_strategies.storage_strategy import StoredFileInfo
+
+
+class RangeNotSatisfiableError(ValueError):
+    pass
+
+
+def file_headers(info: StoredFileInfo) -> Dict[str, str]:
+    """
+    Validator headers of a stored file - sent with full, partial and `304 Not Modified` responses.
+    """
+    headers = {'Accept-Ranges': 'bytes', 'ETag': info.etag}
+    if info.modified is not None:
+        headers['Last-Modified'] = formatdate(info.modified, usegmt=True)
+    return headers
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison - `W/` prefixes are ignored
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag.removeprefix('W/') for tag in header.split(','))
+
+
+def modified_since(header: str, info: StoredFileInfo) -> bool:
+    if info.modified is None:
+        return True
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return True
+    # HTTP dates have a resolution of a second
+    return int(info.modified) > since
+
+
+def is_not_modified(headers: Mapping[str, str], info: StoredFileInfo) -> bool:
+    """
+    Whether the client's copy is up to date (`If-None-Match`, or `If-Modified-Since` without it).
+    """
+    if headers.get('if-none-match'):
+        return etag_matches(headers['if-none-match'], info.etag)
+    if headers.get('if-modified-since'):
+        return not modified_since(headers['if-modified-since'], info)
+    return False
+
+
+def requested_range(headers: Mapping[str, str], info: StoredFileInfo) -> Optional[Tuple[int, int]]:
+    """
+    The byte range (first and last byte, inclusive) requested with the `Range` header - None for the whole file.
+    Multiple ranges, malformed headers and ranges of changed files (`If-Range`) get the whole file too.
+
+    Raises:
+        RangeNotSatisfiableError: If the range starts beyond the end of the file.
+    """
+    header = headers.get('range')
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+
+    if_range = headers.get('if-range')
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            # Weak validators can't be used for ranges
+            if if_range.startswith('W/') or if_range != info.etag:
+                return None
+        elif modified_since(if_range, info):
+            return None
+
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    if (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+        return None
+    if info.size == 0:
+        raise RangeNotSatisfiableError(header)
+    if not first:
+        # The suffix - the last `last` bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiableError(header)
+        return max(0, info.size - int(last)), info.size - 1
+    first, last = int(first), int(last) if last else info.size - 1
+    if first >= info.size:
+        raise RangeNotSatisfiableError(header)
+    if first > last:
+        return None
+    return first, min(last, info.size - 1)
@@ -1,24 +1,42 @@
 from __future__ import annotations
+import os
 from typing import Iterator, Type
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
 
 from text_extract_api.files.converters.converter import Converter
 from text_extract_api.files.file_formats.image import ImageFileFormat
 from text_extract_api.files.file_formats.pdf import PdfFileFormat
 
 class PdfToJpegConverter(Converter):
+    # Pages are rendered in small windows, so only a few of them are kept in memory at once
+    PAGES_WINDOW_SIZE: int = int(os.getenv('PDF_RENDER_WINDOW_SIZE', 4))
 
     @staticmethod
     def convert(file_format: PdfFileFormat) -> Iterator[Type["ImageFileFormat"]]:
-        pages = convert_from_bytes(file_format.binary)
-        if not pages:
+        num_pages = PdfToJpegConverter.count_pages(file_format)
+        if not num_pages:
             raise ValueError("No pages found in the PDF.")
-        for i, page in enumerate(pages, start=1):
-            yield ImageFileFormat.from_binary(
-                binary=PdfToJpegConverter._image_to_bytes(page),
-                filename=f"{file_format.filename}_page_{i}.jpg",
-                mime_type="image/jpeg"
-            )
+
+        range_first_page, range_last_page = file_format.page_range or (1, num_pages)
+        range_last_page = min(range_last_page, num_pages)
+        if range_first_page > range_last_page:
+            raise ValueError(f"Page range {file_format.page_range} is out of the PDF ({num_pages} pages).")
+
+        window_size = max(1, PdfToJpegConverter.PAGES_WINDOW_SIZE)
+        for first_page in range(range_first_page, range_last_page + 1, window_size):
+            last_page = min(first_page + window_size - 1, range_last_page)
+            pages = convert_from_bytes(file_format.binary, first_page=first_page, last_page=last_page)
+            for i, page in enumerate(pages, start=first_page):
+                yield ImageFileFormat.from_binary(
+                    binary=PdfToJpegConverter._image_to_bytes(page),
+                    filename=f"{file_format.filename}_page_{i}.jpg",
+                    mime_type="image/jpeg"
+                )
+                page.close()
+
+    @staticmethod
+    def count_pages(file_format: PdfFileFormat) -> int:
+        return int(pdfinfo_from_bytes(file_format.binary).get("Pages", 0))
 
     @staticmethod
     def _image_to_bytes(image) -> bytes:
@@ -1,6 +1,7 @@
 import base64
+import copy
 from hashlib import md5
-from typing import Type, Iterator, Optional, Dict, Callable, List, TypedDict
+from typing import Type, Iterator, Optional, Dict, Callable, List, Tuple, TypedDict
 
 import magic
 
@@ -17,6 +18,8 @@ class FileFormat:
     DEFAULT_FILENAME: str = "file"
     DEFAULT_MIME_TYPE: Optional[str] = None
     _base64_cache: Optional[str] = None
+    # 1-based, inclusive pages of a pageable file to process - all of them when not set
+    page_range: Optional[Tuple[int, int]] = None
 
     # Construction
 
@@ -130,15 +133,36 @@ class FileFormat:
         Raises:
             ValueError: If the target format is not compatible or convertible.
         """
-        final_format = target_format or self.default_iterator_file_format
+        final_format = target_format or self.default_iterator_file_format()
 
-        if self.is_pageable():
-            if final_format.is_pageable():
-                raise ValueError("Target format and current format are both pageable. Cannot iterate.")
-            else:
-                yield self.convert_to(final_format)
-        else:
-            yield self.convert_to(final_format)
+        if self.is_pageable() and final_format.is_pageable():
+            raise ValueError("Target format and current format are both pageable. Cannot iterate.")
+
+        yield from self.convert_to_iterator(final_format)
+
+    @property
+    def page_count(self) -> int:
+        """
+        Number of pages the file consists of. Non-pageable formats are a single page.
+        """
+        return 1
+
+    def with_page_range(self, first_page: int, last_page: int) -> "FileFormat":
+        """
+        Returns a copy of the file restricted to the given pages (1-based, inclusive) -
+        only these pages are counted and converted (e.g. rendered to images).
+
+        Raises:
+            ValueError: If the file is not pageable or the range is empty.
+        """
+        if not self.is_pageable():
+            raise ValueError(f"{self.__class__.__name__} is not pageable - cannot select a page range.")
+        if first_page < 1 or last_page < first_page:
+            raise ValueError(f"Invalid page range: {first_page}-{last_page}")
+
+        file_format = copy.copy(self)
+        file_format.page_range = (first_page, last_page)
+        return file_format
 
     # Utils
     @staticmethod
@@ -157,14 +181,22 @@ class FileFormat:
         return any(target_format is key for key in convertible_keys)
 
     def convert_to(self, target_format: Type["FileFormat"]) -> List["FileFormat"]:
+        """
+        Warning - this materializes all converted files (e.g. every rendered PDF page) in memory.
+        Prefer `convert_to_iterator()` or `iterator()` for pageable formats.
+        """
+        return list(self.convert_to_iterator(target_format))
+
+    def convert_to_iterator(self, target_format: Type["FileFormat"]) -> Iterator["FileFormat"]:
         if isinstance(self, target_format):
-            return [self]
+            yield self
+            return
 
         converters = self.convertible_to()
         if target_format not in converters:
             raise ValueError(f"Cannot convert to {target_format}. Conversion not supported.")
 
-        return list(converters[target_format](self))
+        yield from converters[target_format](self)
 
     @staticmethod
     def convertible_to() -> Dict[Type["FileFormat"], Callable[[Type["FileFormat"]], Iterator[Type["Converter"]]]]:
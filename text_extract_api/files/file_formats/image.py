@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Callable, Dict, Iterator, Type
+from typing import Callable, Dict, Iterator, Optional, Type
 from io import BytesIO
 from PIL import Image
 
@@ -69,3 +69,23 @@ class ImageProcessor:
         buffered = BytesIO()
         image.save(buffered, format=target_format.value)
         return buffered.getvalue()
+
+    @staticmethod
+    def resize_image(image_bytes: bytes, max_edge: Optional[int] = None, quality: int = 90) -> bytes:
+        """
+        Downscales an image so its longer edge is at most `max_edge` pixels and encodes it as JPEG.
+        :param image_bytes: Input image in bytes.
+        :param max_edge: Maximum length of the longer edge in pixels (default: keep the size).
+        :param quality: JPEG quality of the output image (default: 90).
+        :return: JPEG image bytes.
+        """
+        image = Image.open(BytesIO(image_bytes))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        buffered = BytesIO()
+        image.save(buffered, format=ImageSupportedExportFormats.JPEG.value, quality=quality)
+        return buffered.getvalue()
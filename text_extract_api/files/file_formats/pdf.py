@@ -1,7 +1,12 @@
+import io
+import threading
 from typing import Type, Callable, Dict, Iterator
 
 from text_extract_api.files.file_formats.file_format import FileFormat
 
+# PDFium is not thread-safe - documents are split one at a time
+_pdfium_lock = threading.Lock()
+
 
 class PdfFileFormat(FileFormat):
     DEFAULT_FILENAME: str = "image.pdf"
@@ -14,6 +19,34 @@ class PdfFileFormat(FileFormat):
     def is_pageable() -> bool:
         return True
 
+    @property
+    def page_count(self) -> int:
+        from text_extract_api.files.converters.pdf_to_jpeg import PdfToJpegConverter
+        num_pages = PdfToJpegConverter.count_pages(self)
+        if self.page_range:
+            first_page, last_page = self.page_range
+            return max(0, min(last_page, num_pages) - first_page + 1)
+        return num_pages
+
+    def extract_pages(self, first_page: int, last_page: int) -> "PdfFileFormat":
+        """
+        Returns a new, smaller PDF holding only the given pages (1-based, inclusive) of this one.
+        """
+        import pypdfium2
+
+        with _pdfium_lock:
+            source = pypdfium2.PdfDocument(self.binary)
+            target = pypdfium2.PdfDocument.new()
+            try:
+                last_page = min(last_page, len(source))
+                target.import_pages(source, list(range(first_page - 1, last_page)))
+                buffer = io.BytesIO()
+                target.save(buffer)
+            finally:
+                target.close()
+                source.close()
+        return PdfFileFormat(buffer.getvalue(), self.filename, self.mime_type)
+
     @classmethod
     def default_iterator_file_format(cls) -> Type[FileFormat]:
         from text_extract_api.files.file_formats.image import ImageFileFormat
@@ -1,12 +1,14 @@
 import os
+import threading
 from enum import Enum
+from typing import Dict, Tuple
 
 import yaml
 
 from text_extract_api.files.storage_strategies.aws_s3 import AWSS3StorageStrategy
 from text_extract_api.files.storage_strategies.google_drive import GoogleDriveStorageStrategy
 from text_extract_api.files.storage_strategies.local_filesystem import LocalFilesystemStorageStrategy
-from text_extract_api.files.storage_strategies.storage_strategy import StorageStrategy
+from text_extract_api.files.storage_strategies.storage_strategy import LIST_PAGE_SIZE, StorageStrategy
 
 
 class StorageStrategy(Enum):
@@ -16,9 +18,12 @@ class StorageStrategy(Enum):
 
 
 class StorageManager:
+    # Managers shared by the whole process - keyed by the profile name, along with the profile file path and mtime
+    _managers: Dict[str, Tuple[Tuple[str, int], "StorageManager"]] = {}
+    _lock = threading.Lock()
+
     def __init__(self, profile_name):
-        profile_path = os.path.join(os.getenv('STORAGE_PROFILE_PATH', '/storage_profiles'), f'{profile_name}.yaml')
-        with open(profile_path, 'r') as file:
+        with open(self.profile_path(profile_name), 'r') as file:
             self.profile = yaml.safe_load(file)
 
         strategy = StorageStrategy(self.profile['strategy'])
@@ -31,14 +36,65 @@ class StorageManager:
         else:
             raise ValueError(f"Unknown storage strategy '{strategy}'")
 
+    @staticmethod
+    def profile_path(profile_name) -> str:
+        return os.path.join(os.getenv('STORAGE_PROFILE_PATH', '/storage_profiles'), f'{profile_name}.yaml')
+
+    @classmethod
+    def get(cls, profile_name) -> "StorageManager":
+        """
+        Returns the storage manager of the profile shared by the whole process. The profile is parsed and
+        its storage client created (checking the credentials, bucket etc.) once - and again only after
+        the profile file has changed. Storage strategies are safe to use from many threads at once.
+        """
+        path = cls.profile_path(profile_name)
+        version = (path, os.stat(path).st_mtime_ns)
+        with cls._lock:
+            cached = cls._managers.get(profile_name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            manager = cls(profile_name)
+            cls._managers[profile_name] = (version, manager)
+            return manager
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._managers.clear()
+
     def save(self, file_name, dest_file_name, content):
         self.strategy.save(file_name, dest_file_name, content)
 
     def load(self, file_name):
         return self.strategy.load(file_name)
 
-    def list(self):
-        return self.strategy.list()
+    def list(self, **filters):
+        return self.strategy.list(**filters)
+
+    def list_page(self, prefix=None, cursor=None, limit=LIST_PAGE_SIZE, **filters):
+        return self.strategy.list_page(prefix=prefix, cursor=cursor, limit=limit, **filters)
+
+    def list_filters(self):
+        return self.strategy.list_filters()
+
+    def iter_pages(self, prefix=None, cursor=None, page_size=LIST_PAGE_SIZE, **filters):
+        return self.strategy.iter_pages(prefix=prefix, cursor=cursor, page_size=page_size, **filters)
+
+    def stat(self, file_name):
+        return self.strategy.stat(file_name)
+
+    def open_stream(self, file_name, start=0, end=None):
+        return self.strategy.open_stream(file_name, start=start, end=end)
 
     def delete(self, file_name):
         self.strategy.delete(file_name)
+
+    def save_many(self, files):
+        self.strategy.save_many(files)
+
+    def load_many(self, file_names):
+        return self.strategy.load_many(file_names)
+
+    def delete_many(self, file_names):
+        self.strategy.delete_many(file_names)
@@ -1,7 +1,19 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import EndpointConnectionError, ClientError
 
-from text_extract_api.files.storage_strategies.storage_strategy import StorageStrategy
+from text_extract_api.files.storage_strategies.storage_strategy import STREAM_CHUNK_SIZE, StorageStrategy, \
+    StoredFileInfo
+
+MB = 1024 * 1024
+# Maximum number of keys S3 deletes (and lists) in a single request
+S3_BATCH_SIZE = 1000
 
 
 class AWSS3StorageStrategy(StorageStrategy):
@@ -12,13 +24,24 @@ class AWSS3StorageStrategy(StorageStrategy):
         self.region = self.resolve_placeholder(context['settings'].get('region'))
         self.access_key = self.resolve_placeholder(context['settings'].get('access_key'))
         self.secret_access_key = self.resolve_placeholder(context['settings'].get('secret_access_key'))
+        # S3 compatible storages (MinIO, localstack...)
+        self.endpoint_url = self.resolve_placeholder(context['settings'].get('endpoint_url'))
+        # Number of requests run at once by bulk operations and multipart uploads - the client keeps as many connections
+        self.max_concurrency = int(context['settings'].get('max_concurrency') or 10)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=int(context['settings'].get('multipart_threshold') or 8 * MB),
+            multipart_chunksize=int(context['settings'].get('multipart_chunksize') or 8 * MB),
+            max_concurrency=self.max_concurrency
+        )
 
         try:
             self.s3_client = boto3.client(
                 's3',
                 aws_access_key_id=self.access_key,
                 aws_secret_access_key=self.secret_access_key,
-                region_name=self.region
+                region_name=self.region,
+                endpoint_url=self.endpoint_url,
+                config=Config(max_pool_connections=self.max_concurrency)
             )
             self.s3_client.head_bucket(Bucket=self.bucket_name)
         except EndpointConnectionError as e:
@@ -35,16 +58,20 @@ class AWSS3StorageStrategy(StorageStrategy):
                 ) from e
             raise
 
-    def save(self, file_name, dest_file_name, content):
+    def save(self, file_name, dest_file_name, content: Union[str, bytes, io.IOBase]):
+        """
+        Uploads the content (text, bytes or a binary file object) - contents bigger than `multipart_threshold`
+        are streamed in parts of `multipart_chunksize`, `max_concurrency` of them at once.
+        """
         formatted_file_name = self.format_file_name(file_name, dest_file_name)
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        body = io.BytesIO(content) if isinstance(content, bytes) else content
 
         try:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=formatted_file_name,
-                Body=content.encode('utf-8')
-            )
-        except ClientError as e:
+            self.s3_client.upload_fileobj(body, self.bucket_name, formatted_file_name, Config=self.transfer_config)
+        except (ClientError, S3UploadFailedError) as e:
+            # `upload_fileobj` wraps the errors of the upload requests in S3UploadFailedError
             raise RuntimeError(
                 f"{str(e)}\n"
                 f"Error saving file '{file_name}' as '{formatted_file_name}' to bucket '{self.bucket_name}'."
@@ -63,15 +90,74 @@ class AWSS3StorageStrategy(StorageStrategy):
                 f"Error loading file '{file_name}' from bucket '{self.bucket_name}'."
             ) from e
 
-    def list(self):
+    def stat(self, file_name) -> Optional[StoredFileInfo]:
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=file_name)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise RuntimeError(
+                f"{str(e)}\n"
+                f"Error reading the metadata of file '{file_name}' from bucket '{self.bucket_name}'."
+            ) from e
+        return StoredFileInfo(size=response['ContentLength'], modified=response['LastModified'].timestamp(),
+                              etag=response['ETag'])
+
+    def open_stream(self, file_name, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Streams the object body - only the requested byte range is transferred from S3.
+        """
+        params = {'Bucket': self.bucket_name, 'Key': file_name}
+        if start or end is not None:
+            params['Range'] = f"bytes={start}-{'' if end is None else end}"
+        try:
+            body = self.s3_client.get_object(**params)['Body']
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchKey':
+                raise FileNotFoundError(file_name) from e
+            raise RuntimeError(
+                f"{str(e)}\n"
+                f"Error loading file '{file_name}' from bucket '{self.bucket_name}'."
+            ) from e
+        try:
+            yield from body.iter_chunks(STREAM_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def list(self, prefix: Optional[str] = None):
+        """
+        Lists all the keys (starting with `prefix`) - S3 returns up to 1000 keys per request,
+        the following pages are fetched until the listing is complete.
+        """
+        try:
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            keys = []
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix or ''):
+                keys.extend(item['Key'] for item in page.get('Contents', []))
+            return keys
+        except ClientError as e:
+            raise RuntimeError(
+                f"{str(e)}\n"
+                f"Error listing objects in bucket '{self.bucket_name}'."
+            ) from e
+
+    def list_page(self, prefix: Optional[str] = None, cursor: Optional[str] = None,
+                  limit: int = S3_BATCH_SIZE) -> Tuple[List[str], Optional[str]]:
+        """
+        Lists a single page of up to `limit` keys (S3 returns at most 1000). The cursor is the S3 continuation token.
+        """
+        params = {'Bucket': self.bucket_name, 'Prefix': prefix or '', 'MaxKeys': min(limit, S3_BATCH_SIZE)}
+        if cursor:
+            params['ContinuationToken'] = cursor
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
-            return [item['Key'] for item in response.get('Contents', [])]
+            response = self.s3_client.list_objects_v2(**params)
         except ClientError as e:
             raise RuntimeError(
                 f"{str(e)}\n"
                 f"Error listing objects in bucket '{self.bucket_name}'."
             ) from e
+        keys = [item['Key'] for item in response.get('Contents', [])]
+        return keys, response.get('NextContinuationToken') if response.get('IsTruncated') else None
 
     def delete(self, file_name):
         try:
@@ -81,3 +167,40 @@ class AWSS3StorageStrategy(StorageStrategy):
                 f"{str(e)}\n"
                 f"Error deleting file '{file_name}' from bucket '{self.bucket_name}'."
             ) from e
+
+    def save_many(self, files: Iterable[Tuple[str, str, Union[str, bytes]]]):
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # Consuming the results re-raises the first error
+            list(executor.map(lambda file: self.save(*file), files))
+
+    def load_many(self, file_names: Iterable[str]) -> Dict[str, Optional[str]]:
+        file_names = list(file_names)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return dict(zip(file_names, executor.map(self.load, file_names)))
+
+    def delete_many(self, file_names: Iterable[str]):
+        """
+        Deletes the files with `delete_objects` - up to 1000 keys per request, `max_concurrency` requests at once.
+        """
+        file_names = list(file_names)
+        batches = [file_names[i:i + S3_BATCH_SIZE] for i in range(0, len(file_names), S3_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            list(executor.map(self._delete_batch, batches))
+
+    def _delete_batch(self, file_names: List[str]):
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': file_name} for file_name in file_names], 'Quiet': True}
+            )
+        except ClientError as e:
+            raise RuntimeError(
+                f"{str(e)}\n"
+                f"Error deleting {len(file_names)} files from bucket '{self.bucket_name}'."
+            ) from e
+        errors = response.get('Errors', [])
+        if errors:
+            raise RuntimeError(
+                f"Error deleting {len(errors)} files from bucket '{self.bucket_name}', "
+                f"e.g. '{errors[0]['Key']}': {errors[0].get('Message')}"
+            )
@@ -1,15 +1,31 @@
 import io
-import os
+import mimetypes
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
 
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 
 
 ## Note - this code is using Service Accounts for authentication which are separate accounts other than
 ## your Google account. You can create a service account and download the JSON key file to use it for
 ## how to enable GDrive API: https://developers.google.com/drive/api/quickstart/python?hl=pl
-from text_extract_api.files.storage_strategies.storage_strategy import StorageStrategy
+from text_extract_api.files.storage_strategies.storage_strategy import LIST_PAGE_SIZE, StorageStrategy, \
+    StoredFileInfo
+
+# Maximum number of calls in a single Drive batch request
+DRIVE_BATCH_SIZE = 100
+# Maximum number of names looked up by a single `files().list` query
+NAME_QUERY_SIZE = 50
+# Bytes downloaded by a single request of the streamed reads
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Prefixes Drive's `name contains` is known to match - a single term (it matches the prefixes of the name terms)
+NAME_TERM = re.compile(r'\w+')
+
 
 class GoogleDriveStorageStrategy(StorageStrategy):
     def __init__(self, context):
@@ -18,65 +34,218 @@ class GoogleDriveStorageStrategy(StorageStrategy):
             context['settings']['service_account_file'],
             scopes=['https://www.googleapis.com/auth/drive']
         )
-        self.service = build('drive', 'v3', credentials=self.credentials)
+        self._local = threading.local()
         self.folder_id = context['settings']['folder_id']
+        # File ids by name, so loads and deletes don't need to look them up - filled by list(), save() and lookups
+        self.file_id_ttl = int(context['settings'].get('file_id_cache_ttl') or 300)
+        self._file_ids: Dict[str, tuple] = {}
+        self._file_ids_lock = threading.Lock()
+        self.download_chunk_size = int(context['settings'].get('download_chunk_size') or DOWNLOAD_CHUNK_SIZE)
 
-    def save(self, file_name, dest_file_name, content):
-        # Save content to a temporary file
-        with open(file_name, 'wb') as temp_file:
-            temp_file.write(content.encode('utf-8'))  # Encode the string to bytes
+    @property
+    def service(self):
+        # The HTTP client of the Drive service is not thread-safe - every thread builds (once) its own
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', credentials=self.credentials)
+            self._local.service = service
+        return service
 
-        file_metadata = {
-            'name': self.format_file_name(file_name, dest_file_name),
-        }
+    def save(self, file_name, dest_file_name, content):
+        name = self.format_file_name(file_name, dest_file_name)
+        file_metadata = {'name': name}
         if self.folder_id:
             file_metadata['parents'] = [self.folder_id]
 
         print(file_metadata)
-        media = MediaFileUpload(file_name, resumable=True)
+        # Uploaded straight from memory - no temporary file
+        body = content.encode('utf-8') if isinstance(content, str) else content
+        media = MediaIoBaseUpload(io.BytesIO(body), mimetype=mimetypes.guess_type(name)[0] or 'text/plain',
+                                  resumable=True)
         file = self.service.files().create(body=file_metadata, media_body=media, fields='id').execute()
         print(f"File ID: {file.get('id')}")
-
-        # Remove the temporary file
-        os.remove(file_name)
+        self._remember_file_id(name, file.get('id'))
 
     def load(self, file_name):
-        query = f"name = '{file_name}'"
-        if self.folder_id:
-            query += f" and '{self.folder_id}' in parents"
-        results = self.service.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
-        items = results.get('files', [])
-        if not items:
+        file_id = self._file_id(file_name)
+        if file_id is None:
             print('No files found.')
             return None
-        file_id = items[0]['id']
-        request = self.service.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-            print(f"Download {int(status.progress() * 100)}%.")
-        fh.seek(0)
-        return fh.read()
+        return self._download(file_id)
+
+    def stat(self, file_name) -> Optional[StoredFileInfo]:
+        file_id = self._file_id(file_name)
+        if file_id is None:
+            return None
+        file = self.service.files().get(fileId=file_id, fields='size, modifiedTime, md5Checksum').execute()
+        modified = datetime.fromisoformat(file['modifiedTime'].replace('Z', '+00:00')).timestamp()
+        return StoredFileInfo(size=int(file.get('size', 0)), modified=modified,
+                              etag=f'"{file.get("md5Checksum") or file_id + "-" + file["modifiedTime"]}"')
+
+    def open_stream(self, file_name, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Downloads the requested byte range in chunks of `download_chunk_size` bytes - a ranged request each.
+        """
+        file_id = self._file_id(file_name)
+        if file_id is None:
+            raise FileNotFoundError(file_name)
+        if end is None:
+            end = int(self.service.files().get(fileId=file_id, fields='size').execute().get('size', 0)) - 1
+        while start <= end:
+            chunk_end = min(start + self.download_chunk_size, end + 1) - 1
+            request = self.service.files().get_media(fileId=file_id)
+            request.headers['Range'] = f"bytes={start}-{chunk_end}"
+            chunk = request.execute()
+            if not chunk:
+                return
+            yield chunk
+            start += len(chunk)
 
     def list(self):
         query = ""  # "mimeType='application/vnd.google-apps.file'"
         if self.folder_id:
             query = f"'{self.folder_id}' in parents"
-        results = self.service.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
-        items = results.get('files', [])
+        items = self._query_files(query)
+        with self._file_ids_lock:
+            # Listed in the reverse order of creation - the newest file with a given name wins, as in the lookups
+            expires_at = time.monotonic() + self.file_id_ttl
+            for item in reversed(items):
+                self._file_ids[item['name']] = (item['id'], expires_at, None)
         return [item['name'] for item in items]
 
+    def list_page(self, prefix=None, cursor=None, limit=LIST_PAGE_SIZE):
+        """
+        Lists a page of up to `limit` files (Drive returns at most 1000) - the cursor is the Drive page token.
+
+        Drive can't query names by prefix - `name contains` matches the prefixes of the words of the name
+        only. It narrows the query only when the `prefix` is a single word (e.g. `invoice`); other prefixes
+        (e.g. `invoice-2024`) are matched against the names of all the files of the folder here, so a page
+        can hold fewer than `limit` (even no) files while there are more pages.
+        """
+        query = f"'{self.folder_id}' in parents" if self.folder_id else ""
+        if prefix and NAME_TERM.fullmatch(prefix):
+            # Case-insensitive - the exact prefix is checked below
+            query = " and ".join(filter(None, [query, f"name contains '{self._escape(prefix)}'"]))
+        # Files sharing a name are listed newest first - the newest one is indexed, as in the lookups
+        results = self.service.files().list(q=query, spaces='drive', pageSize=min(limit, 1000), pageToken=cursor,
+                                            orderBy='name,createdTime desc',
+                                            fields='nextPageToken, files(id, name, createdTime)').execute()
+        items = [item for item in results.get('files', []) if not prefix or item['name'].startswith(prefix)]
+        for item in items:
+            self._remember_file_id(item['name'], item['id'], item['createdTime'])
+        return [item['name'] for item in items], results.get('nextPageToken')
+
     def delete(self, file_name):
-        query = f"name = '{file_name}'"
-        if self.folder_id:
-            query += f" and '{self.folder_id}' in parents"
-        results = self.service.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
-        items = results.get('files', [])
-        if not items:
+        file_id = self._file_id(file_name)
+        if file_id is None:
             print('No files found.')
             return
-        file_id = items[0]['id']
         self.service.files().delete(fileId=file_id).execute()
+        self._forget_file_id(file_name)
         print(f"File {file_name} deleted.")
+
+    def load_many(self, file_names):
+        file_ids = self._file_ids_for(file_names)
+        return {file_name: self._download(file_ids[file_name]) if file_ids.get(file_name) else None
+                for file_name in file_names}
+
+    def delete_many(self, file_names):
+        """
+        Deletes the files with batch requests - up to 100 deletes per HTTP request.
+        """
+        file_ids = {file_name: file_id for file_name, file_id in self._file_ids_for(file_names).items() if file_id}
+        errors = []
+
+        def deleted(request_id, response, exception):
+            if exception is not None:
+                errors.append(f"{request_id}: {exception}")
+            else:
+                self._forget_file_id(request_id)
+
+        names = list(file_ids)
+        for i in range(0, len(names), DRIVE_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=deleted)
+            for file_name in names[i:i + DRIVE_BATCH_SIZE]:
+                batch.add(self.service.files().delete(fileId=file_ids[file_name]), request_id=file_name)
+            batch.execute()
+
+        if errors:
+            raise RuntimeError(f"Error deleting {len(errors)} files from Google Drive, e.g. {errors[0]}")
+
+    def _download(self, file_id: str) -> bytes:
+        request = self.service.files().get_media(fileId=file_id)
+        fh = io.BytesIO()
+        downloader = MediaIoBaseDownload(fh, request)
+        done = False
+        while done is False:
+            status, done = downloader.next_chunk()
+            print(f"Download {int(status.progress() * 100)}%.")
+        fh.seek(0)
+        return fh.read()
+
+    def _query_files(self, query: str) -> List[Dict]:
+        items = []
+        page_token = None
+        while True:
+            results = self.service.files().list(q=query, spaces='drive', pageSize=1000, pageToken=page_token,
+                                                orderBy='createdTime desc',
+                                                fields='nextPageToken, files(id, name)').execute()
+            items.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return items
+
+    def _file_id(self, file_name: str) -> Optional[str]:
+        return self._file_ids_for([file_name]).get(file_name)
+
+    def _file_ids_for(self, file_names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Resolves the file ids of the names - from the index, or (for the missing ones) with a few name queries.
+        """
+        file_ids = {}
+        missing = []
+        now = time.monotonic()
+        with self._file_ids_lock:
+            for file_name in file_names:
+                cached = self._file_ids.get(file_name)
+                if cached is not None and cached[1] > now:
+                    file_ids[file_name] = cached[0]
+                else:
+                    missing.append(file_name)
+
+        for i in range(0, len(missing), NAME_QUERY_SIZE):
+            names = missing[i:i + NAME_QUERY_SIZE]
+            query = "(" + " or ".join(f"name = '{self._escape(name)}'" for name in names) + ")"
+            if self.folder_id:
+                query += f" and '{self.folder_id}' in parents"
+            found = {}
+            for item in self._query_files(query):
+                # The newest file with the name
+                found.setdefault(item['name'], item['id'])
+            for file_name in names:
+                file_ids[file_name] = found.get(file_name)
+                if file_name in found:
+                    self._remember_file_id(file_name, found[file_name])
+        return file_ids
+
+    def _remember_file_id(self, file_name: str, file_id: str, created_time: Optional[str] = None):
+        """
+        Indexes the id of the file. Ids of listed files (with their `created_time`) don't replace the id of a newer
+        listed file with the same name (e.g. one of the previous page), nor the ids of saved or looked up files -
+        those are the newest ones.
+        """
+        now = time.monotonic()
+        with self._file_ids_lock:
+            cached = self._file_ids.get(file_name)
+            if created_time is not None and cached is not None and cached[1] > now \
+                    and (cached[2] is None or cached[2] > created_time):
+                return
+            self._file_ids[file_name] = (file_id, now + self.file_id_ttl, created_time)
+
+    def _forget_file_id(self, file_name: str):
+        with self._file_ids_lock:
+            self._file_ids.pop(file_name, None)
+
+    @staticmethod
+    def _escape(name: str) -> str:
+        return name.replace('\\', '\\\\').replace("'", "\\'")
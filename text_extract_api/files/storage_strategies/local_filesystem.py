@@ -1,9 +1,18 @@
+import itertools
 import os
+import sqlite3
+import threading
+import uuid
 from datetime import datetime
+from typing import Iterator, List, Optional, Tuple, Union
 
 
 
-from text_extract_api.files.storage_strategies.storage_strategy import StorageStrategy
+from text_extract_api.files.storage_strategies.storage_strategy import LIST_PAGE_SIZE, STREAM_CHUNK_SIZE, \
+    StorageStrategy, StoredFileInfo
+
+MANIFEST_FILE_NAME = ".manifest.sqlite"
+TEMP_FILE_PREFIX = ".tmp-"
 
 def resolve_path(path):
     # Expand `~` to the home directory
@@ -13,6 +22,12 @@ def resolve_path(path):
     return absolute_path
 
 
+def to_timestamp(value: Union[datetime, float, int, None]) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
 class LocalFilesystemStorageStrategy(StorageStrategy):
     def __init__(self, context):
         super().__init__(context)
@@ -21,6 +36,12 @@ class LocalFilesystemStorageStrategy(StorageStrategy):
         self.create_subfolders = self.context['settings'].get('create_subfolders', False)
         self.subfolder_names_format = self.context['settings'].get('subfolder_names_format', '')
         os.makedirs(self.base_directory, exist_ok=True)
+        # Optional index of the stored files - lists without scanning the tree
+        self.manifest_path = None
+        self._manifest_local = threading.local()
+        if self.context['settings'].get('manifest', False):
+            self.manifest_path = os.path.join(self.base_directory, MANIFEST_FILE_NAME)
+            self._open_manifest()
 
     def _get_subfolder_path(self, file_name):
         if not self.subfolder_names_format:
@@ -30,29 +51,184 @@ class LocalFilesystemStorageStrategy(StorageStrategy):
         subfolder_path = self.format_file_name(file_name, self.subfolder_names_format)
         return os.path.join(self.base_directory, subfolder_path)
 
+    def _file_path(self, file_name):
+        return os.path.join(self._get_subfolder_path(file_name), file_name)
+
     def save(self, file_name, dest_file_name, content):
         file_name = self.format_file_name(file_name, dest_file_name)
         subfolder_path = self._get_subfolder_path(file_name)
         full_path = os.path.join(subfolder_path, file_name)
         full_directory = os.path.dirname(full_path)
         os.makedirs(full_directory, exist_ok=True)
-        with open(full_path, 'w') as file:
-            file.write(content)
+        # Written to a temporary file renamed over the target - readers see the old or the new file, never a partial one
+        temp_path = os.path.join(full_directory, f"{TEMP_FILE_PREFIX}{uuid.uuid4().hex}")
+        try:
+            with open(temp_path, 'xb' if isinstance(content, bytes) else 'x') as file:
+                file.write(content)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        if self.manifest_path:
+            self._manifest().execute("INSERT OR REPLACE INTO files (path, mtime) VALUES (?, ?)",
+                                     (self._relative_path(full_path), os.stat(full_path).st_mtime))
 
     def load(self, file_name):
-        subfolder_path = self._get_subfolder_path(file_name)
-        file_path = os.path.join(subfolder_path, file_name)
-        with open(file_path, 'r') as file:
+        with open(self._file_path(file_name), 'r') as file:
             return file.read()
 
-    def list(self):
-        all_files = []
-        for root, dirs, files in os.walk(self.base_directory):
-            for file in files:
-                all_files.append(os.path.join(root, file))
-        return all_files
+    def stat(self, file_name) -> Optional[StoredFileInfo]:
+        try:
+            stat = os.stat(self._file_path(file_name))
+        except FileNotFoundError:
+            return None
+        return StoredFileInfo(size=stat.st_size, modified=stat.st_mtime,
+                              etag=f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"')
+
+    def open_stream(self, file_name, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._file_path(file_name), 'rb') as file:
+            file.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = file.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def list(self, prefix: Optional[str] = None, modified_after: Union[datetime, float, None] = None,
+             modified_before: Union[datetime, float, None] = None, limit: Optional[int] = None,
+             offset: int = 0) -> List[str]:
+        """
+        Lists the stored files (absolute paths) sorted by path. `prefix` is matched against the path relative
+        to `root_path` - only the directories that can hold matching files are scanned; `modified_after`
+        and `modified_before` filter by the modification time. With `manifest` enabled the listing is
+        read from the manifest index instead of scanning the tree.
+        """
+        modified_after, modified_before = to_timestamp(modified_after), to_timestamp(modified_before)
+        if self.manifest_path:
+            files = self._list_manifest(prefix, modified_after, modified_before, limit, offset)
+        else:
+            files = []
+            for i, (path, mtime) in enumerate(self._filtered(self._scan(prefix), modified_after, modified_before)):
+                if i < offset:
+                    continue
+                if limit is not None and len(files) >= limit:
+                    break
+                files.append(path)
+        return [os.path.join(self.base_directory, path) for path in files]
+
+    def list_page(self, prefix: Optional[str] = None, cursor: Optional[str] = None, limit: int = LIST_PAGE_SIZE,
+                  modified_after: Union[datetime, float, None] = None,
+                  modified_before: Union[datetime, float, None] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        Lists a page of the files (filtered as by `list()`). The cursor is the path of the last file
+        of the previous page - the scan skips the directories listed already.
+        """
+        modified_after, modified_before = to_timestamp(modified_after), to_timestamp(modified_before)
+        # One file more tells whether there is a next page
+        if self.manifest_path:
+            files = self._list_manifest(prefix, modified_after, modified_before, limit + 1, 0, after=cursor)
+        else:
+            files = [path for path, mtime in itertools.islice(
+                self._filtered(self._scan(prefix, after=cursor), modified_after, modified_before), limit + 1)]
+        page = files[:limit]
+        return [os.path.join(self.base_directory, path) for path in page], page[-1] if len(files) > limit else None
 
     def delete(self, file_name):
-        subfolder_path = self._get_subfolder_path(file_name)
-        file_path = os.path.join(subfolder_path, file_name)
+        file_path = self._file_path(file_name)
         os.remove(file_path)
+        if self.manifest_path:
+            self._manifest().execute("DELETE FROM files WHERE path = ?", (self._relative_path(file_path),))
+
+    def rebuild_manifest(self):
+        """
+        Re-indexes the whole tree - needed only when files are added or removed other than by this strategy.
+        """
+        manifest = self._manifest()
+        manifest.execute("BEGIN IMMEDIATE")
+        try:
+            manifest.execute("DELETE FROM files")
+            manifest.executemany("INSERT INTO files (path, mtime) VALUES (?, ?)", self._scan())
+            manifest.execute("COMMIT")
+        except BaseException:
+            manifest.execute("ROLLBACK")
+            raise
+
+    def _scan(self, prefix: Optional[str] = None, after: Optional[str] = None,
+              directory: Optional[str] = None) -> Iterator[Tuple[str, float]]:
+        """
+        Yields the `(relative path, mtime)` of the files sorted by path (those after the `after` path only),
+        skipping the directories that can't match the prefix or hold only files listed before.
+        """
+        directory = directory or self.base_directory
+        try:
+            with os.scandir(directory) as it:
+                # Directories sort as `name/` - the files come out in the order of their paths
+                entries = sorted(it, key=lambda entry: entry.name + ('/' if entry.is_dir(follow_symlinks=False) else ''))
+        except FileNotFoundError:
+            return
+
+        for entry in entries:
+            if entry.name.startswith(TEMP_FILE_PREFIX) or entry.name.startswith(MANIFEST_FILE_NAME):
+                continue
+            path = self._relative_path(entry.path)
+            if entry.is_dir(follow_symlinks=False):
+                if after and after > path + '/' and not after.startswith(path + '/'):
+                    continue
+                if not prefix or (path + '/').startswith(prefix) or prefix.startswith(path + '/'):
+                    yield from self._scan(prefix, after, entry.path)
+            elif (not prefix or path.startswith(prefix)) and (not after or path > after):
+                yield path, entry.stat().st_mtime
+
+    @staticmethod
+    def _filtered(files, modified_after: Optional[float], modified_before: Optional[float]):
+        for path, mtime in files:
+            if modified_after is not None and mtime < modified_after:
+                continue
+            if modified_before is not None and mtime >= modified_before:
+                continue
+            yield path, mtime
+
+    def _list_manifest(self, prefix, modified_after, modified_before, limit, offset, after=None) -> List[str]:
+        query = "SELECT path FROM files WHERE 1 = 1"
+        params = []
+        if after:
+            query += " AND path > ?"
+            params.append(after)
+        if prefix:
+            # A range on the primary key rather than LIKE - uses the index and needs no escaping
+            query += " AND path >= ? AND path < ?"
+            params += [prefix, prefix + '\U0010ffff']
+        if modified_after is not None:
+            query += " AND mtime >= ?"
+            params.append(modified_after)
+        if modified_before is not None:
+            query += " AND mtime < ?"
+            params.append(modified_before)
+        query += " ORDER BY path LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        return [row[0] for row in self._manifest().execute(query, params)]
+
+    def _open_manifest(self):
+        manifest = self._manifest()
+        exists = manifest.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files'").fetchone()
+        if not exists:
+            manifest.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL NOT NULL)")
+            manifest.execute("CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime)")
+            print(f"Indexing the files of {self.base_directory}")
+            self.rebuild_manifest()
+
+    def _manifest(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared by threads - every thread opens its own; autocommit mode
+        manifest = getattr(self._manifest_local, 'connection', None)
+        if manifest is None:
+            manifest = sqlite3.connect(self.manifest_path, timeout=30, isolation_level=None)
+            manifest.execute("PRAGMA journal_mode=WAL")
+            self._manifest_local.connection = manifest
+        return manifest
+
+    def _relative_path(self, path: str) -> str:
+        return os.path.relpath(path, self.base_directory).replace(os.sep, '/')
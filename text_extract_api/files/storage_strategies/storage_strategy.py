@@ -1,7 +1,24 @@
+import hashlib
+import inspect
 import os
 from datetime import datetime
 from pathlib import Path
 from string import Template
+from typing import Iterator, List, NamedTuple, Optional
+
+# Default number of files in a page of the listing
+LIST_PAGE_SIZE = 1000
+# Size of the chunks the stored files are streamed in
+STREAM_CHUNK_SIZE = 64 * 1024
+# Parameters of `list_page()` other than the filters
+LIST_PAGE_PARAMETERS = ('prefix', 'cursor', 'limit')
+
+
+class StoredFileInfo(NamedTuple):
+    size: int
+    modified: Optional[float]  # timestamp, if known
+    etag: str  # quoted, as in the ETag header
+
 
 class StorageStrategy:
     def __init__(self, context):
@@ -19,6 +36,88 @@ class StorageStrategy:
     def delete(self, file_name):
         raise NotImplementedError("Subclasses must implement this method")
 
+    # Paginated listing - every page is a bounded request to the storage
+
+    def list_page(self, prefix=None, cursor=None, limit=LIST_PAGE_SIZE, **filters):
+        """
+        Lists a page of up to `limit` files (starting with `prefix`) following the `cursor` of the previous page.
+        Returns the files and the (opaque) cursor of the next page - None when the listing is complete.
+        Strategies override it with native paging - this fallback lists all the files and slices them.
+        Strategies supporting filters (e.g. `modified_after`) take them as keyword arguments, see `list_filters()`.
+
+        Raises:
+            ValueError: If filters not supported by the strategy are passed.
+        """
+        if filters:
+            raise ValueError(f"{type(self).__name__} doesn't support the filters: {', '.join(filters)}")
+        files = sorted(file for file in self.list() if not prefix or file.startswith(prefix))
+        if cursor:
+            files = [file for file in files if file > cursor]
+        page = files[:limit]
+        return page, page[-1] if len(files) > limit else None
+
+    def list_filters(self) -> List[str]:
+        """
+        Names of the filters `list_page()` of the strategy supports.
+        """
+        return [name for name, parameter in inspect.signature(self.list_page).parameters.items()
+                if name not in LIST_PAGE_PARAMETERS
+                and parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)]
+
+    def iter_pages(self, prefix=None, cursor=None, page_size=LIST_PAGE_SIZE, **filters):
+        """
+        Iterates over the pages of the listing (from the `cursor` on) - only a page is held in memory at a time.
+        """
+        while True:
+            files, cursor = self.list_page(prefix=prefix, cursor=cursor, limit=page_size, **filters)
+            yield files
+            if cursor is None:
+                return
+
+    # Streaming reads - the file is never held in memory as a whole
+
+    def stat(self, file_name) -> Optional[StoredFileInfo]:
+        """
+        Returns the size, modification time and ETag of the file - None if there's no such file.
+        """
+        content = self.load(file_name)
+        if content is None:
+            return None
+        content = content.encode('utf-8') if isinstance(content, str) else content
+        return StoredFileInfo(size=len(content), modified=None, etag=f'"{hashlib.md5(content).hexdigest()}"')
+
+    def open_stream(self, file_name, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Yields the bytes `start` to `end` (inclusive, the end of the file by default) of the file in chunks.
+        Strategies override it with native streaming - this fallback loads the whole file.
+        """
+        content = self.load(file_name)
+        if content is None:
+            raise FileNotFoundError(file_name)
+        content = content.encode('utf-8') if isinstance(content, str) else content
+        content = content[start:None if end is None else end + 1]
+        for i in range(0, len(content), STREAM_CHUNK_SIZE):
+            yield content[i:i + STREAM_CHUNK_SIZE]
+
+    # Bulk operations - strategies of remote storages run them concurrently
+
+    def save_many(self, files):
+        """
+        Saves many `(file_name, dest_file_name, content)` files.
+        """
+        for file_name, dest_file_name, content in files:
+            self.save(file_name, dest_file_name, content)
+
+    def load_many(self, file_names):
+        """
+        Loads many files - returns their contents by the file name.
+        """
+        return {file_name: self.load(file_name) for file_name in file_names}
+
+    def delete_many(self, file_names):
+        for file_name in file_names:
+            self.delete(file_name)
+
     def format_file_name(self, file_name, format_string):
         return format_string.format(file_fullname=file_name,  # file_name with path
                                     file_name=Path(file_name).stem,  # file_name without path
@@ -0,0 +1,72 @@
+import os
+from hashlib import md5
+from typing import BinaryIO, NamedTuple, Optional
+
+from text_extract_api.files.blob_stores.blob_store import get_blob_store
+from text_extract_api.files.file_formats.file_format import FileFormat
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# libmagic needs only the beginning of a file to recognize its type
+MIME_SNIFF_SIZE = 8 * 1024
+
+
+def upload_max_size() -> int:
+    """
+    Maximum size of a single uploaded document in bytes (`UPLOAD_MAX_SIZE`, 200MB by default, 0 disables the limit).
+    """
+    return int(os.getenv('UPLOAD_MAX_SIZE', 200 * 1024 * 1024))
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class StoredUpload(NamedTuple):
+    hash: str
+    filename: str
+    mime_type: str
+    size: int
+
+
+def store_upload(
+        file: BinaryIO,
+        filename: Optional[str] = None,
+        mime_type: Optional[str] = None,
+        max_size: Optional[int] = None
+) -> StoredUpload:
+    """
+    Stores an uploaded document in the blob store without loading it into memory.
+
+    The file is read in chunks - hashing it and checking its size on the go - then streamed to the blob store
+    (skipped if the same document is already there). The MIME type, unless provided, is sniffed from the first
+    few KB only. The hash is the same as `FileFormat.hash`, so uploads share blob and cache keys with base64 requests.
+
+    Raises:
+        UploadTooLargeError: If the file exceeds `max_size` (`upload_max_size()` by default).
+        ValueError: If the file is empty or its format is not supported.
+    """
+    max_size = upload_max_size() if max_size is None else max_size
+
+    content_hash = md5()
+    head = b''
+    size = 0
+    file.seek(0)
+    while chunk := file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if max_size and size > max_size:
+            raise UploadTooLargeError(f"File exceeds the maximum upload size of {max_size} bytes")
+        if len(head) < MIME_SNIFF_SIZE:
+            head += chunk[:MIME_SNIFF_SIZE - len(head)]
+        content_hash.update(chunk)
+
+    if not size:
+        raise ValueError("Uploaded file is empty")
+
+    mime_type = mime_type or FileFormat._guess_mime_type(binary_data=head, filename=filename)
+    file_format_class = FileFormat._get_file_format_class(mime_type)
+
+    key = content_hash.hexdigest()
+    file.seek(0)
+    get_blob_store().put_stream(key, file)
+
+    return StoredUpload(key, filename or file_format_class.DEFAULT_FILENAME, mime_type, size)
@@ -1,20 +1,38 @@
+import json
+import mimetypes
 import os
 import pathlib
 import sys
 import time
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 import ollama
 import redis
-from celery.result import AsyncResult
-from fastapi import FastAPI, Form, UploadFile, File, HTTPException
+import redis.asyncio
+from celery import Signature, group, states, uuid
+from celery.result import AsyncResult, GroupResult
+from fastapi import FastAPI, Form, UploadFile, File, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, field_validator
+from starlette.formparsers import MultiPartParser
 
-from text_extract_api.celery_app import app as celery_app
+from text_extract_api.cache.cache_key import build_cache_key
+from text_extract_api.cache.ocr_cache import OcrCache
+from text_extract_api.celery_app import app as celery_app, ocr_task_route
+from text_extract_api.extract.output_stream import OutputStream
+from text_extract_api.extract.scheduling import QueueDepth, lane_depths, lane_tenants, validate_priority
 from text_extract_api.extract.strategies.strategy import Strategy
+from text_extract_api.extract.single_flight import SingleFlight
+from text_extract_api.extract.task_results import fetch_task_metas, summarize_task, task_progress
 from text_extract_api.extract.tasks import ocr_task
+from text_extract_api.files.blob_stores.blob_store import get_blob_store, is_valid_blob_key
+from text_extract_api.files.byte_ranges import RangeNotSatisfiableError, file_headers, is_not_modified, requested_range
 from text_extract_api.files.file_formats.file_format import FileFormat, FileField
 from text_extract_api.files.storage_manager import StorageManager
+from text_extract_api.files.storage_strategies.storage_strategy import LIST_PAGE_SIZE
+from text_extract_api.files.upload import StoredUpload, UploadTooLargeError, store_upload, upload_max_size
 
 # Define base path as text_extract_api - required for keeping absolute namespaces
 sys.path.insert(0, str(pathlib.Path(__file__).parent.resolve()))
@@ -31,9 +49,132 @@ def storage_profile_exists(profile_name: str) -> bool:
 
 
 app = FastAPI()
+# Uploads bigger than this are spooled to a temporary file on disk instead of being kept in memory
+MultiPartParser.spool_max_size = int(os.getenv('UPLOAD_SPOOL_MAX_SIZE', 1024 * 1024))
+
+# Single-document endpoints and the slack for the form fields (and base64 encoding) on top of the document size
+UPLOAD_ENDPOINTS = {'/ocr': 1, '/ocr/upload': 1, '/ocr/request': 4 / 3}
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """
+    Rejects single-document requests declaring a body too big for the upload limit before it's received.
+    """
+    max_size = upload_max_size()
+    ratio = UPLOAD_ENDPOINTS.get(request.url.path)
+    content_length = request.headers.get('content-length')
+    if max_size and ratio and content_length and content_length.isdigit() \
+            and int(content_length) > max_size * ratio + UPLOAD_FORM_OVERHEAD:
+        return JSONResponse(status_code=413,
+                            content={"detail": f"File exceeds the maximum upload size of {max_size} bytes"})
+    return await call_next(request)
+
 # Connect to Redis
 redis_url = os.getenv('REDIS_CACHE_URL', 'redis://redis:6379/1')
 redis_client = redis.StrictRedis.from_url(redis_url)
+# Used for blocking reads of the task output streams, which must not block the event loop
+async_redis_client = redis.asyncio.StrictRedis.from_url(redis_url)
+single_flight = SingleFlight(redis_client, int(os.getenv('OCR_SINGLE_FLIGHT_ATTACH_TTL', 600)))
+queue_depth = QueueDepth(redis_client)
+cache = OcrCache(redis_client)
+# The broker's Redis - for the lengths of the queues
+broker_client = redis.StrictRedis.from_url(celery_app.conf.broker_url)
+
+
+def prepare_ocr_task(file_hash: str, strategy: str, filename: str, ocr_cache: bool, prompt: Optional[str],
+                     model: Optional[str], language: str, storage_profile: Optional[str],
+                     storage_filename: Optional[str], tenant: Optional[str] = None, priority: Optional[int] = None,
+                     interactive: bool = True) -> Tuple[str, Optional[Signature]]:
+    """
+    Returns the id of the OCR task and its signature to send. With the OCR cache enabled, identical requests
+    (same document and parameters) sent while the first one is in flight attach to its task id -
+    then there is nothing to send and the signature is None. The task releases the request lease once it's done.
+
+    The task is routed to the lane of the `tenant` (or the interactive lane, for high `priority`
+    requests allowed to use it), see `ocr_task_route()`.
+    """
+    args = [file_hash, strategy, filename, file_hash, ocr_cache, prompt, model, language, storage_profile,
+            storage_filename, tenant]
+    route = ocr_task_route(strategy, tenant, validate_priority(priority), interactive)
+    task_id = uuid()
+    if not ocr_cache:
+        return task_id, ocr_task.signature(args=args, task_id=task_id, **route)
+
+    request_key = build_cache_key('request', strategy, file_hash, {
+        'filename': filename, 'prompt': prompt, 'model': model, 'language': language,
+        'storage_profile': storage_profile, 'storage_filename': storage_filename})
+    if not single_flight.acquire(request_key, task_id):
+        leader = single_flight.owner(request_key)
+        # A finished leader that did not release the lease (e.g. killed worker) is replaced too
+        if leader is not None and AsyncResult(leader, app=celery_app).state not in states.READY_STATES:
+            print(f"Identical request already in flight, attaching to task {leader}")
+            return leader, None
+        single_flight.replace(request_key, task_id)
+
+    return task_id, ocr_task.signature(args=args, kwargs={'request_key': request_key}, task_id=task_id, **route)
+
+
+def enqueue_ocr_task(file_hash: str, strategy: str, filename: str, ocr_cache: bool, prompt: Optional[str],
+                     model: Optional[str], language: str, storage_profile: Optional[str],
+                     storage_filename: Optional[str], tenant: Optional[str] = None,
+                     priority: Optional[int] = None) -> str:
+    """
+    Enqueues the OCR task (unless an identical one is in flight) and returns its id.
+    """
+    task_id, signature = prepare_ocr_task(file_hash, strategy, filename, ocr_cache, prompt, model, language,
+                                          storage_profile, storage_filename, tenant, priority)
+    if signature is not None:
+        queue_depth.enqueued(tenant)
+        signature.apply_async()
+    return task_id
+
+
+def enqueue_ocr_batch(documents: List[Tuple[str, str]], strategy: str, ocr_cache: bool, prompt: Optional[str],
+                      model: Optional[str], language: str, storage_profile: Optional[str],
+                      tenant: Optional[str] = None, priority: Optional[int] = None) -> Tuple[str, List[str]]:
+    """
+    Enqueues OCR tasks for many `(file_hash, filename)` documents sharing the extraction parameters
+    as one Celery group. Returns the batch id and the task ids in the order of `documents`.
+
+    Tasks are independent - a failing document does not affect the others. Documents with an identical
+    request in flight (including duplicates within the batch) attach to the existing task.
+    Batches are bulk work - they always go to the tenant's lane, never to the interactive one.
+    """
+    task_ids = []
+    signatures = []
+    for file_hash, filename in documents:
+        task_id, signature = prepare_ocr_task(file_hash, strategy, filename, ocr_cache, prompt, model, language,
+                                              storage_profile, None, tenant, priority, interactive=False)
+        task_ids.append(task_id)
+        if signature is not None:
+            signatures.append(signature)
+
+    if signatures:
+        queue_depth.enqueued(tenant, len(signatures))
+        group(signatures).apply_async()
+
+    # The batch lists every task, including the ones it attached to, so its status covers all the documents
+    batch = GroupResult(uuid(), [AsyncResult(task_id, app=celery_app) for task_id in task_ids], app=celery_app)
+    batch.save()
+    return batch.id, task_ids
+
+
+async def store_uploaded_file(file: UploadFile, filename: Optional[str]) -> StoredUpload:
+    """
+    Streams the uploaded file to the blob store - see `store_upload()`. Hashing and copying run in a thread,
+    so large uploads do not block the event loop.
+    """
+    max_size = upload_max_size()
+    if max_size and file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=413, detail=f"File exceeds the maximum upload size of {max_size} bytes")
+    try:
+        return await run_in_threadpool(store_upload, file.file, filename, file.content_type, max_size)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/ocr")
@@ -45,7 +186,9 @@ async def ocr_endpoint(
         ocr_cache: bool = Form(...),
         storage_profile: str = Form('default'),
         storage_filename: str = Form(None),
-        language: str = Form('en')
+        language: str = Form('en'),
+        tenant: str = Form(None),
+        priority: int = Form(None)
 ):
     """
     Endpoint to extract text from an uploaded PDF, Image or Office file using different OCR strategies.
@@ -54,23 +197,21 @@ async def ocr_endpoint(
     # Validate input
     try:
         OcrFormRequest(strategy=strategy, prompt=prompt, model=model, ocr_cache=ocr_cache,
-                       storage_profile=storage_profile, storage_filename=storage_filename, language=language)
+                       storage_profile=storage_profile, storage_filename=storage_filename, language=language,
+                       tenant=tenant, priority=priority)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     filename = storage_filename if storage_filename else file.filename
-    file_binary = await file.read()
-    file_format = FileFormat.from_binary(file_binary, filename, file.content_type)
+    upload = await store_uploaded_file(file, filename)
 
     print(
-        f"Processing Document {file_format.filename} with strategy: {strategy}, ocr_cache: {ocr_cache}, model: {model}, storage_profile: {storage_profile}, storage_filename: {storage_filename}, language: {language}, will be saved as: {filename}")
+        f"Processing Document {upload.filename} with strategy: {strategy}, ocr_cache: {ocr_cache}, model: {model}, storage_profile: {storage_profile}, storage_filename: {storage_filename}, language: {language}, will be saved as: {filename}")
 
     # Asynchronous processing using Celery
-    task = ocr_task.apply_async(
-        args=[file_format.binary, strategy, file_format.filename, file_format.hash, ocr_cache, prompt, model, language,
-              storage_profile,
-              storage_filename])
-    return {"task_id": task.id}
+    task_id = enqueue_ocr_task(upload.hash, strategy, upload.filename, ocr_cache, prompt, model, language,
+                               storage_profile, storage_filename, tenant, priority)
+    return {"task_id": task_id}
 
 
 # this is an alias for /ocr - to keep the backward compatibility
@@ -83,13 +224,16 @@ async def ocr_upload_endpoint(
         ocr_cache: bool = Form(...),
         storage_profile: str = Form('default'),
         storage_filename: str = Form(None),
-        language: str = Form('en')
+        language: str = Form('en'),
+        tenant: str = Form(None),
+        priority: int = Form(None)
 ):
     """
     Alias endpoint to extract text from an uploaded PDF/Office/Image file using different OCR strategies.
     Supports both synchronous and asynchronous processing.
     """
-    return await ocr_endpoint(strategy, prompt, model, file, ocr_cache, storage_profile, storage_filename, language)
+    return await ocr_endpoint(strategy, prompt, model, file, ocr_cache, storage_profile, storage_filename, language,
+                              tenant, priority)
 
 
 class OllamaGenerateRequest(BaseModel):
@@ -110,12 +254,18 @@ class OcrRequest(BaseModel):
     storage_profile: Optional[str] = Field('default', description="Storage profile to use")
     storage_filename: Optional[str] = Field(None, description="Storage filename to use")
     language: Optional[str] = Field('en', description="Language to use for OCR")
+    tenant: Optional[str] = Field(None, description="Tenant (e.g. customer) the OCR jobs are fairly scheduled between")
+    priority: Optional[int] = Field(None, description="Priority of the OCR job from 0 to 9 - higher is picked up sooner")
 
     @field_validator('strategy')
     def validate_strategy(cls, v):
         Strategy.get_strategy(v)
         return v
 
+    @field_validator('priority')
+    def check_priority(cls, v):
+        return v if v is None else validate_priority(v)
+
     @field_validator('storage_profile')
     def validate_storage_profile(cls, v):
         if not storage_profile_exists(v):
@@ -131,12 +281,18 @@ class OcrFormRequest(BaseModel):
     storage_profile: Optional[str] = Field('default', description="Storage profile to use")
     storage_filename: Optional[str] = Field(None, description="Storage filename to use")
     language: Optional[str] = Field('en', description="Language to use for OCR")
+    tenant: Optional[str] = Field(None, description="Tenant (e.g. customer) the OCR jobs are fairly scheduled between")
+    priority: Optional[int] = Field(None, description="Priority of the OCR job from 0 to 9 - higher is picked up sooner")
 
     @field_validator('strategy')
     def validate_strategy(cls, v):
         Strategy.get_strategy(v)
         return v
 
+    @field_validator('priority')
+    def check_priority(cls, v):
+        return v if v is None else validate_priority(v)
+
     @field_validator('storage_profile')
     def validate_storage_profile(cls, v):
         if not storage_profile_exists(v):
@@ -161,11 +317,127 @@ async def ocr_request_endpoint(request: OcrRequest):
     print(
         f"Processing {file.mime_type} with strategy: {request.strategy}, ocr_cache: {request.ocr_cache}, model: {request.model}, storage_profile: {request.storage_profile}, storage_filename: {request.storage_filename}, language: {request.language}")
 
+    # The document is passed to Celery by reference - identical uploads are stored only once
+    file_hash = file.hash
+    get_blob_store().put(file_hash, file.binary)
+
     # Asynchronous processing using Celery
-    task = ocr_task.apply_async(
-        args=[file.binary, request.strategy, file.filename, file.hash, request.ocr_cache, request.prompt,
-              request.model, request.language, request.storage_profile, request.storage_filename])
-    return {"task_id": task.id}
+    task_id = enqueue_ocr_task(file_hash, request.strategy, file.filename, request.ocr_cache, request.prompt,
+                               request.model, request.language, request.storage_profile, request.storage_filename,
+                               request.tenant, request.priority)
+    return {"task_id": task_id}
+
+
+@app.post("/ocr/batch")
+async def ocr_batch_endpoint(
+        strategy: str = Form(...),
+        prompt: str = Form(None),
+        model: str = Form(None),
+        files: List[UploadFile] = File(None),
+        blob_keys: List[str] = Form(None),
+        ocr_cache: bool = Form(...),
+        storage_profile: str = Form('default'),
+        language: str = Form('en'),
+        tenant: str = Form(None),
+        priority: int = Form(None)
+):
+    """
+    Endpoint to extract text from many documents at once with shared extraction parameters.
+    Documents are uploaded as `files` and/or referenced by `blob_keys` of documents already in the blob store.
+    Returns the batch id - its status is available at `/ocr/batch/{batch_id}`.
+    """
+    try:
+        OcrFormRequest(strategy=strategy, prompt=prompt, model=model, ocr_cache=ocr_cache,
+                       storage_profile=storage_profile, language=language, tenant=tenant, priority=priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    files = files or []
+    blob_keys = blob_keys or []
+    if not files and not blob_keys:
+        raise HTTPException(status_code=400, detail="No files or blob keys provided")
+    max_batch_size = int(os.getenv('OCR_BATCH_MAX_SIZE', 1000))
+    if len(files) + len(blob_keys) > max_batch_size:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds the maximum size of {max_batch_size} documents")
+
+    blob_store = get_blob_store()
+    documents = []
+    for file in files:
+        upload = await store_uploaded_file(file, file.filename)
+        documents.append((upload.hash, upload.filename))
+    for blob_key in blob_keys:
+        # Keys come from the client - only the hashes the blob store issues are looked up
+        if not is_valid_blob_key(blob_key):
+            raise HTTPException(status_code=400, detail=f"Invalid blob key '{blob_key}'")
+        if not await run_in_threadpool(blob_store.exists, blob_key):
+            raise HTTPException(status_code=400, detail=f"Blob '{blob_key}' does not exist or has expired")
+        documents.append((blob_key, blob_key))
+
+    print(
+        f"Processing batch of {len(documents)} documents with strategy: {strategy}, ocr_cache: {ocr_cache}, model: {model}, storage_profile: {storage_profile}, language: {language}")
+
+    batch_id, task_ids = enqueue_ocr_batch(documents, strategy, ocr_cache, prompt, model, language, storage_profile,
+                                           tenant, priority)
+    return {
+        "batch_id": batch_id,
+        "tasks": [{"task_id": task_id, "filename": filename} for task_id, (_, filename) in zip(task_ids, documents)]
+    }
+
+
+@app.get("/ocr/batch/{batch_id}")
+async def ocr_batch_status(
+        batch_id: str,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(100, ge=0),
+        include_results: bool = True
+):
+    """
+    Endpoint to get the aggregated status of an OCR batch. The counts and progress cover the whole batch,
+    the per-document statuses (with results) are paginated with `offset` and `limit`.
+    """
+    batch = GroupResult.restore(batch_id, app=celery_app)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch '{batch_id}' not found")
+
+    metas = await run_in_threadpool(fetch_task_metas, celery_app.backend, [task.id for task in batch.results])
+    counts = {}
+    for meta in metas:
+        counts[meta['status']] = counts.get(meta['status'], 0) + 1
+
+    total = len(metas)
+    finished = sum(count for state, count in counts.items() if state in states.READY_STATES)
+    failed = sum(count for state, count in counts.items() if state in states.PROPAGATE_STATES)
+    if finished < total:
+        state = 'PENDING' if counts.get(states.PENDING, 0) == total else 'PROGRESS'
+    elif failed == total:
+        state = states.FAILURE
+    elif failed:
+        state = 'PARTIAL_FAILURE'
+    else:
+        state = states.SUCCESS
+
+    return {
+        "batch_id": batch_id,
+        "state": state,
+        "total": total,
+        "finished": finished,
+        "failed": failed,
+        "counts": counts,
+        "progress": round(sum(task_progress(meta) for meta in metas) / total, 1) if total else 100,
+        "offset": offset,
+        "items": [summarize_task(meta, include_results) for meta in metas[offset:offset + limit]]
+    }
+
+
+@app.get("/ocr/queues")
+def ocr_queues_endpoint():
+    """
+    Endpoint returning the number of the queued OCR tasks per tenant and per queue lane, and the tenant lanes
+    the tenants with queued tasks use - tenants sharing a lane delay each other.
+    """
+    lanes = [queue.name for queue in celery_app.conf.task_queues]
+    tenants = queue_depth.tenants()
+    return {"tenants": tenants, "lanes": lane_depths(broker_client, lanes), "tenant_lanes": lane_tenants(tenants)}
 
 
 @app.get("/ocr/result/{task_id}")
@@ -181,6 +453,11 @@ async def ocr_status(task_id: str):
         task_info = task.info
         if task_info.get('start_time'):
             task_info['elapsed_time'] = time.time() - int(task_info.get('start_time'))
+        if task_info.get('extracted_text_key'):
+            # Workers store the extracted text once and only reference it in the progress updates
+            extracted_text = redis_client.get(task_info['extracted_text_key'])
+            if extracted_text is not None:
+                task_info['extracted_text'] = extracted_text.decode('utf-8')
         return {"state": task.state, "status": task.info.get("status"), "info": task_info}
     elif task.state == 'SUCCESS':
         return {"state": task.state, "status": "Task completed successfully.", "result": task.result}
@@ -188,33 +465,188 @@ async def ocr_status(task_id: str):
         return {"state": task.state, "status": str(task.info)}
 
 
+class OcrResultsRequest(BaseModel):
+    task_ids: List[str] = Field(..., description="Task IDs returned by the OCR endpoints")
+    include_result: bool = Field(True, description="Include the results of finished tasks, not only their state")
+
+
+@app.post("/ocr/results")
+async def ocr_results(request: OcrResultsRequest):
+    """
+    Endpoint to get the status of many OCR tasks at once. The states are read from the result backend
+    in a few MGETs instead of one request per task; `include_result=false` returns only the state and progress.
+    """
+    max_ids = int(os.getenv('OCR_RESULTS_MAX_IDS', 10000))
+    if len(request.task_ids) > max_ids:
+        raise HTTPException(status_code=400, detail=f"Too many task ids - the limit is {max_ids}")
+
+    task_ids = list(dict.fromkeys(request.task_ids))
+    metas = await run_in_threadpool(fetch_task_metas, celery_app.backend, task_ids)
+    return {"results": {meta['task_id']: summarize_task(meta, request.include_result) for meta in metas}}
+
+
+def sse_event(event: str, data: str, event_id: Optional[str] = None) -> str:
+    return (f"id: {event_id}\n" if event_id else "") + f"event: {event}\ndata: {data}\n\n"
+
+
+async def stream_task_output(task_id: str, last_event_id: str):
+    """
+    Yields the output published by the task (see `OutputStream`) as Server-Sent Events, until the task is done.
+    Tasks that finished without streaming (or whose stream expired) yield their result at once.
+    """
+    stream_key = OutputStream.stream_key(task_id)
+    # XREAD treats a zero timeout as "block forever"
+    keep_alive_ms = max(1, int(float(os.getenv('OCR_STREAM_KEEP_ALIVE', 15)) * 1000))
+    while True:
+        entries = await async_redis_client.xread({stream_key: last_event_id}, count=100, block=keep_alive_ms)
+        if not entries:
+            task = AsyncResult(task_id, app=celery_app)
+            # Results of finished tasks are cached by AsyncResult - only this call reaches the result backend
+            state = await run_in_threadpool(lambda: task.state)
+            if state == states.SUCCESS:
+                yield sse_event('chunk', json.dumps({'text': task.result, 'source': 'result'}))
+                yield sse_event('done', json.dumps({'state': state}))
+                return
+            if state in states.READY_STATES:
+                yield sse_event('error', json.dumps({'message': str(task.info)}))
+                return
+            # Comments keep the connection open through proxies while the task is queued
+            yield ": keep-alive\n\n"
+            continue
+
+        for event_id, event, data in OutputStream.decode_events(entries[0][1]):
+            last_event_id = event_id
+            yield sse_event(event, data, event_id)
+            if event in ('done', 'error'):
+                return
+
+
+@app.get("/ocr/stream/{task_id}")
+async def ocr_stream(task_id: str, request: Request):
+    """
+    Endpoint to stream the output of an OCR task (page boundaries, OCR and LLM text chunks)
+    with Server-Sent Events as it's generated. Reconnecting clients resume after `Last-Event-ID`.
+    """
+    last_event_id = request.headers.get('last-event-id') or '0-0'
+    return StreamingResponse(stream_task_output(task_id, last_event_id), media_type="text/event-stream",
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.post("/ocr/clear_cache")
 async def clear_ocr_cache():
     """
-    Endpoint to clear the OCR result cache in Redis.
+    Endpoint to clear the OCR result cache - all its tiers.
     """
-    redis_client.flushdb()
+    await run_in_threadpool(cache.clear)
     return {"status": "OCR cache cleared"}
 
 
+@app.get("/ocr/cache/stats")
+async def ocr_cache_stats():
+    """
+    Endpoint to get the OCR cache hit/miss/eviction counters per strategy.
+    """
+    return {"strategies": await run_in_threadpool(cache.stats), "size": await run_in_threadpool(cache.size)}
+
+
+def stream_file_listing(pages, output_format: str):
+    """
+    Serializes the listing page by page - as `{"files": [...]}` JSON or as NDJSON (a `{"file": ...}` line per file).
+    """
+    if output_format == 'ndjson':
+        for files in pages:
+            yield "".join(json.dumps({'file': file}) + "\n" for file in files)
+        return
+
+    yield '{"files": ['
+    separator = ''
+    for files in pages:
+        if files:
+            yield separator + ", ".join(json.dumps(file) for file in files)
+            separator = ', '
+    yield ']}'
+
+
 @app.get("/storage/list")
-async def list_files(storage_profile: str = 'default'):
+async def list_files(
+        storage_profile: str = 'default',
+        prefix: Optional[str] = None,
+        modified_after: Optional[datetime] = None,
+        modified_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_SIZE),
+        format: str = Query('json', pattern='^(json|ndjson)$')
+):
     """
-    Endpoint to list files using the selected storage profile.
+    Endpoint to list files using the selected storage profile - optionally filtered by the path `prefix` and
+    the modification time (the filters the storage strategy supports).
+
+    With `limit` or `cursor` a single page is returned (as JSON) along with the `next_cursor` to pass for
+    the following one. Otherwise all the files are streamed - fetched from the storage page by page -
+    as JSON or NDJSON (`format`).
     """
-    storage_manager = StorageManager(storage_profile)
-    files = storage_manager.list()
-    return {"files": files}
+    # Creating the storage client on first use makes network calls (e.g. checks the bucket)
+    storage_manager = await run_in_threadpool(StorageManager.get, storage_profile)
+    filters = {name: value for name, value in (('modified_after', modified_after), ('modified_before', modified_before))
+               if value is not None}
+    unsupported_filters = [name for name in filters if name not in storage_manager.list_filters()]
+    if unsupported_filters:
+        raise HTTPException(status_code=400, detail=f"The storage profile '{storage_profile}' doesn't support "
+                                                    f"the filters: {', '.join(unsupported_filters)}")
+
+    page_size = limit or LIST_PAGE_SIZE
+    # The first page is fetched before responding - storage errors get a proper status
+    files, next_cursor = await run_in_threadpool(storage_manager.list_page, prefix=prefix, cursor=cursor,
+                                                 limit=page_size, **filters)
+
+    if limit or cursor:
+        return {"files": files, "next_cursor": next_cursor}
+
+    def pages():
+        yield files
+        if next_cursor is not None:
+            yield from storage_manager.iter_pages(prefix=prefix, cursor=next_cursor, page_size=page_size, **filters)
+
+    return StreamingResponse(stream_file_listing(pages(), format),
+                             media_type="application/x-ndjson" if format == 'ndjson' else "application/json")
 
 
 @app.get("/storage/load")
-async def load_file(file_name: str, storage_profile: str = 'default'):
+async def load_file(request: Request, file_name: str, storage_profile: str = 'default', stream: bool = False):
     """
-    Endpoint to load a file using the selected storage profile.
+    Endpoint to load a file using the selected storage profile - as `{"content": ...}` JSON by default.
+
+    With `stream` (or a `Range` header) the raw file is streamed from the storage instead, supporting
+    byte ranges (`Range`, `If-Range`) and conditional requests (`If-None-Match`, `If-Modified-Since`).
     """
-    storage_manager = StorageManager(storage_profile)
-    content = storage_manager.load(file_name)
-    return {"content": content}
+    storage_manager = await run_in_threadpool(StorageManager.get, storage_profile)
+    if not stream and 'range' not in request.headers:
+        content = await run_in_threadpool(storage_manager.load, file_name)
+        return {"content": content}
+
+    info = await run_in_threadpool(storage_manager.stat, file_name)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"File '{file_name}' not found")
+
+    headers = file_headers(info)
+    if is_not_modified(request.headers, info):
+        return Response(status_code=304, headers=headers)
+    try:
+        byte_range = requested_range(request.headers, info)
+    except RangeNotSatisfiableError:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={'Content-Range': f"bytes */{info.size}"})
+
+    media_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    if byte_range is None:
+        headers['Content-Length'] = str(info.size)
+        return StreamingResponse(storage_manager.open_stream(file_name), media_type=media_type, headers=headers)
+
+    first, last = byte_range
+    headers['Content-Range'] = f"bytes {first}-{last}/{info.size}"
+    headers['Content-Length'] = str(last - first + 1)
+    return StreamingResponse(storage_manager.open_stream(file_name, first, last), status_code=206,
+                             media_type=media_type, headers=headers)
 
 
 @app.delete("/storage/delete")
@@ -222,8 +654,8 @@ async def delete_file(file_name: str, storage_profile: str = 'default'):
     """
     Endpoint to delete a file using the selected storage profile.
     """
-    storage_manager = StorageManager(storage_profile)
-    storage_manager.delete(file_name)
+    storage_manager = await run_in_threadpool(StorageManager.get, storage_profile)
+    await run_in_threadpool(storage_manager.delete, file_name)
     return {"status": f"File {file_name} deleted successfully"}
 
 